@@ -54,9 +54,18 @@ def create_app(config_name=None):
     # Register blueprints
     register_blueprints(app)
     
+    # Compress responses and serve hashed static builds
+    from app.assets import init_assets
+    from app.compression import init_compression
+    init_compression(app)
+    init_assets(app)
+    
     # Initialize database tables
     init_database(app)
     
+    # Set up caches; indexes and search index sync start when first needed
+    init_services(app)
+    
     return app
 
 def register_blueprints(app):
@@ -66,15 +75,38 @@ def register_blueprints(app):
     from app.api.courts import courts_bp
     from app.api.chat import chat_bp
     from app.api.search import search_bp
+    from app.api.matchmaking import match_bp
     from app.api import frontend_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(games_bp, url_prefix='/api/games')
+    app.register_blueprint(match_bp, url_prefix='/api/games/match')
     app.register_blueprint(courts_bp, url_prefix='/api/courts')
     app.register_blueprint(chat_bp, url_prefix='/api/chat')
     app.register_blueprint(search_bp, url_prefix='/api/search')
     app.register_blueprint(frontend_bp)
     
+def init_services(app):
+    """
+    Set up the in-process caches. The search indexes are built on first
+    use by their getters, and the search outbox drainer and database
+    full-text setup wait for the first request, so CLI commands, the
+    release phase and serverless cold starts don't pay for them.
+    """
+    from app.services.fulltext import init_fulltext
+    from app.services.search_outbox import init_search_outbox
+    from app.services.geo_cache import init_geo_cache
+    from app.services.court_payload import init_court_payload_cache
+    
+    init_geo_cache(app)
+    init_court_payload_cache(app)
+    
+    @app.before_request
+    def start_background_services():
+        # Both only do work the first time
+        init_fulltext(app)
+        init_search_outbox(app)
+    
 def init_database(app):
     """Initialize database tables"""
     try:
@@ -1,11 +1,40 @@
 # This file makes the api directory a Python package 
 
-from flask import Blueprint, render_template
+from flask import Blueprint, abort, current_app, render_template, send_from_directory
+from werkzeug.security import safe_join
+from app.assets import build_dir
+from app.compression import SUFFIXES, negotiate
+import mimetypes
+import os
 
 # Create a blueprint for the frontend routes
 frontend_bp = Blueprint('frontend', __name__, template_folder='../templates')
 
+# Hashed asset names change with their content, so they can be cached for good
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+
 @frontend_bp.route('/')
 def index():
     """Render the main application page"""
-    return render_template('index.html') 
\ No newline at end of file
+    return render_template('index.html')
+
+@frontend_bp.route('/assets/<path:filename>')
+def asset(filename):
+    """Serve a content-hashed static build, precompressed when the client accepts it"""
+    directory = build_dir(current_app)
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    available = [encoding for encoding, suffix in SUFFIXES.items() if os.path.isfile(path + suffix)]
+    encoding = negotiate(available)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    served = filename + SUFFIXES[encoding] if encoding else filename
+
+    response = send_from_directory(directory, served, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,40 @@
+from flask import current_app, request
+from sqlalchemy import func
+from app.compression import etag_variants
+import hashlib
+
+def make_etag(*parts):
+    """
+    Strong ETag for a response built from the given version parts. The
+    request path and query string are included so each page, filter and
+    field selection gets its own tag.
+    """
+    digest = hashlib.sha1(repr((request.full_path,) + parts).encode('utf-8')).hexdigest()
+    return digest[:32]
+
+def collection_version(query, id_column, updated_at_column):
+    """(row count, max updated_at) of the rows a query matches, in one aggregate query"""
+    return query.with_entities(func.count(id_column), func.max(updated_at_column)).order_by(None).one()
+
+def not_modified(etag):
+    """
+    A 304 response when the request's If-None-Match matches etag, or the
+    tag of a compressed representation of it, else None.
+    """
+    for candidate in etag_variants(etag):
+        if request.if_none_match.contains(candidate):
+            return with_validators(current_app.response_class(status=304), candidate)
+    return None
+
+def with_validators(response, etag):
+    """
+    Set the ETag and a Cache-Control that lets clients keep the body but
+    revalidate it, after HTTP_CACHE_MAX_AGE seconds, with If-None-Match.
+    """
+    if isinstance(response, tuple):
+        response = current_app.make_response(response)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get('HTTP_CACHE_MAX_AGE', 0)
+    response.cache_control.must_revalidate = True
+    return response
@@ -1,14 +1,39 @@
-from flask import Blueprint, request, jsonify
+from datetime import date
+from flask import Blueprint, current_app, request, jsonify
+from app import db
 from app.models.court import Court
+from app.models.game import Game
+from app.api.conditional import collection_version, make_etag, not_modified, with_validators
+from app.api.fields import field_args
+from app.api.pagination import COURT_CURSOR_TYPES, page_args, paginate
+from app.services.court_payload import court_fragment, encode, json_array, json_extend, json_object, json_response
 
 courts_bp = Blueprint('courts', __name__)
 
+# Values accepted by get_court's ?include=
+COURT_INCLUDES = ('games', 'upcoming_only')
+
+def include_args():
+    """Set of ?include=a,b values, raising ValueError for unknown ones"""
+    included = {value.strip() for value in request.args.get('include', '').split(',') if value.strip()}
+    unknown = included - set(COURT_INCLUDES)
+    if unknown:
+        raise ValueError(f'Unknown include: {", ".join(sorted(unknown))}')
+    if 'upcoming_only' in included and 'games' not in included:
+        raise ValueError('include=upcoming_only needs include=games')
+    return included
+
 @courts_bp.route('', methods=['GET'])
 def get_courts():
     """List all courts with optional filters"""
     # Get query parameters
     name = request.args.get('name')
     court_type = request.args.get('court_type')
+    try:
+        limit, after = page_args(COURT_CURSOR_TYPES)
+        fields = field_args(Court)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
     # Build query
     query = Court.query
@@ -19,21 +44,74 @@ def get_courts():
     if court_type:
         query = query.filter_by(court_type=court_type)
     
-    # Execute query
-    courts = query.order_by(Court.name).all()
+    # Answer revalidations from the matching rows' version, before loading any
+    etag = make_etag(*collection_version(query, Court.court_id, Court.updated_at))
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+    
+    # Read only the requested columns plus the sort key
+    if fields is not None:
+        query = query.options(Court.load_only(fields + ('name',)))
     
-    return jsonify({
-        'courts': [court.to_dict() for court in courts]
-    }), 200
+    # Execute query, one page at a time
+    courts, next_cursor = paginate(
+        query, (Court.name, Court.court_id), after, limit,
+        lambda court: (court.name, court.court_id)
+    )
+    
+    # Joined from cached per-court JSON instead of serializing every court again
+    return with_validators(json_response(json_object(
+        {'next_cursor': next_cursor},
+        {'courts': json_array([court_fragment(court, fields) for court in courts])}
+    )), etag)
 
 @courts_bp.route('/<int:court_id>', methods=['GET'])
 def get_court(court_id):
-    """Get details of a specific court"""
-    court = Court.query.get(court_id)
+    """
+    Get details of a specific court. With ?include=games the court's next
+    COURT_GAMES_LIMIT scheduled games, from today on, are embedded under
+    games, so the court page needs one request. upcoming_only is accepted
+    alongside games and names that default.
+    """
+    try:
+        fields = field_args(Court)
+        included = include_args()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    version = db.session.query(Court.updated_at).filter(Court.court_id == court_id).first()
+    if not version:
+        return jsonify({'message': 'Court not found'}), 404
+    
+    games_query = None
+    version = (court_id, version.updated_at)
+    if 'games' in included:
+        from_date = date.today()
+        limit = current_app.config.get('COURT_GAMES_LIMIT', 20)
+        games_query = Game.scheduled_at_court(court_id, from_date)
+        # Joins and leaves bump updated_at through the player counter
+        version += (from_date, limit) + tuple(collection_version(games_query, Game.game_id, Game.updated_at))
+    
+    etag = make_etag(*version)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+    
+    query = Court.query
+    if fields is not None:
+        query = query.options(Court.load_only(fields))
+    court = query.filter(Court.court_id == court_id).first()
     
     if not court:
         return jsonify({'message': 'Court not found'}), 404
     
     # Return the court data directly, not wrapped in another object
     # This matches what the frontend loadCourtDetailsPage function expects
-    return jsonify(court.to_dict()), 200 
\ No newline at end of file
+    body = court_fragment(court, fields)
+    if games_query is not None:
+        games = games_query.limit(limit)
+        body = json_extend(body, {
+            'games': json_array([encode(game.to_dict(include_participants=False)) for game in games])
+        })
+    return with_validators(json_response(body), etag)
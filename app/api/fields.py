@@ -0,0 +1,27 @@
+from flask import request
+
+def field_args(model):
+    """
+    Fields requested with ?fields=a,b or ?view=summary, in the model's
+    field order, or None for the full representation. Raises ValueError
+    for unknown fields or views.
+    """
+    view = request.args.get('view', 'full')
+    fields = request.args.get('fields')
+    if view not in ('full', 'summary'):
+        raise ValueError('view must be full or summary')
+    if fields:
+        requested = {field.strip() for field in fields.split(',') if field.strip()}
+        unknown = requested - set(model.FIELDS)
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(sorted(unknown))}')
+        return tuple(field for field in model.FIELDS if field in requested)
+    if view == 'summary':
+        return model.SUMMARY_FIELDS
+    return None
+
+def project(result, fields, extra=('distance', 'court_location')):
+    """A serialized result limited to fields, keeping the extra keys search adds"""
+    if fields is None:
+        return result
+    return {key: value for key, value in result.items() if key in fields or key in extra}
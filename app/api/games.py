@@ -1,10 +1,15 @@
 from datetime import datetime
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func, select
 from app import db
-from app.models.game import Game, GameParticipant
+from app.models.game import Game, GameFullError, GameParticipant
 from app.models.user import User
 from app.models.court import Court
+from app.api.conditional import make_etag, not_modified, with_validators
+from app.api.fields import field_args
+from app.api.pagination import GAME_CURSOR_TYPES, page_args, paginate
+from app.services.court_payload import court_fragment, json_array, json_object, json_response
 
 games_bp = Blueprint('games', __name__)
 
@@ -28,6 +33,11 @@ def create_game():
     if missing_fields:
         return jsonify({'message': f'Missing required fields: {", ".join(missing_fields)}'}), 400
     
+    # The creator takes the first place, so a game needs at least one
+    max_players = data.get('max_players', 4)
+    if not isinstance(max_players, int) or isinstance(max_players, bool) or max_players < 1:
+        return jsonify({'message': 'max_players must be a positive integer'}), 400
+    
     # Check if court exists
     court = Court.query.get(data['court_id'])
     if not court:
@@ -51,7 +61,7 @@ def create_game():
             creator_id=current_user_id,
             date=date,
             time=time,
-            max_players=data.get('max_players', 4),
+            max_players=max_players,
             skill_level=data.get('skill_level'),
             notes=data.get('notes')
         )
@@ -66,10 +76,9 @@ def create_game():
         )
         db.session.add(participant)
         
+        # Search indexes are updated from the outbox written in this transaction
         db.session.commit()
         
-        # Index in Elasticsearch (to be implemented in search service)
-        
         return jsonify({
             'message': 'Game scheduled successfully',
             'game_id': game.game_id,
@@ -82,6 +91,29 @@ def create_game():
         print(f"Error creating game: {str(e)}")
         return jsonify({'message': f'Error scheduling game: {str(e)}'}), 500
 
+def game_with_court(game, fields=None):
+    """
+    JSON bytes of a game including its court, taken from the court payload
+    cache. Sparse fields carry the court summary only if court is asked for.
+    """
+    if fields is not None:
+        return json_object(game.to_dict(fields=fields))
+    return json_object(game.to_dict(), {'court': court_fragment(game.court)})
+
+def games_version(filters):
+    """
+    Versions of everything a game response serializes for the games
+    matching filters: the games, their courts and their participants.
+    The first part is the number of games.
+    """
+    games = db.session.query(
+        func.count(Game.game_id), func.max(Game.updated_at), func.max(Court.updated_at)
+    ).join(Game.court).filter(*filters).one()
+    participants = db.session.query(func.count(), func.max(GameParticipant.joined_at)).filter(
+        GameParticipant.game_id.in_(select(Game.game_id).where(*filters))
+    ).one()
+    return tuple(games) + tuple(participants)
+
 @games_bp.route('', methods=['GET'])
 def get_games():
     """List scheduled games with optional filters"""
@@ -89,56 +121,116 @@ def get_games():
     court_id = request.args.get('court_id', type=int)
     date = request.args.get('date')
     status = request.args.get('status', 'scheduled')
+    try:
+        limit, after = page_args(GAME_CURSOR_TYPES)
+        fields = field_args(Game)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
-    # Build query
-    query = Game.query.join(Game.court)
+    # Build filters
+    filters = []
     
     if court_id:
-        query = query.filter(Game.court_id == court_id)
+        filters.append(Game.court_id == court_id)
     
     if date:
         try:
             filter_date = datetime.strptime(date, '%Y-%m-%d').date()
-            query = query.filter(Game.date == filter_date)
+            filters.append(Game.date == filter_date)
         except ValueError:
             return jsonify({'message': 'Invalid date format. Use YYYY-MM-DD'}), 400
     
     if status:
-        query = query.filter(Game.status == status)
-    
-    # Execute query
-    games = query.order_by(Game.date, Game.time).all()
-    
-    # Transform the results to include court information
-    game_list = []
-    for game in games:
-        game_data = game.to_dict()
-        game_data['court'] = game.court.to_dict() if game.court else None
-        game_data['scheduled_time'] = f"{game.date.isoformat()}T{game.time.isoformat()}" if game.date and game.time else None
-        game_data['players'] = game_data['participants']
-        game_list.append(game_data)
-    
-    return jsonify({
-        'games': game_list
-    }), 200
+        filters.append(Game.status == status)
+    
+    # Answer revalidations from the matching rows' versions, before loading any
+    etag = make_etag(*games_version(filters))
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+    
+    # Load courts and participants with the games (and the sort key when sparse)
+    query = Game.query_with_details(fields and fields + ('date', 'time')).filter(*filters)
+    
+    # Execute query, one page at a time
+    games, next_cursor = paginate(
+        query, (Game.date, Game.time, Game.game_id), after, limit,
+        lambda game: (game.date, game.time, game.game_id)
+    )
+    
+    return with_validators(json_response(json_object(
+        {'next_cursor': next_cursor},
+        {'games': json_array([game_with_court(game, fields) for game in games])}
+    )), etag)
 
 @games_bp.route('/<int:game_id>', methods=['GET'])
 def get_game(game_id):
     """Get details of a specific game"""
-    game = Game.query.join(Game.court).filter(Game.game_id == game_id).first()
+    try:
+        fields = field_args(Game)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    version = games_version([Game.game_id == game_id])
+    if not version[0]:
+        return jsonify({'message': 'Game not found'}), 404
+    
+    etag = make_etag(*version)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+    
+    game = Game.query_with_details(fields).filter(Game.game_id == game_id).first()
     
     if not game:
         return jsonify({'message': 'Game not found'}), 404
     
-    # Transform the result to include court information
-    game_data = game.to_dict()
-    game_data['court'] = game.court.to_dict() if game.court else None
-    game_data['scheduled_time'] = f"{game.date.isoformat()}T{game.time.isoformat()}" if game.date and game.time else None
-    game_data['players'] = game_data['participants']
+    return with_validators(json_response(json_object({}, {'game': game_with_court(game, fields)})), etag)
+
+def batch_ids():
+    """
+    Distinct game ids from ?ids=1,2,3, in the order given. Raises
+    ValueError for missing or malformed ids or more than GAMES_BATCH_MAX_IDS.
+    """
+    raw = request.args.get('ids', '')
+    try:
+        ids = [int(part) for part in raw.split(',') if part.strip()]
+    except ValueError:
+        raise ValueError('ids must be a comma-separated list of game ids')
+    if not ids:
+        raise ValueError('ids is required')
+    ids = list(dict.fromkeys(ids))
+    max_ids = current_app.config.get('GAMES_BATCH_MAX_IDS', 500)
+    if len(ids) > max_ids:
+        raise ValueError(f'At most {max_ids} ids can be requested at once')
+    return ids
+
+@games_bp.route('/batch', methods=['GET'])
+def get_games_batch():
+    """
+    Get several games by id in one query, keyed by id. Ids with no game
+    are listed under missing.
+    """
+    try:
+        ids = batch_ids()
+        fields = field_args(Game)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
-    return jsonify({
-        'game': game_data
-    }), 200
+    filters = [Game.game_id.in_(ids)]
+    etag = make_etag(*games_version(filters))
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+    
+    # load_only always keeps the primary key, so games can be keyed even when it isn't a field
+    games = {game.game_id: game for game in Game.query_with_details(fields).filter(*filters)}
+    found = [game_id for game_id in ids if game_id in games]
+    
+    return with_validators(json_response(json_object(
+        {'missing': [game_id for game_id in ids if game_id not in games]},
+        {'games': json_object({}, {str(game_id): game_with_court(games[game_id], fields) for game_id in found})}
+    )), etag)
 
 @games_bp.route('/<int:game_id>/join', methods=['POST'])
 @jwt_required()
@@ -151,8 +243,8 @@ def join_game(game_id):
     if not game:
         return jsonify({'message': 'Game not found'}), 404
     
-    # Check if game is full
-    if len(game.participants) >= game.max_players:
+    # Check if game is full, from the counter rather than the participant rows
+    if game.current_players >= game.max_players:
         return jsonify({'message': 'Game is already full'}), 400
     
     # Check if user is already a participant
@@ -165,7 +257,7 @@ def join_game(game_id):
         return jsonify({'message': 'You are already a participant in this game'}), 400
     
     try:
-        # Add user as a participant
+        # Add user as a participant; the insert takes a place with a conditional UPDATE
         participant = GameParticipant(
             game_id=game_id,
             user_id=current_user_id
@@ -177,6 +269,10 @@ def join_game(game_id):
             'message': 'Successfully joined the game',
             'game': game.to_dict()
         }), 200
+    except GameFullError:
+        # Filled up by a concurrent join since the check above
+        db.session.rollback()
+        return jsonify({'message': 'Game is already full'}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Error joining game: {str(e)}'}), 500
@@ -202,21 +298,20 @@ def leave_game(game_id):
         return jsonify({'message': 'You are not a participant in this game'}), 400
     
     try:
-        # Remove user from participants
+        # Remove user from participants; the delete gives the place back
         db.session.delete(participant)
-        
-        # If the user is the creator and there are other participants,
-        # transfer ownership to the next participant
-        if game.creator_id == current_user_id and len(game.participants) > 1:
-            # Find another participant who is not the current user
-            for p in game.participants:
-                if p.user_id != current_user_id:
-                    game.creator_id = p.user_id
-                    break
+        db.session.flush()
+        db.session.refresh(game, ['current_players'])
         
         # If no participants left, cancel the game
-        if len(game.participants) <= 1:  # Only the current user is left
+        if game.current_players == 0:
             game.status = 'cancelled'
+        elif game.creator_id == int(current_user_id):  # JWT identities are strings
+            # Transfer ownership to the participant who joined next
+            successor = GameParticipant.query.filter_by(game_id=game_id).order_by(
+                GameParticipant.joined_at, GameParticipant.user_id
+            ).first()
+            game.creator_id = successor.user_id
         
         db.session.commit()
         
@@ -0,0 +1,95 @@
+from datetime import date, datetime, timedelta
+from flask import Blueprint, current_app, request, jsonify
+from app.models.game import Game
+from app.api.fields import field_args
+from app.api.search import location_args
+from app.services.match_index import MatchRequest, match_games
+
+match_bp = Blueprint('match', __name__)
+
+def date_arg(name, default):
+    """A YYYY-MM-DD query parameter as a date, raising ValueError when malformed"""
+    value = request.args.get(name)
+    if not value:
+        return default
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'Invalid {name} date. Use YYYY-MM-DD')
+
+def positive_int_arg(name, default):
+    """A positive integer query parameter, raising ValueError when malformed"""
+    try:
+        value = int(request.args.get(name, default))
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+    if value < 1:
+        raise ValueError(f'{name} must be a positive integer')
+    return value
+
+def match_request():
+    """MatchRequest and result limit from the query string; raises ValueError for bad input"""
+    try:
+        location = location_args()
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Invalid location parameters: {str(e)}')
+    today = date.today()
+    start = max(date_arg('from', today), today)
+    end = date_arg('to', None)
+    max_days = current_app.config.get('MATCH_MAX_DAYS', 31)
+    players = positive_int_arg('players', 1)
+    limit = min(positive_int_arg('limit', current_app.config.get('MATCH_LIMIT', 20)),
+                current_app.config.get('MAX_PAGE_SIZE', 200))
+    try:
+        if end is None:
+            end = start + timedelta(days=min(current_app.config.get('MATCH_DAYS', 7), max_days) - 1)
+        if end < start:
+            raise ValueError('to must not be before from')
+        # Keep the time window, and the work a match can be asked to do, bounded
+        if (end - start).days >= max_days:
+            raise ValueError(f'from and to can be at most {max_days} days apart')
+        return MatchRequest(start, end, request.args.get('skill_level'), location, players), limit
+    except OverflowError:
+        raise ValueError('Dates are out of range')
+
+@match_bp.route('', methods=['GET'])
+def match():
+    """
+    Games the player can join: scheduled games with at least players free
+    places between from and to (default: the next MATCH_DAYS days), at
+    skill_level or open to any level, within radius km of lat/lng when
+    given. Best matches first; each carries its score and distance.
+    """
+    try:
+        wanted, limit = match_request()
+        fields = field_args(Game)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    matches = match_games(wanted, limit)
+    games_by_id = {
+        game.game_id: game
+        for game in Game.query_with_details(fields).filter(Game.game_id.in_([game_id for game_id, _, _ in matches]))
+    }
+
+    results = []
+    for game_id, score, distance in matches:
+        game = games_by_id.get(game_id)
+        if game is None:  # Deleted since the index last saw it
+            continue
+        game_dict = game.to_dict(fields=fields)
+        game_dict['score'] = round(score, 4)
+        if distance is not None:
+            game_dict['distance'] = round(distance, 2)
+            game_dict['court_location'] = {'lat': game.court.lat, 'lng': game.court.lng}
+        results.append(game_dict)
+
+    return jsonify({
+        'games': results,
+        'params': {
+            'from': wanted.start.isoformat(),
+            'to': wanted.end.isoformat(),
+            'skill_level': wanted.skill_level,
+            'players': wanted.players
+        }
+    }), 200
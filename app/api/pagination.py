@@ -0,0 +1,101 @@
+from bisect import bisect_right
+from datetime import date, time
+from flask import current_app, request
+from sqlalchemy import tuple_
+import base64
+import binascii
+import json
+
+# Converters for the sort keys encoded in cursors
+GAME_CURSOR_TYPES = (date.fromisoformat, time.fromisoformat, int)  # (date, time, game_id)
+COURT_CURSOR_TYPES = (str, int)  # (name, court_id)
+
+def encode_cursor(values):
+    """Opaque cursor for the sort key of the last row on a page"""
+    payload = [value.isoformat() if isinstance(value, (date, time)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, types):
+    """
+    Sort key values from a cursor, each converted with the matching
+    function in types. Returns None when no cursor was given and raises
+    ValueError for a malformed one.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError('Invalid cursor')
+    try:
+        return tuple(convert(value) for convert, value in zip(types, values))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+def page_limit():
+    """Read limit from the request, raising ValueError for bad input"""
+    default_limit = current_app.config.get('PAGE_SIZE', 50)
+    max_limit = current_app.config.get('MAX_PAGE_SIZE', 200)
+    try:
+        limit = int(request.args.get('limit', default_limit))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    return min(limit, max_limit)
+
+def page_args(types):
+    """
+    Read limit and cursor from the request.
+    Returns (limit, cursor values) and raises ValueError for bad input.
+    """
+    return page_limit(), decode_cursor(request.args.get('cursor'), types)
+
+def tag_cursor(cursor, backend):
+    """
+    A cursor marked with the backend that issued it, for endpoints whose
+    sort keys depend on which backend answered. None stays None.
+    """
+    return f'{backend}.{cursor}' if cursor else None
+
+def split_cursor(cursor, backends):
+    """
+    (backend, cursor) from a tagged cursor, or (None, None) without one.
+    Raises ValueError when the tag isn't one of backends.
+    """
+    if not cursor:
+        return None, None
+    backend, _, cursor = cursor.partition('.')
+    if backend not in backends or not cursor:
+        raise ValueError('Invalid cursor')
+    return backend, cursor
+
+def paginate(query, columns, after, limit, sort_key):
+    """
+    Keyset pagination over a SQL query.
+
+    Orders by columns, keeps rows whose key is after the cursor with a
+    row-value comparison the database can answer from an index on the
+    same columns, and returns (rows, next_cursor).
+    """
+    if after is not None:
+        query = query.filter(tuple_(*columns) > tuple_(*after))
+    rows = query.order_by(*columns).limit(limit + 1).all()
+    return page_result(rows, limit, sort_key)
+
+def paginate_sorted(items, after, limit, sort_key):
+    """Keyset pagination over a list already sorted by sort_key"""
+    start = 0
+    if after is not None:
+        start = bisect_right([tuple(sort_key(item)) for item in items], after)
+    return page_result(items[start:start + limit + 1], limit, sort_key)
+
+def page_result(rows, limit, sort_key):
+    """Trim a limit + 1 fetch to one page and build its next cursor"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(sort_key(rows[-1]))
@@ -1,238 +1,339 @@
 from flask import Blueprint, request, jsonify, current_app
-from elasticsearch import Elasticsearch
 from app.models.court import Court
 from app.models.game import Game
-from app.services.elasticsearch import get_elasticsearch_client
-import math
+from app.services.elasticsearch import (
+    elasticsearch_failed, elasticsearch_succeeded, get_elasticsearch_client, index_alias
+)
+from app.services.es_search import (
+    COURT_SEARCH_FIELDS, GAME_SEARCH_FIELDS, hit_distance, hits_to_dicts, search_body
+)
+from app.services.geo_cache import get_geo_cache
+from app.services.geo_index import courts_within_radius, k_nearest_courts
+from app.services.fulltext import get_text_search
+from app.services.suggest_index import get_suggest_index
+from app.api.fields import field_args
+from app.api.pagination import (
+    GAME_CURSOR_TYPES, decode_cursor, encode_cursor, page_limit, paginate_sorted, split_cursor, tag_cursor
+)
+from app import db
+
+# Cursor sort keys for ranked result lists
+DISTANCE_CURSOR_TYPES = (float, int)  # (distance, court_id)
+GAME_DISTANCE_CURSOR_TYPES = (float,) + GAME_CURSOR_TYPES  # (distance, date, time, game_id)
+TEXT_CURSOR_TYPES = (float, int)  # (-score, id)
+GAME_GEO_ORDER = [{"date": "asc"}, {"time": "asc"}]  # Elasticsearch sorts after distance
+# Search cursors carry the backend that issued them, since their sort keys differ
+ES_CURSOR = 'es'
+LOCAL_CURSOR = 'local'
 
 search_bp = Blueprint('search', __name__)
 
-# Function to calculate distance between two coordinate points
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """
-    Calculate the Haversine distance between two points 
-    on the earth (specified in decimal degrees)
-    """
-    # Convert decimal degrees to radians
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-    
-    # Haversine formula
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    # Radius of earth in kilometers
-    r = 6371
-    return c * r
+def rows_in_order(query, column, ids):
+    """Load rows whose column value is in ids, returned in the order of ids"""
+    rows_by_id = {getattr(row, column.key): row for row in query.filter(column.in_(ids))}
+    return [rows_by_id[row_id] for row_id in ids if row_id in rows_by_id]
 
-@search_bp.route('/courts', methods=['GET'])
-def search_courts():
-    """Search for courts using Elasticsearch or by location radius"""
-    query = request.args.get('q', '')
+def location_args():
+    """(lat, lng, radius_km) from the request, or None without a location"""
     lat = request.args.get('lat')
     lng = request.args.get('lng')
-    radius = request.args.get('radius', 10)  # Default radius: 10km
-    
-    # Location-based search has priority
-    if lat and lng:
-        try:
-            lat = float(lat)
-            lng = float(lng)
-            radius = float(radius)
-            
-            # Query all courts that have coordinates
-            all_courts = Court.query.filter(Court.lat.isnot(None), Court.lng.isnot(None)).all()
-            
-            # Filter courts by distance
-            courts_with_distance = []
-            for court in all_courts:
-                distance = calculate_distance(lat, lng, court.lat, court.lng)
-                if distance <= radius:
-                    court_dict = court.to_dict()
-                    court_dict['distance'] = round(distance, 2)  # Add distance to court data
-                    courts_with_distance.append(court_dict)
-            
-            # Sort by distance
-            courts_with_distance.sort(key=lambda x: x['distance'])
-            
-            return jsonify({
-                'courts': courts_with_distance,
-                'search_method': 'location_radius',
-                'params': {
-                    'lat': lat,
-                    'lng': lng,
-                    'radius': radius
-                }
-            }), 200
-        except (ValueError, TypeError) as e:
-            return jsonify({'message': f'Invalid location parameters: {str(e)}'}), 400
-    
-    # Text-based search if no location data provided
-    if not query:
-        return jsonify({'message': 'Search query is required for text search'}), 400
-    
-    es = get_elasticsearch_client()
-    if not es:
-        # Fallback to database search if Elasticsearch is not configured
-        courts = Court.query.filter(Court.name.ilike(f'%{query}%')).all()
-        return jsonify({
-            'courts': [court.to_dict() for court in courts],
-            'search_method': 'database'
-        }), 200
-    
+    if not (lat and lng):
+        return None
+    return float(lat), float(lng), float(request.args.get('radius', 10))  # Default radius: 10km
+
+def es_cursor_types(query, geo, geo_types=()):
+    """Cursor types matching search_body's sort: [_score], [distance, *geo_types], id"""
+    types = (float,) if query else ()
+    if geo:
+        types += (float,) + geo_types
+    return types + (int,)
+
+def fallback_cursor_types(query, geo, distance_types):
+    """Cursor types for the in-process search: text rank, or distance for location-only"""
+    return distance_types if geo and not query else TEXT_CURSOR_TYPES
+
+def elasticsearch_page(es, index, body, limit, after):
+    """Run a ranked Elasticsearch query one page at a time with search_after"""
+    body = dict(body, size=limit + 1)
+    if after is not None:
+        body['search_after'] = list(after)
     try:
-        # Search in Elasticsearch
-        index = current_app.config.get('ELASTICSEARCH_INDEX', 'pickleball_dev')
-        response = es.search(
-            index=f"{index}_courts",
-            body={
-                "query": {
-                    "multi_match": {
-                        "query": query,
-                        "fields": ["name^3", "address", "court_type", "surface_type", "amenities"]
-                    }
-                }
-            }
-        )
-        
-        # Extract results
-        hits = response['hits']['hits']
-        court_ids = [hit['_source']['court_id'] for hit in hits]
-        
-        # Get courts from database
-        courts = Court.query.filter(Court.court_id.in_(court_ids)).all()
-        
-        # Sort courts to match Elasticsearch ranking
-        sorted_courts = []
-        for court_id in court_ids:
-            for court in courts:
-                if court.court_id == court_id:
-                    sorted_courts.append(court)
-                    break
-        
-        return jsonify({
-            'courts': [court.to_dict() for court in sorted_courts],
-            'search_method': 'elasticsearch'
-        }), 200
-    
+        hits = es.search(index=index, body=body)['hits']['hits']
     except Exception as e:
-        # Fallback to database search if Elasticsearch query fails
-        courts = Court.query.filter(Court.name.ilike(f'%{query}%')).all()
-        return jsonify({
-            'courts': [court.to_dict() for court in courts],
-            'search_method': 'database',
-            'error': str(e)
-        }), 200
+        elasticsearch_failed(e)
+        raise
+    elasticsearch_succeeded()
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_cursor(hits[-1]['sort'])
+    return hits, next_cursor
+
+def elasticsearch_results(hits, id_field, query, geo, rows_query, column, fields=None):
+    """Serialize hits in ranking order, with distance and court location for geo searches"""
+    results = hits_to_dicts(hits, id_field, rows_query, column, fields)
+    if geo:
+        sources = {hit['_source'][id_field]: (hit_distance(hit, query), hit['_source'].get('location')) for hit in hits}
+        for result in results:
+            distance, point = sources[result[id_field]]
+            result['distance'] = round(distance, 2)
+            if id_field == 'game_id' and point:
+                result['court_location'] = {'lat': point['lat'], 'lng': point['lon']}
+    return results
+
+def court_query(fields):
+    """Court query reading only the columns behind fields, if given"""
+    return Court.query.options(Court.load_only(fields)) if fields is not None else Court.query
+
+def courts_with_distance(nearby, fields=None):
+    """Load courts for [(court_id, distance)] pairs and serialize them in that order"""
+    courts = court_query(fields).filter(Court.court_id.in_([court_id for court_id, _ in nearby])).all()
+    courts_by_id = {court.court_id: court for court in courts}
+
+    results = []
+    for court_id, distance in nearby:
+        court = courts_by_id.get(court_id)
+        if court:
+            court_dict = court.to_dict(fields)
+            court_dict['distance'] = round(distance, 2)  # Add distance to court data
+            results.append(court_dict)
+    return results
+
+def games_with_distance(nearby, fields=None):
+    """Load games for [(game_id, distance)] pairs and serialize them in that order"""
+    games = Game.query_with_details(fields).filter(Game.game_id.in_([game_id for game_id, _ in nearby])).all()
+    games_by_id = {game.game_id: game for game in games}
+
+    # Attach court distance to each game
+    results = []
+    for game_id, distance in nearby:
+        game = games_by_id.get(game_id)
+        if not game:
+            continue
+        game_dict = game.to_dict(fields=fields)
+        game_dict['distance'] = round(distance, 2)  # Add distance to game data
+        game_dict['court_location'] = {
+            'lat': game.court.lat,
+            'lng': game.court.lng
+        }
+        results.append(game_dict)
+    return results
+
+def fallback_court_search(query, geo, limit, after, fields=None):
+    """
+    Court search without Elasticsearch: the geo index for locations and the
+    configured text backend for queries, text matches filtered by radius
+    when both are given. Returns (court dicts, next_cursor, search_method).
+    """
+    if geo is None:
+        backend = get_text_search()
+        ranked = backend.search_courts(query)
+        page, next_cursor = paginate_sorted(ranked, after, limit, lambda item: (-item[1], item[0]))
+        courts = rows_in_order(court_query(fields), Court.court_id, [court_id for court_id, _ in page])
+        return [court.to_dict(fields) for court in courts], next_cursor, backend.search_method
+
+    if not query:
+        cache = get_geo_cache()
+        cached = cache.nearby_courts(*geo) if cache else None
+        if cached is not None:
+            page, next_cursor = paginate_sorted(cached, after, limit, lambda item: (item[1], item[0]))
+            return courts_with_distance(page, fields), next_cursor, 'location_radius'
+
+    nearby = courts_within_radius(*geo)
+    if query:
+        distances = dict(nearby)
+        ranked = [item for item in get_text_search().search_courts(query) if item[0] in distances]
+        page, next_cursor = paginate_sorted(ranked, after, limit, lambda item: (-item[1], item[0]))
+        page = [(court_id, distances[court_id]) for court_id, _ in page]
+    else:
+        # Nearest first, loading only this page
+        nearby = sorted(nearby, key=lambda item: (item[1], item[0]))
+        page, next_cursor = paginate_sorted(nearby, after, limit, lambda item: (item[1], item[0]))
+    return courts_with_distance(page, fields), next_cursor, 'location_radius'
+
+def fallback_game_search(query, geo, limit, after, fields=None):
+    """Game search without Elasticsearch, like fallback_court_search"""
+    if geo is None:
+        backend = get_text_search()
+        ranked = backend.search_games(query)
+        page, next_cursor = paginate_sorted(ranked, after, limit, lambda item: (-item[1], item[0]))
+        games = rows_in_order(Game.query_with_details(fields), Game.game_id, [game_id for game_id, _ in page])
+        return [game.to_dict(fields=fields) for game in games], next_cursor, backend.search_method
 
-@search_bp.route('/games', methods=['GET'])
-def search_games():
-    """Search for games using Elasticsearch or by location radius"""
-    query = request.args.get('q', '')
-    lat = request.args.get('lat')
-    lng = request.args.get('lng')
-    radius = request.args.get('radius', 10)  # Default radius: 10km
-    
-    # Location-based search has priority
-    if lat and lng:
-        try:
-            lat = float(lat)
-            lng = float(lng)
-            radius = float(radius)
-            
-            # Get all games and their courts with coordinates
-            games = Game.query.join(Court).filter(Court.lat.isnot(None), Court.lng.isnot(None)).all()
-            
-            # Filter games by court distance
-            games_with_distance = []
-            for game in games:
-                court = game.court
-                distance = calculate_distance(lat, lng, court.lat, court.lng)
-                if distance <= radius:
-                    game_dict = game.to_dict()
-                    game_dict['distance'] = round(distance, 2)  # Add distance to game data
-                    game_dict['court_location'] = {
-                        'lat': court.lat,
-                        'lng': court.lng
-                    }
-                    games_with_distance.append(game_dict)
-            
-            # Sort by distance
-            games_with_distance.sort(key=lambda x: x['distance'])
-            
-            return jsonify({
-                'games': games_with_distance,
-                'search_method': 'location_radius',
-                'params': {
-                    'lat': lat,
-                    'lng': lng,
-                    'radius': radius
-                }
-            }), 200
-        except (ValueError, TypeError) as e:
-            return jsonify({'message': f'Invalid location parameters: {str(e)}'}), 400
-    
-    # Text-based search if no location data provided
     if not query:
+        cache = get_geo_cache()
+        cached = cache.nearby_games(*geo) if cache else None
+        if cached is not None:
+            page, next_cursor = paginate_sorted(cached, after, limit, lambda key: key)
+            return games_with_distance([(key[3], key[0]) for key in page], fields), next_cursor, 'location_radius'
+
+    # Games at nearby courts
+    distances = dict(courts_within_radius(*geo))
+    keys = db.session.query(Game.court_id, Game.date, Game.time, Game.game_id).filter(
+        Game.court_id.in_(list(distances))
+    ).all()
+    if query:
+        court_of = {game_id: court_id for court_id, _, _, game_id in keys}
+        ranked = [item for item in get_text_search().search_games(query) if item[0] in court_of]
+        page, next_cursor = paginate_sorted(ranked, after, limit, lambda item: (-item[1], item[0]))
+        page = [(game_id, distances[court_of[game_id]]) for game_id, _ in page]
+    else:
+        # Rank by distance, then start time
+        ranked = sorted((distances[court_id], date, time, game_id) for court_id, date, time, game_id in keys)
+        page, next_cursor = paginate_sorted(ranked, after, limit, lambda key: key)
+        page = [(key[3], key[0]) for key in page]
+    return games_with_distance(page, fields), next_cursor, 'location_radius'
+
+def search(kind, fallback, distance_types, geo_order=(), geo_types=()):
+    """
+    Shared handler for the court and game search endpoints.
+
+    Text queries, location radius searches and both combined go to
+    Elasticsearch when it's available, and to the in-process indexes when
+    it isn't or the query fails.
+    """
+    query = request.args.get('q', '')
+    try:
+        geo = location_args()
+    except (ValueError, TypeError) as e:
+        return jsonify({'message': f'Invalid location parameters: {str(e)}'}), 400
+    if geo is None and not query:
         return jsonify({'message': 'Search query is required for text search'}), 400
-    
-    es = get_elasticsearch_client()
-    if not es:
-        # Fallback to database search if Elasticsearch is not configured
-        games = Game.query.join(Court).filter(
-            (Game.skill_level.ilike(f'%{query}%')) | 
-            (Game.notes.ilike(f'%{query}%')) | 
-            (Court.name.ilike(f'%{query}%'))
-        ).all()
-        return jsonify({
-            'games': [game.to_dict() for game in games],
-            'search_method': 'database',
-            'message': 'Elasticsearch not available, using database search'
-        }), 200
-    
+
+    id_field = 'court_id' if kind == 'courts' else 'game_id'
     try:
-        # Search in Elasticsearch
-        index = current_app.config.get('ELASTICSEARCH_INDEX', 'pickleball_dev')
-        response = es.search(
-            index=f"{index}_games",
-            body={
-                "query": {
-                    "multi_match": {
-                        "query": query,
-                        "fields": ["court_name^2", "skill_level", "notes", "status"]
-                    }
-                }
-            }
-        )
-        
-        # Extract results
-        hits = response['hits']['hits']
-        game_ids = [hit['_source']['game_id'] for hit in hits]
-        
-        # Get full game objects from database
-        games = Game.query.filter(Game.game_id.in_(game_ids)).all()
-        
-        # Sort games to match Elasticsearch ranking
-        sorted_games = []
-        for game_id in game_ids:
-            for game in games:
-                if game.game_id == game_id:
-                    sorted_games.append(game)
-                    break
-        
-        return jsonify({
-            'games': [game.to_dict() for game in sorted_games],
-            'search_method': 'elasticsearch'
-        }), 200
-    except Exception as e:
-        # Fallback to database search if Elasticsearch fails
-        games = Game.query.join(Court).filter(
-            (Game.skill_level.ilike(f'%{query}%')) | 
-            (Game.notes.ilike(f'%{query}%')) | 
-            (Court.name.ilike(f'%{query}%'))
-        ).all()
-        return jsonify({
-            'games': [game.to_dict() for game in games],
-            'search_method': 'database',
-            'error': str(e),
-            'message': 'Elasticsearch query failed, using database search'
-        }), 200 
\ No newline at end of file
+        fields = field_args(Court if kind == 'courts' else Game)
+        limit = page_limit()
+        backend, cursor = split_cursor(request.args.get('cursor'), (ES_CURSOR, LOCAL_CURSOR))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    # A page after the first comes from the backend that served the first,
+    # so ranking and cursor format stay the same throughout
+    es = get_elasticsearch_client() if backend != LOCAL_CURSOR else None
+    if backend == ES_CURSOR and es is None:
+        return restart_search()
+    try:
+        if es:
+            after = decode_cursor(cursor, es_cursor_types(query, geo, geo_types))
+        else:
+            after = decode_cursor(cursor, fallback_cursor_types(query, geo, distance_types))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    response = {}
+    if geo:
+        response['params'] = {'lat': geo[0], 'lng': geo[1], 'radius': geo[2]}
+        if query:
+            response['params']['q'] = query
+
+    if es:
+        try:
+            search_fields = COURT_SEARCH_FIELDS if kind == 'courts' else GAME_SEARCH_FIELDS
+            body = search_body(query, search_fields, id_field, geo, geo_order)
+            hits, next_cursor = elasticsearch_page(es, index_alias(kind), body, limit, after)
+            if kind == 'courts':
+                results = elasticsearch_results(hits, id_field, query, geo, court_query(fields), Court.court_id, fields)
+            else:
+                results = elasticsearch_results(
+                    hits, id_field, query, geo, Game.query_with_details(fields), Game.game_id, fields
+                )
+            response.update({kind: results, 'next_cursor': tag_cursor(next_cursor, ES_CURSOR),
+                             'search_method': 'elasticsearch'})
+            return jsonify(response), 200
+        except Exception as e:
+            if after is not None:
+                # The in-process search can't continue an Elasticsearch ranking
+                return restart_search(str(e))
+            # Fall back to the in-process search for the first page
+            results, next_cursor, search_method = fallback(query, geo, limit, None, fields)
+            response.update({kind: results, 'next_cursor': tag_cursor(next_cursor, LOCAL_CURSOR),
+                             'search_method': search_method, 'error': str(e)})
+            if kind == 'games':
+                response['message'] = f'Elasticsearch query failed, using {search_method} search'
+            return jsonify(response), 200
+
+    results, next_cursor, search_method = fallback(query, geo, limit, after, fields)
+    response.update({kind: results, 'next_cursor': tag_cursor(next_cursor, LOCAL_CURSOR),
+                     'search_method': search_method})
+    if kind == 'games' and not geo:
+        response['message'] = f'Elasticsearch not available, using {search_method} search'
+    return jsonify(response), 200
+
+def restart_search(error=None):
+    """503 for a cursor from Elasticsearch while it's unavailable: the client has to start over"""
+    response = {'message': 'Elasticsearch, which issued this cursor, is unavailable. '
+                           'Search again without a cursor', 'restart': True}
+    if error:
+        response['error'] = error
+    return jsonify(response), 503
+
+@search_bp.route('/courts', methods=['GET'])
+def search_courts():
+    """Search for courts by text, location radius or both"""
+    return search('courts', fallback_court_search, DISTANCE_CURSOR_TYPES)
+
+@search_bp.route('/courts/suggest', methods=['GET'])
+def suggest_courts():
+    """Court name typeahead: ids, names and locations only"""
+    prefix = request.args.get('prefix', '')
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({'message': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, current_app.config.get('SUGGEST_MAX_LIMIT', 25)))
+
+    suggestions = get_suggest_index().suggest(prefix, limit)
+    return jsonify({
+        'suggestions': [
+            {'court_id': court_id, 'name': name, 'location': {'lat': lat, 'lng': lng}}
+            for court_id, name, lat, lng in suggestions
+        ]
+    }), 200
+
+@search_bp.route('/courts/nearest', methods=['GET'])
+def nearest_courts():
+    """Find the k courts closest to a location"""
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+        k = int(request.args.get('k', 10))
+    except KeyError:
+        return jsonify({'message': 'lat and lng are required'}), 400
+    except (ValueError, TypeError) as e:
+        return jsonify({'message': f'Invalid location parameters: {str(e)}'}), 400
+    try:
+        fields = field_args(Court)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    if k < 1:
+        return jsonify({'message': 'k must be a positive integer'}), 400
+    k = min(k, current_app.config.get('NEAREST_COURTS_MAX_K', 100))
+
+    # The k nearest court ids, nearest first
+    nearest = k_nearest_courts(lat, lng, k)
+
+    return jsonify({
+        'courts': courts_with_distance(nearest, fields),
+        'search_method': 'nearest',
+        'params': {
+            'lat': lat,
+            'lng': lng,
+            'k': k
+        }
+    }), 200
+
+@search_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters of the location search cache, for tuning GEO_CACHE_PRECISION"""
+    cache = get_geo_cache()
+    if cache is None:
+        return jsonify({'enabled': False}), 200
+    return jsonify(dict(cache.stats(), enabled=True)), 200
+
+@search_bp.route('/games', methods=['GET'])
+def search_games():
+    """Search for games by text, location radius or both"""
+    # Elasticsearch returns dates as epoch milliseconds and times as keywords
+    return search('games', fallback_game_search, GAME_DISTANCE_CURSOR_TYPES, GAME_GEO_ORDER, (int, str))
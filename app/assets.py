@@ -0,0 +1,75 @@
+from flask import current_app, url_for
+from app.compression import ENCODINGS, SUFFIXES, compress
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+# Static files that get a content-hashed, precompressed copy
+ASSET_EXTENSIONS = ('.js', '.css')
+
+def build_dir(app):
+    """Directory the asset build writes to and /assets serves from"""
+    return app.config.get('ASSETS_BUILD_DIR') or os.path.join(app.static_folder, 'dist')
+
+def build_assets(static_dir, out_dir, encodings=ENCODINGS):
+    """
+    Copy each static JS and CSS file to out_dir under a name that includes
+    a hash of its content, next to .gz (and .br) versions compressed at
+    the highest level, and write a manifest from original to hashed name.
+    Returns the manifest.
+    """
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        # Don't pick up a previous build inside the static folder
+        dirs[:] = [name for name in dirs if os.path.abspath(os.path.join(root, name)) != os.path.abspath(out_dir)]
+        for name in sorted(files):
+            if not name.endswith(ASSET_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            logical = os.path.relpath(path, static_dir).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                data = f.read()
+
+            stem, extension = os.path.splitext(logical)
+            hashed = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}'
+            target = os.path.join(out_dir, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+            for encoding in encodings:
+                with open(target + SUFFIXES[encoding], 'wb') as f:
+                    f.write(compress(data, encoding, level=9))
+            manifest[logical] = hashed
+
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+def load_manifest(app):
+    """The asset manifest from the last build, or an empty one if there was none"""
+    path = os.path.join(build_dir(app), MANIFEST)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        logger.warning(f"Ignoring unreadable asset manifest {path}: {str(e)}")
+        return {}
+
+def asset_url(filename):
+    """URL of a static file: its hashed build when there is one, else the plain static URL"""
+    hashed = current_app.extensions.get('asset_manifest', {}).get(filename)
+    if hashed:
+        return url_for('frontend.asset', filename=hashed)
+    return url_for('static', filename=filename)
+
+def init_assets(app):
+    """Load the asset manifest and make asset_url available to templates"""
+    app.extensions['asset_manifest'] = load_manifest(app)
+    app.add_template_global(asset_url)
@@ -0,0 +1,68 @@
+from flask import request
+import gzip
+
+try:
+    import brotli
+except ImportError:  # Optional: without it responses are only gzipped
+    brotli = None
+
+# Content codings, in order of preference when the client accepts several equally
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+def compress(data, encoding, level=6):
+    """data compressed with a content coding from ENCODINGS"""
+    if encoding == 'br':
+        # Brotli quality runs 0-11; scale the gzip-style 1-9 level onto it
+        return brotli.compress(data, quality=min(11, round(level * 11 / 9)))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def negotiate(available=ENCODINGS):
+    """The best content coding in available the request accepts, or None"""
+    accepted = request.accept_encodings
+    best, best_quality = None, 0
+    for encoding in available:
+        quality = accepted[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def etag_variants(etag):
+    """
+    The tag plus the tags of its compressed representations. A strong ETag
+    must differ between content codings, so compressed responses carry
+    the original tag with the coding appended.
+    """
+    return [etag] + [f'{etag}-{encoding}' for encoding in ENCODINGS]
+
+def init_compression(app):
+    """
+    Compress responses with gzip or brotli, negotiated with Accept-Encoding,
+    when COMPRESS_ENABLED is on. Only bodies of at least COMPRESS_MIN_SIZE
+    bytes with a COMPRESS_MIMETYPES type are compressed.
+    """
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+
+    min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+    mimetypes = set(app.config.get('COMPRESS_MIMETYPES', ['application/json']))
+    level = app.config.get('COMPRESS_LEVEL', 6)
+
+    @app.after_request
+    def compress_response(response):
+        response.vary.add('Accept-Encoding')
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers or response.mimetype not in mimetypes):
+            return response
+
+        data = response.get_data()
+        encoding = negotiate()
+        if encoding is None or len(data) < min_size:
+            return response
+
+        response.set_data(compress(data, encoding, level))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f'{etag}-{encoding}')
+        return response
@@ -2,4 +2,5 @@
 from app.models.user import User
 from app.models.court import Court
 from app.models.game import Game, GameParticipant
-from app.models.chat import ChatMessage 
\ No newline at end of file
+from app.models.chat import ChatMessage
+from app.models.outbox import SearchOutbox
\ No newline at end of file
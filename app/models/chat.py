@@ -4,6 +4,10 @@ from app import db
 class ChatMessage(db.Model):
     """Chat message model for game-specific chat"""
     __tablename__ = 'chat_messages'
+    __table_args__ = (
+        # A game's messages in order
+        db.Index('ix_chat_messages_game_id_timestamp', 'game_id', 'timestamp'),
+    )
 
     message_id = db.Column(db.Integer, primary_key=True)
     game_id = db.Column(db.Integer, db.ForeignKey('games.game_id'), nullable=False)
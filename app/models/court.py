@@ -1,10 +1,37 @@
 from datetime import datetime
+from functools import lru_cache
+from sqlalchemy.orm import load_only
 import json
 from app import db
 
+@lru_cache(maxsize=8192)
+def _parse_json(raw):
+    return json.loads(raw)
+
+def _copy_json(value):
+    if isinstance(value, dict):
+        return {key: _copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(item) for item in value]
+    return value
+
+def decode_json(raw):
+    """
+    Decoded value of a JSON text column.
+
+    Parsing is memoized on the stored text, so a row is parsed again only
+    after that column changes. Each caller gets its own copy of the parsed
+    value, which is cheaper than parsing and safe to modify.
+    """
+    return _copy_json(_parse_json(raw))
+
 class Court(db.Model):
     """Court model for storing pickleball court details"""
     __tablename__ = 'courts'
+    __table_args__ = (
+        db.Index('ix_courts_lat_lng', 'lat', 'lng'),
+        db.Index('ix_courts_name_court_id', 'name', 'court_id'),
+    )
 
     court_id = db.Column(db.Integer, primary_key=True)
     uuid = db.Column(db.String(36), unique=True, nullable=False)  # Original ID from courts.json
@@ -52,30 +79,46 @@ class Court(db.Model):
         self.number_of_courts = number_of_courts
         self.reviews = json.dumps(reviews) if reviews else None
     
-    def to_dict(self):
-        """Convert court object to dictionary"""
-        return {
-            'court_id': self.court_id,
-            'uuid': self.uuid,
-            'place_id': self.place_id,
-            'name': self.name,
-            'address': self.address,
-            'phone': self.phone,
-            'website': self.website,
-            'location': {
-                'lat': self.lat,
-                'lng': self.lng
-            } if self.lat and self.lng else None,
-            'rating': self.rating,
-            'total_ratings': self.total_ratings,
-            'hours': json.loads(self.hours) if self.hours else None,
-            'photos': json.loads(self.photos) if self.photos else None,
-            'court_type': self.court_type,
-            'surface_type': self.surface_type,
-            'amenities': json.loads(self.amenities) if self.amenities else None,
-            'number_of_courts': self.number_of_courts,
-            'reviews': json.loads(self.reviews) if self.reviews else None
-        }
+    # Serialized fields: the columns each one reads and how it's computed
+    FIELDS = {
+        'court_id': (('court_id',), lambda court: court.court_id),
+        'uuid': (('uuid',), lambda court: court.uuid),
+        'place_id': (('place_id',), lambda court: court.place_id),
+        'name': (('name',), lambda court: court.name),
+        'address': (('address',), lambda court: court.address),
+        'phone': (('phone',), lambda court: court.phone),
+        'website': (('website',), lambda court: court.website),
+        'location': (('lat', 'lng'), lambda court: {
+            'lat': court.lat,
+            'lng': court.lng
+        } if court.lat and court.lng else None),
+        'rating': (('rating',), lambda court: court.rating),
+        'total_ratings': (('total_ratings',), lambda court: court.total_ratings),
+        'hours': (('hours',), lambda court: decode_json(court.hours) if court.hours else None),
+        'photos': (('photos',), lambda court: decode_json(court.photos) if court.photos else None),
+        'court_type': (('court_type',), lambda court: court.court_type),
+        'surface_type': (('surface_type',), lambda court: court.surface_type),
+        'amenities': (('amenities',), lambda court: decode_json(court.amenities) if court.amenities else None),
+        'number_of_courts': (('number_of_courts',), lambda court: court.number_of_courts),
+        'reviews': (('reviews',), lambda court: decode_json(court.reviews) if court.reviews else None)
+    }
+    # Enough to place a court on the map
+    SUMMARY_FIELDS = ('court_id', 'name', 'location')
+
+    @classmethod
+    def columns_for(cls, fields):
+        """Column attributes a to_dict limited to fields reads"""
+        columns = {column for field in fields for column in cls.FIELDS[field][0]}
+        return [getattr(cls, column) for column in sorted(columns)]
+
+    @classmethod
+    def load_only(cls, fields):
+        """Loader option that leaves every column but those behind fields unread"""
+        return load_only(*cls.columns_for(fields))
+
+    def to_dict(self, fields=None):
+        """Convert court object to dictionary, with only the given fields if any"""
+        return {field: self.FIELDS[field][1](self) for field in (fields or self.FIELDS)}
     
     def __repr__(self):
         return f'<Court {self.name}>' 
\ No newline at end of file
@@ -1,16 +1,29 @@
 from datetime import datetime
+from sqlalchemy import event, update
+from sqlalchemy.orm import contains_eager, load_only, selectinload
 from app import db
 
+class GameFullError(Exception):
+    """Raised when a participant is added to a game with no free places"""
+
 class Game(db.Model):
     """Game model for scheduling pickleball games"""
     __tablename__ = 'games'
+    __table_args__ = (
+        # Game lists: status filter, keyset order by (date, time, game_id)
+        db.Index('ix_games_status_date_time', 'status', 'date', 'time', 'game_id'),
+        # Games at a court, optionally on a date
+        db.Index('ix_games_court_id_date', 'court_id', 'date'),
+    )
 
     game_id = db.Column(db.Integer, primary_key=True)
     court_id = db.Column(db.Integer, db.ForeignKey('courts.court_id'), nullable=False)
     creator_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
     date = db.Column(db.Date, nullable=False)
     time = db.Column(db.Time, nullable=False)
-    max_players = db.Column(db.Integer, default=4)
+    max_players = db.Column(db.Integer, nullable=False, default=4, server_default='4')
+    # Number of game_participants rows, maintained by the participant insert/delete listeners below
+    current_players = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     skill_level = db.Column(db.String(20), nullable=True)  # beginner, intermediate, advanced
     status = db.Column(db.String(20), default='scheduled')  # scheduled, cancelled, completed
     notes = db.Column(db.Text, nullable=True)
@@ -30,27 +43,84 @@ class Game(db.Model):
         self.skill_level = skill_level
         self.notes = notes
     
-    def to_dict(self, include_participants=True):
-        """Convert game object to dictionary"""
-        game_dict = {
-            'game_id': self.game_id,
-            'court_id': self.court_id,
-            'creator_id': self.creator_id,
-            'date': self.date.isoformat() if self.date else None,
-            'time': self.time.isoformat() if self.time else None,
-            'max_players': self.max_players,
-            'skill_level': self.skill_level,
-            'status': self.status,
-            'notes': self.notes,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'scheduled_time': f"{self.date.isoformat()}T{self.time.isoformat()}" if self.date and self.time else None
-        }
+    # Serialized fields: the columns each one reads and how it's computed.
+    # court is only part of sparse representations, as the court summary.
+    FIELDS = {
+        'game_id': (('game_id',), lambda game: game.game_id),
+        'court_id': (('court_id',), lambda game: game.court_id),
+        'creator_id': (('creator_id',), lambda game: game.creator_id),
+        'date': (('date',), lambda game: game.date.isoformat() if game.date else None),
+        'time': (('time',), lambda game: game.time.isoformat() if game.time else None),
+        'max_players': (('max_players',), lambda game: game.max_players),
+        'current_players': (('current_players',), lambda game: game.current_players),
+        'skill_level': (('skill_level',), lambda game: game.skill_level),
+        'status': (('status',), lambda game: game.status),
+        'notes': (('notes',), lambda game: game.notes),
+        'created_at': (('created_at',), lambda game: game.created_at.isoformat() if game.created_at else None),
+        'scheduled_time': (('date', 'time'), lambda game: (
+            f"{game.date.isoformat()}T{game.time.isoformat()}" if game.date and game.time else None
+        )),
+        'participants': ((), lambda game: [p.to_dict(include_game=False) for p in game.participants]),
+        # Also a players field for compatibility with the frontend; to_dict
+        # serializes the participants once when both are asked for
+        'players': ((), lambda game: [p.to_dict(include_game=False) for p in game.participants]),
+        'court': ((), lambda game: game.court.to_dict(game.court.SUMMARY_FIELDS) if game.court else None)
+    }
+    SUMMARY_FIELDS = (
+        'game_id', 'court_id', 'date', 'time', 'scheduled_time', 'status', 'max_players', 'current_players', 'court'
+    )
+    PARTICIPANT_ALIASES = {'participants': 'players', 'players': 'participants'}
+    FULL_FIELDS = tuple(field for field in FIELDS if field != 'court')
+    BASE_FIELDS = tuple(field for field in FULL_FIELDS if field not in ('participants', 'players'))
+    
+    @classmethod
+    def query_with_details(cls, fields=None):
+        """
+        Query games joined to their court, with court and participants
+        loaded up front so serializing a list costs a constant number of
+        queries. Filters on Court columns can be added directly.
         
-        if include_participants:
-            game_dict['participants'] = [p.to_dict(include_game=False) for p in self.participants]
-            # Also add a players field for compatibility with the frontend
-            game_dict['players'] = game_dict['participants']
+        With fields, only the columns a to_dict limited to them reads are
+        loaded, plus the court summary, and participants only if needed.
+        """
+        if fields is None:
+            return cls.query.join(cls.court).options(
+                contains_eager(cls.court),
+                selectinload(cls.participants)
+            )
         
+        court = cls.court.property.mapper.class_
+        columns = {column for field in fields for column in cls.FIELDS[field][0]} | {'court_id'}
+        options = [
+            load_only(*[getattr(cls, column) for column in sorted(columns)]),
+            # lat/lng are part of the summary, which search results also need for court_location
+            contains_eager(cls.court).load_only(*court.columns_for(court.SUMMARY_FIELDS))
+        ]
+        if 'participants' in fields or 'players' in fields:
+            options.append(selectinload(cls.participants))
+        return cls.query.join(cls.court).options(*options)
+    
+    @classmethod
+    def scheduled_at_court(cls, court_id, from_date):
+        """
+        Scheduled games at a court from from_date on, in (date, time,
+        game_id) order. Served by ix_games_court_id_date.
+        """
+        return cls.query.filter(
+            cls.court_id == court_id, cls.status == 'scheduled', cls.date >= from_date
+        ).order_by(cls.date, cls.time, cls.game_id)
+    
+    def to_dict(self, include_participants=True, fields=None):
+        """Convert game object to dictionary, with only the given fields if any"""
+        if fields is None:
+            fields = self.FULL_FIELDS if include_participants else self.BASE_FIELDS
+        game_dict = {}
+        for field in fields:
+            alias = self.PARTICIPANT_ALIASES.get(field)
+            if alias in game_dict:
+                game_dict[field] = [dict(participant) for participant in game_dict[alias]]
+            else:
+                game_dict[field] = self.FIELDS[field][1](self)
         return game_dict
     
     def __repr__(self):
@@ -60,6 +130,10 @@ class Game(db.Model):
 class GameParticipant(db.Model):
     """Model for tracking participants in a game"""
     __tablename__ = 'game_participants'
+    __table_args__ = (
+        # The primary key leads with game_id; this serves lookups by player
+        db.Index('ix_game_participants_user_id', 'user_id'),
+    )
 
     game_id = db.Column(db.Integer, db.ForeignKey('games.game_id'), primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), primary_key=True)
@@ -82,4 +156,30 @@ class GameParticipant(db.Model):
         return participant_dict
     
     def __repr__(self):
-        return f'<GameParticipant game_id={self.game_id}, user_id={self.user_id}>' 
\ No newline at end of file
+        return f'<GameParticipant game_id={self.game_id}, user_id={self.user_id}>' 
+
+_games = Game.__table__
+
+@event.listens_for(GameParticipant, 'after_insert')
+def _take_place(mapper, connection, target):
+    """
+    Count a new participant with one conditional UPDATE. The row lock it
+    takes serializes concurrent joins, and a game that is already full
+    matches no row, so places can't be overbooked or lost.
+    """
+    result = connection.execute(
+        update(_games)
+        .where(_games.c.game_id == target.game_id, _games.c.current_players < _games.c.max_players)
+        .values(current_players=_games.c.current_players + 1, updated_at=datetime.utcnow())
+    )
+    if result.rowcount == 0:
+        raise GameFullError(f'Game {target.game_id} is already full')
+
+@event.listens_for(GameParticipant, 'after_delete')
+def _free_place(mapper, connection, target):
+    """Give a departing participant's place back"""
+    connection.execute(
+        update(_games)
+        .where(_games.c.game_id == target.game_id, _games.c.current_players > 0)
+        .values(current_players=_games.c.current_players - 1, updated_at=datetime.utcnow())
+    )
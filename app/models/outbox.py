@@ -0,0 +1,18 @@
+from datetime import datetime
+from app import db
+
+class SearchOutbox(db.Model):
+    """Pending search index update, written in the same transaction as the change"""
+    __tablename__ = 'search_outbox'
+
+    outbox_id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # courts, games
+    doc_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # index, delete
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Failed syncs are retried with backoff instead of being dropped
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    next_attempt_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<SearchOutbox {self.op} {self.kind}/{self.doc_id}>'
@@ -0,0 +1,87 @@
+import numpy as np
+
+# Mean radius of the earth in kilometers
+EARTH_RADIUS_KM = 6371
+
+def haversine(lat, lng, lats, lngs):
+    """
+    Vectorized Haversine distance in kilometers.
+
+    All arguments are in decimal degrees and broadcast against each other,
+    so a (m, 1) column of query points against (n,) court arrays gives an
+    (m, n) distance matrix.
+    """
+    lat, lng, lats, lngs = map(np.radians, (lat, lng, lats, lngs))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+class CourtCoordinates:
+    """
+    Court ids and coordinates in contiguous NumPy arrays.
+
+    Rows are sorted by grid cell so every cell is a contiguous slice;
+    a query computes distances for the slices it needs in one pass.
+    """
+
+    def __init__(self, positions, cell_of):
+        """
+        positions: {court_id: (lat, lng)}
+        cell_of: function mapping (lat, lng) to a hashable grid cell
+        """
+        items = sorted(positions.items(), key=lambda item: cell_of(*item[1]))
+        self.ids = np.fromiter((court_id for court_id, _ in items), dtype=np.int64, count=len(items))
+        self.lats = np.fromiter((lat for _, (lat, _lng) in items), dtype=np.float64, count=len(items))
+        self.lngs = np.fromiter((lng for _, (_lat, lng) in items), dtype=np.float64, count=len(items))
+
+        # cell -> (start, stop) slice into the arrays
+        self.slices = {}
+        for position, (_, (lat, lng)) in enumerate(items):
+            cell = cell_of(lat, lng)
+            start, _stop = self.slices.get(cell, (position, position))
+            self.slices[cell] = (start, position + 1)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows_for_cells(self, cells):
+        """Array of row positions covering the given cells"""
+        ranges = [np.arange(*self.slices[cell]) for cell in cells if cell in self.slices]
+        if not ranges:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(ranges)
+
+    def within_radius(self, lat, lng, radius_km, rows=None):
+        """Return (ids, distances) within radius_km of a point, nearest first"""
+        ids, lats, lngs = self.ids, self.lats, self.lngs
+        if rows is not None:
+            ids, lats, lngs = ids[rows], lats[rows], lngs[rows]
+
+        distances = haversine(lat, lng, lats, lngs)
+        mask = distances <= radius_km
+        ids, distances = ids[mask], distances[mask]
+        order = np.argsort(distances, kind='stable')
+        return ids[order], distances[order]
+
+    def batch_distances(self, lats, lngs):
+        """(m, n) matrix of distances from m query points to every court"""
+        lats = np.asarray(lats, dtype=np.float64)[:, np.newaxis]
+        lngs = np.asarray(lngs, dtype=np.float64)[:, np.newaxis]
+        return haversine(lats, lngs, self.lats, self.lngs)
+
+    def batch_within_radius(self, points, radius_km, chunk_size=256):
+        """
+        Radius query for many points at once.
+
+        Returns one (ids, distances) pair per point, nearest first. Points
+        are processed in chunks to bound the size of the distance matrix.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        results = []
+        for start in range(0, len(points), chunk_size):
+            chunk = points[start:start + chunk_size]
+            matrix = self.batch_distances(chunk[:, 0], chunk[:, 1])
+            for distances in matrix:
+                rows = np.flatnonzero(distances <= radius_km)
+                order = rows[np.argsort(distances[rows], kind='stable')]
+                results.append((self.ids[order], distances[order]))
+        return results
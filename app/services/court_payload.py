@@ -0,0 +1,100 @@
+from flask import Response, current_app
+from app.models.court import Court
+from app.services import model_changes
+import threading
+
+class CourtPayloadCache:
+    """
+    Ready-encoded JSON for each court, keyed by (court_id, updated_at).
+
+    Court.updated_at is bumped by its onupdate on every ORM write, so a
+    row loaded after a change no longer matches its cached version and is
+    encoded again. Entries for changed or deleted courts are also dropped
+    after commit so the cache doesn't hold dead versions.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def fragment(self, court):
+        """JSON bytes of court.to_dict()"""
+        key = court.court_id
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == court.updated_at:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        encoded = encode(court.to_dict())
+        with self._lock:
+            self._entries[key] = (court.updated_at, encoded)
+        return encoded
+
+    def discard(self, court_ids):
+        with self._lock:
+            for court_id in court_ids:
+                self._entries.pop(court_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def encode(value):
+    """JSON bytes of a value, encoded the way jsonify would"""
+    return current_app.json.dumps(value).encode('utf-8')
+
+def json_object(values, fragments=None):
+    """
+    JSON bytes of an object made of plain values plus members that are
+    already encoded: fragments is {key: bytes}.
+    """
+    return json_extend(encode(values), fragments)
+
+def json_extend(encoded, fragments):
+    """JSON bytes of an already encoded object with the members in fragments added"""
+    if not fragments:
+        return encoded
+    members = b','.join(encode(key) + b':' + fragment for key, fragment in fragments.items())
+    if encoded == b'{}':
+        return b'{' + members + b'}'
+    return encoded[:-1] + b',' + members + b'}'
+
+def json_array(fragments):
+    """JSON bytes of an array of already encoded items"""
+    return b'[' + b','.join(fragments) + b']'
+
+def json_response(body, status=200):
+    """Response for JSON bytes built from fragments"""
+    return Response(body, status=status, mimetype=current_app.json.mimetype)
+
+def init_court_payload_cache(app):
+    """Create the court payload cache for an app when COURT_PAYLOAD_CACHE_ENABLED is on"""
+    if not app.config.get('COURT_PAYLOAD_CACHE_ENABLED', True):
+        return None
+    cache = CourtPayloadCache()
+    app.extensions['court_payload_cache'] = cache
+    return cache
+
+def court_fragment(court, fields=None):
+    """JSON bytes of a court, from the cache when it's enabled and all fields are wanted"""
+    if court is None:
+        return b'null'
+    if fields is not None:
+        return encode(court.to_dict(fields))
+    cache = current_app.extensions.get('court_payload_cache')
+    if cache is None:
+        return encode(court.to_dict())
+    return cache.fragment(court)
+
+def _court_changes(changes):
+    cache = current_app.extensions.get('court_payload_cache')
+    if cache is not None:
+        cache.discard(values['court_id'] for _, values in changes)
+
+model_changes.subscribe(Court, _court_changes)
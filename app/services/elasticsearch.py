@@ -1,94 +1,231 @@
 from flask import current_app
 from elasticsearch import Elasticsearch
-from elasticsearch.exceptions import NotFoundError, ConnectionError
+from elasticsearch.exceptions import NotFoundError, TransportError
+from datetime import datetime
+from app.services.es_search import location
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
-def get_elasticsearch_client():
-    """Get Elasticsearch client with authentication"""
-    es_url = current_app.config.get('ELASTICSEARCH_URL')
-    es_username = current_app.config.get('ELASTICSEARCH_USERNAME')
-    es_password = current_app.config.get('ELASTICSEARCH_PASSWORD')
+_client_lock = threading.Lock()
+
+class CircuitBreaker:
+    """
+    Stops calling a failing service for a while.
+
+    After failure_threshold consecutive failures the breaker opens and
+    allow() returns False for reset_seconds. Then one trial call is let
+    through per window until a success closes the breaker again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        """Whether a call may be made now"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            # Half-open: restart the window so only this call is a trial
+            self.opened_at = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Elasticsearch failed {self.failures} times, skipping it "
+                                   f"for {self.reset_seconds}s")
+                self.opened_at = time.monotonic()
+
+def _create_client(app):
+    es_url = app.config.get('ELASTICSEARCH_URL')
+    es_username = app.config.get('ELASTICSEARCH_USERNAME')
+    es_password = app.config.get('ELASTICSEARCH_PASSWORD')
     
     if not es_url:
         logger.warning("Elasticsearch URL not configured")
         return None
     
     try:
-        client = Elasticsearch(
+        # Creating the client doesn't connect; connections are pooled per node
+        return Elasticsearch(
             es_url,
             basic_auth=(es_username, es_password) if es_username and es_password else None,
-            verify_certs=True
+            verify_certs=True,
+            request_timeout=app.config.get('ELASTICSEARCH_TIMEOUT', 2),
+            max_retries=app.config.get('ELASTICSEARCH_MAX_RETRIES', 1),
+            retry_on_timeout=True,
+            connections_per_node=app.config.get('ELASTICSEARCH_POOL_SIZE', 10)
         )
-        # Test connection
-        if not client.ping():
-            logger.warning("Could not connect to Elasticsearch")
-            return None
-        return client
     except Exception as e:
-        logger.warning(f"Error connecting to Elasticsearch: {e}")
+        logger.warning(f"Error creating Elasticsearch client: {e}")
         return None
 
+def _client_state():
+    """The (client, breaker) pair shared by every request in this worker"""
+    app = current_app._get_current_object()
+    state = app.extensions.get('elasticsearch')
+    if state is None:
+        with _client_lock:
+            state = app.extensions.get('elasticsearch')
+            if state is None:
+                breaker = CircuitBreaker(
+                    app.config.get('ELASTICSEARCH_BREAKER_THRESHOLD', 5),
+                    app.config.get('ELASTICSEARCH_BREAKER_RESET_SECONDS', 30)
+                )
+                state = app.extensions['elasticsearch'] = (_create_client(app), breaker)
+    return state
+
+def get_elasticsearch_client():
+    """
+    Get the pooled Elasticsearch client, or None when it isn't configured
+    or the circuit breaker is open after repeated failures. Callers report
+    the outcome with elasticsearch_succeeded() / elasticsearch_failed().
+    """
+    client, breaker = _client_state()
+    if client is None or not breaker.allow():
+        return None
+    return client
+
+def elasticsearch_succeeded():
+    """Record a completed Elasticsearch call"""
+    _client_state()[1].record_success()
+
+def elasticsearch_failed(error):
+    """Record a failed Elasticsearch call; only outages count toward the breaker"""
+    if isinstance(error, TransportError) or getattr(error, 'status_code', 0) >= 500:
+        _client_state()[1].record_failure()
+    else:
+        # Elasticsearch answered, e.g. with a bad request
+        _client_state()[1].record_success()
+
+COURT_MAPPING = {
+    "properties": {
+        "court_id": {"type": "integer"},
+        "uuid": {"type": "keyword"},
+        "name": {"type": "text", "analyzer": "english"},
+        "address": {"type": "text", "analyzer": "english"},
+        "court_type": {"type": "keyword"},
+        "surface_type": {"type": "keyword"},
+        "amenities": {"type": "text", "analyzer": "english"},
+        "rating": {"type": "float"},
+        "number_of_courts": {"type": "integer"},
+        "location": {"type": "geo_point"},
+        # Serialized API response, stored but not searched
+        "payload": {"type": "object", "enabled": False}
+    }
+}
+
+GAME_MAPPING = {
+    "properties": {
+        "game_id": {"type": "integer"},
+        "court_id": {"type": "integer"},
+        "court_name": {"type": "text", "analyzer": "english"},
+        "date": {"type": "date"},
+        "time": {"type": "keyword"},
+        "skill_level": {"type": "keyword"},
+        "status": {"type": "keyword"},
+        "notes": {"type": "text", "analyzer": "english"},
+        "max_players": {"type": "integer"},
+        "current_players": {"type": "integer"},
+        # Location of the game's court
+        "location": {"type": "geo_point"},
+        "payload": {"type": "object", "enabled": False}
+    }
+}
+
+MAPPINGS = {'courts': COURT_MAPPING, 'games': GAME_MAPPING}
+
+def index_alias(kind):
+    """Name searches and writes use for 'courts' or 'games'; an alias of a versioned index"""
+    index_prefix = current_app.config.get('ELASTICSEARCH_INDEX', 'pickleball_dev')
+    return f"{index_prefix}_{kind}"
+
+def create_versioned_index(es, kind, settings=None):
+    """Create a new timestamped index for kind and return its name"""
+    index = f"{index_alias(kind)}_{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}"
+    es.indices.create(index=index, mappings=MAPPINGS[kind], settings=settings)
+    logger.info(f"Created Elasticsearch index: {index}")
+    return index
+
+def court_document(court):
+    """Elasticsearch document for a court"""
+    doc = {
+        "court_id": court.court_id,
+        "uuid": court.uuid,
+        "name": court.name,
+        "address": court.address,
+        "court_type": court.court_type,
+        "surface_type": court.surface_type,
+        "amenities": court.amenities,  # This is a JSON string, might need parsing
+        "rating": court.rating,
+        "number_of_courts": court.number_of_courts,
+        "location": location(court.lat, court.lng)
+    }
+    if current_app.config.get('ELASTICSEARCH_SOURCE_ONLY'):
+        # Searches can then answer from _source without a database round trip
+        doc["payload"] = court.to_dict()
+    return doc
+
+def game_document(game):
+    """Elasticsearch document for a game"""
+    # Get court name for better search
+    court_name = game.court.name if game.court else "Unknown Court"
+    
+    doc = {
+        "game_id": game.game_id,
+        "court_id": game.court_id,
+        "court_name": court_name,
+        "date": game.date.isoformat() if game.date else None,
+        "time": game.time.isoformat() if game.time else None,
+        "skill_level": game.skill_level,
+        "status": game.status,
+        "notes": game.notes,
+        "max_players": game.max_players,
+        "current_players": game.current_players,
+        "location": location(game.court.lat, game.court.lng) if game.court else None
+    }
+    if current_app.config.get('ELASTICSEARCH_SOURCE_ONLY'):
+        doc["payload"] = game.to_dict()
+    return doc
+
 def create_indices():
-    """Create Elasticsearch indices if they don't exist"""
+    """Create the court and game indices, behind their aliases, if they don't exist"""
     es = get_elasticsearch_client()
     if not es:
         logger.warning("Elasticsearch not configured, skipping index creation")
         return False
     
-    index_prefix = current_app.config.get('ELASTICSEARCH_INDEX', 'pickleball_dev')
-    
-    # Court index
-    court_index = f"{index_prefix}_courts"
-    court_mapping = {
-        "mappings": {
-            "properties": {
-                "court_id": {"type": "integer"},
-                "uuid": {"type": "keyword"},
-                "name": {"type": "text", "analyzer": "english"},
-                "address": {"type": "text", "analyzer": "english"},
-                "court_type": {"type": "keyword"},
-                "surface_type": {"type": "keyword"},
-                "amenities": {"type": "text", "analyzer": "english"},
-                "rating": {"type": "float"},
-                "number_of_courts": {"type": "integer"}
-            }
-        }
-    }
-    
-    # Game index
-    game_index = f"{index_prefix}_games"
-    game_mapping = {
-        "mappings": {
-            "properties": {
-                "game_id": {"type": "integer"},
-                "court_id": {"type": "integer"},
-                "court_name": {"type": "text", "analyzer": "english"},
-                "date": {"type": "date"},
-                "time": {"type": "keyword"},
-                "skill_level": {"type": "keyword"},
-                "status": {"type": "keyword"},
-                "notes": {"type": "text", "analyzer": "english"},
-                "max_players": {"type": "integer"},
-                "current_players": {"type": "integer"}
-            }
-        }
-    }
-    
     try:
-        # Create court index if it doesn't exist
-        if not es.indices.exists(index=court_index):
-            es.indices.create(index=court_index, body=court_mapping)
-            logger.info(f"Created Elasticsearch index: {court_index}")
-        
-        # Create game index if it doesn't exist
-        if not es.indices.exists(index=game_index):
-            es.indices.create(index=game_index, body=game_mapping)
-            logger.info(f"Created Elasticsearch index: {game_index}")
+        for kind in MAPPINGS:
+            alias = index_alias(kind)
+            if not es.indices.exists(index=alias):
+                index = create_versioned_index(es, kind)
+                es.indices.put_alias(index=index, name=alias)
         
+        elasticsearch_succeeded()
         return True
     except Exception as e:
+        elasticsearch_failed(e)
         logger.error(f"Error creating Elasticsearch indices: {str(e)}")
         return False
 
@@ -98,29 +235,13 @@ def index_court(court):
     if not es:
         return False
     
-    index_prefix = current_app.config.get('ELASTICSEARCH_INDEX', 'pickleball_dev')
-    court_index = f"{index_prefix}_courts"
-    
-    court_dict = court.to_dict()
-    
-    # Prepare document for indexing
-    doc = {
-        "court_id": court.court_id,
-        "uuid": court.uuid,
-        "name": court.name,
-        "address": court.address,
-        "court_type": court.court_type,
-        "surface_type": court.surface_type,
-        "amenities": court.amenities,  # This is a JSON string, might need parsing
-        "rating": court.rating,
-        "number_of_courts": court.number_of_courts
-    }
-    
     try:
-        es.index(index=court_index, id=court.court_id, document=doc)
+        es.index(index=index_alias('courts'), id=court.court_id, document=court_document(court))
         logger.info(f"Indexed court {court.court_id} in Elasticsearch")
+        elasticsearch_succeeded()
         return True
     except Exception as e:
+        elasticsearch_failed(e)
         logger.error(f"Error indexing court {court.court_id}: {str(e)}")
         return False
 
@@ -130,31 +251,13 @@ def index_game(game):
     if not es:
         return False
     
-    index_prefix = current_app.config.get('ELASTICSEARCH_INDEX', 'pickleball_dev')
-    game_index = f"{index_prefix}_games"
-    
-    # Get court name for better search
-    court_name = game.court.name if game.court else "Unknown Court"
-    
-    # Prepare document for indexing
-    doc = {
-        "game_id": game.game_id,
-        "court_id": game.court_id,
-        "court_name": court_name,
-        "date": game.date.isoformat() if game.date else None,
-        "time": game.time.isoformat() if game.time else None,
-        "skill_level": game.skill_level,
-        "status": game.status,
-        "notes": game.notes,
-        "max_players": game.max_players,
-        "current_players": len(game.participants)
-    }
-    
     try:
-        es.index(index=game_index, id=game.game_id, document=doc)
+        es.index(index=index_alias('games'), id=game.game_id, document=game_document(game))
         logger.info(f"Indexed game {game.game_id} in Elasticsearch")
+        elasticsearch_succeeded()
         return True
     except Exception as e:
+        elasticsearch_failed(e)
         logger.error(f"Error indexing game {game.game_id}: {str(e)}")
         return False
 
@@ -164,17 +267,17 @@ def delete_court_index(court_id):
     if not es:
         return False
     
-    index_prefix = current_app.config.get('ELASTICSEARCH_INDEX', 'pickleball_dev')
-    court_index = f"{index_prefix}_courts"
-    
     try:
-        es.delete(index=court_index, id=court_id)
+        es.delete(index=index_alias('courts'), id=court_id)
         logger.info(f"Deleted court {court_id} from Elasticsearch")
+        elasticsearch_succeeded()
         return True
     except NotFoundError:
         logger.warning(f"Court {court_id} not found in Elasticsearch")
+        elasticsearch_succeeded()
         return True  # Not an error if it doesn't exist
     except Exception as e:
+        elasticsearch_failed(e)
         logger.error(f"Error deleting court {court_id}: {str(e)}")
         return False
 
@@ -184,16 +287,16 @@ def delete_game_index(game_id):
     if not es:
         return False
     
-    index_prefix = current_app.config.get('ELASTICSEARCH_INDEX', 'pickleball_dev')
-    game_index = f"{index_prefix}_games"
-    
     try:
-        es.delete(index=game_index, id=game_id)
+        es.delete(index=index_alias('games'), id=game_id)
         logger.info(f"Deleted game {game_id} from Elasticsearch")
+        elasticsearch_succeeded()
         return True
     except NotFoundError:
         logger.warning(f"Game {game_id} not found in Elasticsearch")
+        elasticsearch_succeeded()
         return True  # Not an error if it doesn't exist
     except Exception as e:
+        elasticsearch_failed(e)
         logger.error(f"Error deleting game {game_id}: {str(e)}")
         return False 
\ No newline at end of file
@@ -0,0 +1,138 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from elasticsearch import helpers
+from flask import current_app
+from app.models.court import Court
+from app.models.game import Game
+from app.services.elasticsearch import (
+    court_document, create_versioned_index, game_document, get_elasticsearch_client, index_alias
+)
+import itertools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Settings while bulk loading a new index: no refreshes or replicas until it's complete
+LOADING_SETTINGS = {'refresh_interval': '-1', 'number_of_replicas': 0}
+LOADED_SETTINGS = {'refresh_interval': None, 'number_of_replicas': None}
+
+def index_source(kind):
+    """(model, query, document builder) for 'courts' or 'games'"""
+    if kind == 'courts':
+        return Court, Court.query, court_document
+    if kind == 'games':
+        return Game, Game.query_with_details(), game_document
+    raise ValueError(f"Unknown index: {kind}")
+
+def bulk_actions(kind, index, query=None, chunk_size=500):
+    """
+    Stream bulk index actions for every row of kind into index. Rows are
+    read with yield_per so only one chunk is held in memory at a time.
+    """
+    model, default_query, document = index_source(kind)
+    id_column = model.__mapper__.primary_key[0]
+    rows = (query if query is not None else default_query).order_by(id_column).yield_per(chunk_size)
+    for row in rows:
+        yield {'_index': index, '_id': getattr(row, id_column.key), '_source': document(row)}
+
+def deleted_ids(kind, doc_ids, chunk_size=500):
+    """The doc_ids of kind that no longer have a database row"""
+    model, _, _ = index_source(kind)
+    id_column = model.__mapper__.primary_key[0]
+    doc_ids = sorted(doc_ids)
+    missing = []
+    for i in range(0, len(doc_ids), chunk_size):
+        chunk = doc_ids[i:i + chunk_size]
+        existing = {doc_id for doc_id, in model.query.with_entities(id_column).filter(id_column.in_(chunk))}
+        missing.extend(doc_id for doc_id in chunk if doc_id not in existing)
+    return missing
+
+def _send(es, chunk):
+    success, errors = helpers.bulk(es, chunk, raise_on_error=False, raise_on_exception=False)
+    for error in errors:
+        logger.error(f"Failed to index document: {error}")
+    return success
+
+def bulk_index(es, actions, chunk_size=500, workers=4):
+    """
+    Send actions with the bulk API, chunk_size documents per request and
+    up to workers requests in flight. Documents are built in the calling
+    thread, which owns the database session. Returns the number indexed.
+    """
+    indexed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        while True:
+            chunk = list(itertools.islice(actions, chunk_size))
+            if not chunk:
+                break
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                indexed += sum(future.result() for future in done)
+            pending.add(pool.submit(_send, es, chunk))
+        indexed += sum(future.result() for future in pending)
+    return indexed
+
+def reindex(kind, chunk_size=500, workers=4, keep_old=False):
+    """
+    Rebuild the 'courts' or 'games' index from the database without downtime.
+
+    Documents go into a new versioned index while searches keep using the
+    current one. The alias is then moved to the new index in one atomic
+    update. Rows changed during the load are written again through the
+    alias, rows deleted during the load are deleted from it, and pending
+    search outbox entries are sent to it. Returns the number of documents
+    indexed.
+    """
+    es = get_elasticsearch_client()
+    if not es:
+        raise RuntimeError('Elasticsearch is not available')
+    # Bulk requests of chunk_size documents need longer than the search timeout
+    bulk_es = es.options(request_timeout=current_app.config.get('ELASTICSEARCH_BULK_TIMEOUT', 60))
+
+    model, query, _ = index_source(kind)
+    alias = index_alias(kind)
+    started_at = datetime.utcnow()
+    start = time.perf_counter()
+
+    loaded = set()
+
+    def track(actions):
+        for action in actions:
+            loaded.add(action['_id'])
+            yield action
+
+    index = create_versioned_index(es, kind, settings=LOADING_SETTINGS)
+    indexed = bulk_index(bulk_es, track(bulk_actions(kind, index, chunk_size=chunk_size)), chunk_size, workers)
+    es.indices.put_settings(index=index, settings=LOADED_SETTINGS)
+    bulk_es.indices.refresh(index=index)
+
+    # Swap the alias in one step. The first run also drops a plain index
+    # that was created under the alias name before aliases were used.
+    old_indices = list(es.indices.get_alias(name=alias)) if es.indices.exists_alias(name=alias) else []
+    actions = [{'remove': {'index': name, 'alias': alias}} for name in old_indices]
+    if not old_indices and es.indices.exists(index=alias):
+        actions.append({'remove_index': {'index': alias}})
+    actions.append({'add': {'index': index, 'alias': alias}})
+    es.indices.update_aliases(actions=actions)
+
+    # Writes made while loading went to the old index. Deleted rows leave no
+    # updated_at behind, and their outbox entries may already have been
+    # drained into the old index, so check every loaded id instead.
+    changed = query.filter(model.updated_at >= started_at)
+    bulk_index(bulk_es, bulk_actions(kind, alias, changed, chunk_size), chunk_size, workers)
+    deletes = ({'_op_type': 'delete', '_index': alias, '_id': doc_id}
+               for doc_id in deleted_ids(kind, loaded, chunk_size))
+    bulk_index(bulk_es, deletes, chunk_size, workers)
+
+    # Entries still waiting in the outbox now go to the new index
+    from app.services.search_outbox import drain_all
+    drain_all(current_app.config.get('SEARCH_OUTBOX_BATCH_SIZE', 500))
+
+    if not keep_old:
+        for name in old_indices:
+            es.indices.delete(index=name)
+
+    logger.info(f"Reindexed {indexed} {kind} into {index} in {time.perf_counter() - start:.1f}s")
+    return indexed
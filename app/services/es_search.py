@@ -0,0 +1,69 @@
+from flask import current_app
+
+# multi_match fields and boosts, mirrored by the in-process text index
+COURT_SEARCH_FIELDS = ["name^3", "address", "court_type", "surface_type", "amenities"]
+GAME_SEARCH_FIELDS = ["court_name^2", "skill_level", "notes", "status"]
+
+def location(lat, lng):
+    """geo_point value for a lat/lng, or None when either is missing"""
+    if lat is None or lng is None:
+        return None
+    return {"lat": lat, "lon": lng}
+
+def search_body(query, fields, id_field, geo=None, geo_order=()):
+    """
+    Search request body for a text query, a location radius or both.
+
+    geo is (lat, lng, radius_km). Text matches sort by relevance, then by
+    distance when a location is given; location-only searches sort nearest
+    first, then by geo_order. The id comes last so the order is total,
+    which search_after pagination needs.
+    """
+    match = {"multi_match": {"query": query, "fields": fields}} if query else {"match_all": {}}
+    sort = ["_score"] if query else []
+    source = [id_field]
+
+    if geo is None:
+        es_query = match
+    else:
+        lat, lng, radius = geo
+        point = location(lat, lng)
+        es_query = {
+            "bool": {
+                "must": match,
+                "filter": {"geo_distance": {"distance": f"{radius}km", "location": point}}
+            }
+        }
+        sort.append({"_geo_distance": {"location": point, "order": "asc", "unit": "km"}})
+        sort.extend(geo_order)
+        source.append("location")
+
+    if current_app.config.get('ELASTICSEARCH_SOURCE_ONLY'):
+        source.append("payload")
+    return {"query": es_query, "sort": sort + [{id_field: "asc"}], "_source": source}
+
+def hit_distance(hit, query):
+    """Distance in km of a geo search hit, from its sort values"""
+    return hit['sort'][1 if query else 0]
+
+def hits_to_dicts(hits, id_field, query, column, fields=None):
+    """
+    Serialized results for Elasticsearch hits, in ranking order. Hits that
+    carry a payload (ELASTICSEARCH_SOURCE_ONLY) are returned as stored;
+    the rest are loaded from the database in one query. With fields, only
+    those are kept (and query should load only their columns).
+    """
+    missing = [hit['_source'][id_field] for hit in hits if 'payload' not in hit['_source']]
+    rows_by_id = {}
+    if missing:
+        rows_by_id = {getattr(row, column.key): row for row in query.filter(column.in_(missing))}
+
+    results = []
+    for hit in hits:
+        source = hit['_source']
+        if 'payload' in source:
+            payload = source['payload']
+            results.append(payload if fields is None else {key: payload.get(key) for key in fields})
+        elif source[id_field] in rows_by_id:
+            results.append(rows_by_id[source[id_field]].to_dict(fields=fields))
+    return results
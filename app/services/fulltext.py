@@ -0,0 +1,181 @@
+from flask import current_app
+from sqlalchemy import text
+from app import db
+from app.services.text_index import get_text_index, tokenize
+import logging
+
+logger = logging.getLogger(__name__)
+
+# SQLite: FTS5 tables kept in sync with courts and games by triggers.
+# courts_fts reads its text from the courts table (external content);
+# games_fts stores its own copy because it includes the court name.
+SQLITE_SETUP = [
+    """
+    CREATE VIRTUAL TABLE courts_fts USING fts5(
+        name, address, court_type, surface_type, amenities,
+        content='courts', content_rowid='court_id'
+    )
+    """,
+    "CREATE VIRTUAL TABLE games_fts USING fts5(court_name, skill_level, notes, status)",
+    """
+    CREATE TRIGGER courts_fts_insert AFTER INSERT ON courts BEGIN
+        INSERT INTO courts_fts(rowid, name, address, court_type, surface_type, amenities)
+        VALUES (new.court_id, new.name, new.address, new.court_type, new.surface_type, new.amenities);
+    END
+    """,
+    """
+    CREATE TRIGGER courts_fts_delete AFTER DELETE ON courts BEGIN
+        INSERT INTO courts_fts(courts_fts, rowid, name, address, court_type, surface_type, amenities)
+        VALUES ('delete', old.court_id, old.name, old.address, old.court_type, old.surface_type, old.amenities);
+    END
+    """,
+    """
+    CREATE TRIGGER courts_fts_update AFTER UPDATE ON courts BEGIN
+        INSERT INTO courts_fts(courts_fts, rowid, name, address, court_type, surface_type, amenities)
+        VALUES ('delete', old.court_id, old.name, old.address, old.court_type, old.surface_type, old.amenities);
+        INSERT INTO courts_fts(rowid, name, address, court_type, surface_type, amenities)
+        VALUES (new.court_id, new.name, new.address, new.court_type, new.surface_type, new.amenities);
+        UPDATE games_fts SET court_name = new.name
+        WHERE rowid IN (SELECT game_id FROM games WHERE court_id = new.court_id);
+    END
+    """,
+    "INSERT INTO courts_fts(courts_fts) VALUES ('rebuild')",
+    """
+    CREATE TRIGGER games_fts_insert AFTER INSERT ON games BEGIN
+        INSERT INTO games_fts(rowid, court_name, skill_level, notes, status)
+        VALUES (new.game_id, (SELECT name FROM courts WHERE court_id = new.court_id),
+                new.skill_level, new.notes, new.status);
+    END
+    """,
+    """
+    CREATE TRIGGER games_fts_delete AFTER DELETE ON games BEGIN
+        DELETE FROM games_fts WHERE rowid = old.game_id;
+    END
+    """,
+    """
+    CREATE TRIGGER games_fts_update AFTER UPDATE ON games BEGIN
+        DELETE FROM games_fts WHERE rowid = old.game_id;
+        INSERT INTO games_fts(rowid, court_name, skill_level, notes, status)
+        VALUES (new.game_id, (SELECT name FROM courts WHERE court_id = new.court_id),
+                new.skill_level, new.notes, new.status);
+    END
+    """,
+    """
+    INSERT INTO games_fts(rowid, court_name, skill_level, notes, status)
+    SELECT games.game_id, courts.name, games.skill_level, games.notes, games.status
+    FROM games JOIN courts ON courts.court_id = games.court_id
+    """,
+]
+
+# Postgres: generated tsvector columns with GIN indexes, plus an expression
+# index on court names for game searches that match the court.
+POSTGRES_SETUP = [
+    """
+    ALTER TABLE courts ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(address, '') || ' ' || coalesce(court_type, '') || ' ' ||
+                  coalesce(surface_type, '') || ' ' || coalesce(amenities, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_courts_search_vector ON courts USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_courts_name_tsv ON courts USING GIN (to_tsvector('english', name))",
+    """
+    ALTER TABLE games ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('english', coalesce(skill_level, '') || ' ' || coalesce(notes, '') || ' ' || coalesce(status, ''))
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_games_search_vector ON games USING GIN (search_vector)",
+]
+
+def ensure_fulltext(engine):
+    """Create the full-text tables, columns, indexes and triggers if missing"""
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == 'sqlite':
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'courts_fts'"
+            )).first()
+            if not exists:
+                for statement in SQLITE_SETUP:
+                    conn.execute(text(statement))
+                logger.info("Created SQLite FTS5 search tables")
+        elif dialect == 'postgresql':
+            for statement in POSTGRES_SETUP:
+                conn.execute(text(statement))
+        else:
+            raise ValueError(f"Full-text search is not supported on {dialect}")
+
+class DatabaseFullText:
+    """Text search answered by the database's own full-text engine"""
+
+    search_method = 'fulltext'
+
+    def search_courts(self, query):
+        """Return [(court_id, score)] best first"""
+        return self._search(query, 'courts')
+
+    def search_games(self, query):
+        """Return [(game_id, score)] best first"""
+        return self._search(query, 'games')
+
+    def _search(self, query, table):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        if db.engine.dialect.name == 'sqlite':
+            # Quote every term so user input is never parsed as FTS5 syntax;
+            # bm25() is lower for better matches, so negate it
+            match = ' OR '.join(f'"{token}"' for token in tokens[:-1])
+            match = f'{match} OR "{tokens[-1]}"*' if match else f'"{tokens[-1]}"*'
+            weights = '3.0, 1.0, 1.0, 1.0, 1.0' if table == 'courts' else '2.0, 1.0, 1.0, 1.0'
+            sql = f"""
+                SELECT rowid, -bm25({table}_fts, {weights}) AS score
+                FROM {table}_fts WHERE {table}_fts MATCH :match
+                ORDER BY score DESC, rowid
+            """
+            params = {'match': match}
+        else:
+            # Terms are [a-z0-9]+ so they are safe inside a tsquery
+            params = {'match': ' | '.join(tokens[:-1] + [f'{tokens[-1]}:*'])}
+            if table == 'courts':
+                sql = """
+                    SELECT court_id, ts_rank(search_vector, q) AS score
+                    FROM courts, to_tsquery('english', :match) AS q
+                    WHERE search_vector @@ q
+                    ORDER BY score DESC, court_id
+                """
+            else:
+                sql = """
+                    SELECT games.game_id,
+                           ts_rank(games.search_vector, q) + 2 * ts_rank(to_tsvector('english', courts.name), q) AS score
+                    FROM games JOIN courts ON courts.court_id = games.court_id,
+                         to_tsquery('english', :match) AS q
+                    WHERE games.search_vector @@ q
+                       OR games.court_id IN (
+                           SELECT court_id FROM courts WHERE to_tsvector('english', name) @@ q
+                       )
+                    ORDER BY score DESC, games.game_id
+                """
+        return [(row_id, float(score)) for row_id, score in db.session.execute(text(sql), params)]
+
+def init_fulltext(app):
+    """Set up database full-text search, once, when it is the configured backend"""
+    if app.config.get('TEXT_SEARCH_BACKEND', 'memory') != 'database' or 'fulltext' in app.extensions:
+        return
+    app.extensions['fulltext'] = True
+    try:
+        with app.app_context():
+            ensure_fulltext(db.engine)
+    except Exception as e:
+        logger.warning(f"Could not set up database full-text search: {str(e)}")
+
+def get_text_search():
+    """
+    Text search backend used when Elasticsearch is unavailable, chosen by
+    TEXT_SEARCH_BACKEND: 'memory' for the in-process BM25 index or
+    'database' for SQLite FTS5 / Postgres tsvector.
+    """
+    if current_app.config.get('TEXT_SEARCH_BACKEND', 'memory') == 'database':
+        return DatabaseFullText()
+    return get_text_index()
@@ -0,0 +1,266 @@
+from collections import OrderedDict
+from flask import current_app
+from app import db
+from app.models.court import Court
+from app.models.game import Game, GameParticipant
+from app.services import model_changes
+from app.services.court_coordinates import haversine
+from app.services.geo_index import courts_within_radius
+import math
+import numpy as np
+import threading
+import time
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+def geohash(lat, lng, precision):
+    """Geohash cell of a point, precision characters long"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    cell, bits, value, even = [], 0, 0, True
+    while len(cell) < precision:
+        # Bits alternate between longitude and latitude, halving the range each time
+        span = lng_range if even else lat_range
+        coordinate = lng if even else lat
+        middle = (span[0] + span[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            span[0] = middle
+        else:
+            span[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            cell.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return ''.join(cell)
+
+def geohash_bounds(cell):
+    """(min_lat, max_lat, min_lng, max_lng) of a geohash cell"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            span = lng_range if even else lat_range
+            middle = (span[0] + span[1]) / 2
+            if value >> shift & 1:
+                span[0] = middle
+            else:
+                span[1] = middle
+            even = not even
+    return lat_range[0], lat_range[1], lng_range[0], lng_range[1]
+
+def radius_bucket(radius_km):
+    """Round a radius up to a power of two kilometers (at least 1)"""
+    return 2.0 ** max(0, math.ceil(math.log2(max(radius_km, 1e-9))))
+
+class _Entry:
+    """Court ids, or game sort keys, around one cell: enough for any point in it"""
+
+    def __init__(self, rows, lats, lngs, court_ids, game_ids, center, coverage_km):
+        self.rows = rows
+        self.lats = lats
+        self.lngs = lngs
+        self.court_ids = court_ids
+        self.game_ids = game_ids
+        self.center = center
+        self.coverage_km = coverage_km
+        self.created_at = time.monotonic()
+
+    def covers(self, lat, lng):
+        if lat is None or lng is None:
+            return False
+        distance = haversine(self.center[0], self.center[1], lat, lng)
+        return float(distance) <= self.coverage_km
+
+class GeoResponseCache:
+    """
+    TTL + LRU cache for location radius searches, keyed by geohash cell and
+    radius bucket.
+
+    An entry holds the ids and coordinates of the courts (or games) within
+    the bucket radius plus the cell's half-diagonal of the cell center, a
+    superset of the results for any point in the cell. Each request then
+    only computes exact distances from its own point over that small set
+    and loads the rows of its own page, so nearby map requests share one
+    radius lookup while each entry stays a few numbers per row.
+    """
+
+    def __init__(self, precision=6, ttl_seconds=30, max_entries=1024, max_radius_km=100):
+        self.precision = precision
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_radius_km = max_radius_km
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Bumped on every invalidation so entries built concurrently aren't stored stale
+        self._generation = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'entries': len(self._entries),
+            'precision': self.precision
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def _entry(self, kind, lat, lng, radius_km, build):
+        cell = geohash(lat, lng, self.precision)
+        key = (kind, cell, radius_bucket(radius_km))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.created_at < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            generation = self._generation
+
+        min_lat, max_lat, min_lng, max_lng = geohash_bounds(cell)
+        center = ((min_lat + max_lat) / 2, (min_lng + max_lng) / 2)
+        half_diagonal = float(haversine(center[0], center[1], max_lat, max_lng))
+        entry = build(center, key[2] + half_diagonal)
+
+        with self._lock:
+            if generation != self._generation:
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def nearby_courts(self, lat, lng, radius_km):
+        """
+        [(court_id, distance_km)] within radius_km, nearest first, or None
+        when the radius is too large to cache.
+        """
+        if radius_km > self.max_radius_km:
+            return None
+        entry = self._entry('courts', lat, lng, radius_km, _build_courts)
+        distances = haversine(lat, lng, entry.lats, entry.lngs)
+        results = [
+            (court_id, distance)
+            for court_id, distance in zip(entry.rows, distances.tolist()) if distance <= radius_km
+        ]
+        results.sort(key=lambda item: (item[1], item[0]))
+        return results
+
+    def nearby_games(self, lat, lng, radius_km):
+        """
+        [(distance_km, date, time, game_id)] for games at courts within
+        radius_km, nearest then earliest first, or None when the radius is
+        too large to cache.
+        """
+        if radius_km > self.max_radius_km:
+            return None
+        entry = self._entry('games', lat, lng, radius_km, _build_games)
+        distances = haversine(lat, lng, entry.lats, entry.lngs)
+        results = [
+            (distance, date, time, game_id)
+            for (game_id, date, time), distance in zip(entry.rows, distances.tolist())
+            if distance <= radius_km
+        ]
+        results.sort()
+        return results
+
+    def invalidate(self, matches):
+        """Drop entries for which matches(kind, entry) is true"""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key, entry in self._entries.items() if matches(key[0], entry)]:
+                del self._entries[key]
+                self.invalidations += 1
+
+def _build_courts(center, coverage_km):
+    court_ids = [court_id for court_id, _ in courts_within_radius(center[0], center[1], coverage_km)]
+    courts = db.session.query(Court.court_id, Court.lat, Court.lng).filter(
+        Court.court_id.in_(court_ids)
+    ).all() if court_ids else []
+    return _Entry(
+        rows=[court_id for court_id, _, _ in courts],
+        lats=np.array([lat for _, lat, _ in courts], dtype=float),
+        lngs=np.array([lng for _, _, lng in courts], dtype=float),
+        court_ids={court_id for court_id, _, _ in courts},
+        game_ids=set(),
+        center=center,
+        coverage_km=coverage_km
+    )
+
+def _build_games(center, coverage_km):
+    court_ids = [court_id for court_id, _ in courts_within_radius(center[0], center[1], coverage_km)]
+    games = db.session.query(Game.game_id, Game.date, Game.time, Court.lat, Court.lng).join(
+        Court, Game.court_id == Court.court_id
+    ).filter(Game.court_id.in_(court_ids)).all() if court_ids else []
+    return _Entry(
+        rows=[(game_id, date, time) for game_id, date, time, _, _ in games],
+        lats=np.array([lat for _, _, _, lat, _ in games], dtype=float),
+        lngs=np.array([lng for _, _, _, _, lng in games], dtype=float),
+        court_ids=set(court_ids),
+        game_ids={game_id for game_id, _, _, _, _ in games},
+        center=center,
+        coverage_km=coverage_km
+    )
+
+def init_geo_cache(app):
+    """Create the radius search cache for an app when GEO_CACHE_ENABLED is on"""
+    if not app.config.get('GEO_CACHE_ENABLED', True):
+        return None
+    cache = GeoResponseCache(
+        precision=app.config.get('GEO_CACHE_PRECISION', 6),
+        ttl_seconds=app.config.get('GEO_CACHE_TTL_SECONDS', 30),
+        max_entries=app.config.get('GEO_CACHE_MAX_ENTRIES', 1024),
+        max_radius_km=app.config.get('GEO_CACHE_MAX_RADIUS_KM', 100)
+    )
+    app.extensions['geo_cache'] = cache
+    return cache
+
+def get_geo_cache():
+    """The radius search cache for the current app, or None when disabled"""
+    return current_app.extensions.get('geo_cache')
+
+def _court_changes(changes):
+    cache = get_geo_cache()
+    if cache is None:
+        return
+    # A moved court leaves the entries holding it and enters those covering its new position
+    cache.invalidate(lambda kind, entry: any(
+        values['court_id'] in entry.court_ids or entry.covers(values.get('lat'), values.get('lng'))
+        for _, values in changes
+    ))
+
+def _game_changes(changes):
+    cache = get_geo_cache()
+    if cache is None:
+        return
+    cache.invalidate(lambda kind, entry: kind == 'games' and any(
+        values['court_id'] in entry.court_ids or values['game_id'] in entry.game_ids for _, values in changes
+    ))
+
+def _participant_changes(changes):
+    cache = get_geo_cache()
+    if cache is None:
+        return
+    cache.invalidate(lambda kind, entry: kind == 'games' and any(
+        values['game_id'] in entry.game_ids for _, values in changes
+    ))
+
+model_changes.subscribe(Court, _court_changes)
+model_changes.subscribe(Game, _game_changes)
+model_changes.subscribe(GameParticipant, _participant_changes)
@@ -0,0 +1,268 @@
+from flask import current_app
+from sqlalchemy import and_, or_
+from app import db
+from app.models.court import Court
+from app.services import model_changes
+from app.services.court_coordinates import CourtCoordinates, haversine
+from app.services.kdtree import KDTree
+import logging
+import math
+import numpy as np
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Mean radius of the earth in kilometers
+EARTH_RADIUS_KM = 6371
+# Length of one degree of latitude in kilometers
+KM_PER_DEGREE = 111.32
+
+def calculate_distance(lat1, lon1, lat2, lon2):
+    """
+    Calculate the Haversine distance between two points
+    on the earth (specified in decimal degrees)
+    """
+    # Convert decimal degrees to radians
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+
+    # Haversine formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+    return c * EARTH_RADIUS_KM
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Lat/lng box enclosing a circle as (min_lat, max_lat, min_lng, max_lng).
+
+    Longitudes are not wrapped, so min_lng < -180 or max_lng > 180 means
+    the box crosses the antimeridian. Near the poles the box spans every
+    longitude.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(lat - dlat, -90), min(lat + dlat, 90)
+    cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 90)))
+    if cos_lat <= 1e-9 or radius_km / (KM_PER_DEGREE * cos_lat) >= 180:
+        return min_lat, max_lat, -180, 180
+    dlng = radius_km / (KM_PER_DEGREE * cos_lat)
+    return min_lat, max_lat, lng - dlng, lng + dlng
+
+def bounding_box_filter(lat, lng, radius_km):
+    """SQL predicate on Court.lat/Court.lng for the box around a circle"""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    lat_filter = Court.lat.between(min_lat, max_lat)
+    if min_lng < -180:
+        lng_filter = or_(Court.lng >= min_lng + 360, Court.lng <= max_lng)
+    elif max_lng > 180:
+        lng_filter = or_(Court.lng >= min_lng, Court.lng <= max_lng - 360)
+    else:
+        lng_filter = Court.lng.between(min_lng, max_lng)
+    return and_(lat_filter, lng_filter)
+
+class CourtGridIndex:
+    """
+    Uniform lat/lng grid over court coordinates.
+
+    Each court lives in exactly one cell, so a radius query only has to
+    look at the cells overlapping the circle's bounding box and compute
+    exact distances for the courts found there. Distances are computed
+    in one vectorized pass over a CourtCoordinates snapshot, which is
+    re-created lazily after courts change.
+
+    k-nearest queries go to a KD-tree over the same courts, which is
+    updated in place on every change.
+    """
+
+    def __init__(self, cell_degrees=0.25):
+        self.cell_degrees = cell_degrees
+        self._positions = {}
+        self._coordinates = None
+        self._tree = KDTree()
+        self._lock = threading.Lock()
+        # (row count, max updated_at) of the courts table at build time
+        self.version = None
+        self.checked_at = 0
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _cell(self, lat, lng):
+        return (int(math.floor((lat + 90) / self.cell_degrees)),
+                int(math.floor((lng + 180) / self.cell_degrees)))
+
+    def rebuild(self):
+        """Load every court with coordinates from the database"""
+        rows = db.session.query(Court.court_id, Court.lat, Court.lng).filter(
+            Court.lat.isnot(None), Court.lng.isnot(None)
+        ).all()
+        version = model_changes.table_version(Court)
+
+        with self._lock:
+            self._positions = {court_id: (lat, lng) for court_id, lat, lng in rows}
+            self._coordinates = None
+            self._tree.build(self._positions)
+            self.version = version
+            self.checked_at = time.monotonic()
+
+        logger.info(f"Built court grid index with {len(rows)} courts")
+
+    def upsert(self, court_id, lat, lng):
+        """Add or move a court; courts without coordinates are dropped"""
+        with self._lock:
+            if lat is not None and lng is not None:
+                self._positions[court_id] = (lat, lng)
+                self._tree.insert(court_id, lat, lng)
+            else:
+                self._positions.pop(court_id, None)
+                self._tree.remove(court_id)
+            self._coordinates = None
+
+    def remove(self, court_id):
+        """Remove a court from the index"""
+        with self._lock:
+            self._positions.pop(court_id, None)
+            self._tree.remove(court_id)
+            self._coordinates = None
+
+    @property
+    def coordinates(self):
+        """Cell-sorted CourtCoordinates snapshot of the indexed courts"""
+        with self._lock:
+            if self._coordinates is None:
+                self._coordinates = CourtCoordinates(self._positions, self._cell)
+            return self._coordinates
+
+    def cells(self, lat, lng, radius_km):
+        """
+        Grid cells overlapping the circle, or None when the circle
+        covers more cells than are populated
+        """
+        rows_total = int(math.ceil(180 / self.cell_degrees))
+        cols_total = int(math.ceil(360 / self.cell_degrees))
+
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+        min_row, min_col = self._cell(min_lat, min_lng)
+        max_row, max_col = self._cell(max_lat, max_lng)
+
+        if (max_row - min_row + 1) * (max_col - min_col + 1) >= len(self._positions):
+            return None
+
+        if max_col - min_col + 1 >= cols_total:
+            cols = range(cols_total)
+        else:
+            # Wrap around the antimeridian
+            cols = {col % cols_total for col in range(min_col, max_col + 1)}
+        return [
+            (row, col)
+            for row in range(max(min_row, 0), min(max_row, rows_total - 1) + 1)
+            for col in cols
+        ]
+
+    def query_radius(self, lat, lng, radius_km):
+        """Return [(court_id, distance_km)] within radius_km, nearest first"""
+        coordinates = self.coordinates
+        cells = self.cells(lat, lng, radius_km)
+        rows = coordinates.rows_for_cells(cells) if cells is not None else None
+        ids, distances = coordinates.within_radius(lat, lng, radius_km, rows=rows)
+        return list(zip(ids.tolist(), distances.tolist()))
+
+    def nearest(self, lat, lng, k):
+        """Return [(court_id, distance_km)] for the k nearest courts, nearest first"""
+        with self._lock:
+            return self._tree.nearest(lat, lng, k)
+
+    def query_radius_batch(self, points, radius_km):
+        """Radius query for a list of (lat, lng) points in one vectorized pass"""
+        return [
+            list(zip(ids.tolist(), distances.tolist()))
+            for ids, distances in self.coordinates.batch_within_radius(points, radius_km)
+        ]
+
+def init_geo_index(app):
+    """Create the court grid index for an app and build it from the database"""
+    index = CourtGridIndex(cell_degrees=app.config.get('GEO_INDEX_CELL_DEGREES', 0.25))
+    app.extensions['geo_index'] = index
+    try:
+        with app.app_context():
+            index.rebuild()
+    except Exception as e:
+        # The index is rebuilt lazily on first use if the database isn't ready yet
+        logger.warning(f"Could not build court grid index at startup: {str(e)}")
+    return index
+
+def get_geo_index():
+    """
+    Get the court grid index for the current app.
+
+    Other worker processes (and scripts like migrate_courts.py) can change
+    courts without this process seeing the commit, so the table version is
+    re-checked at most every GEO_INDEX_REFRESH_SECONDS.
+    """
+    index = current_app.extensions.get('geo_index')
+    if index is None:
+        index = init_geo_index(current_app._get_current_object())
+
+    refresh_seconds = current_app.config.get('GEO_INDEX_REFRESH_SECONDS', 60)
+    now = time.monotonic()
+    if index.version is None or now - index.checked_at >= refresh_seconds:
+        if model_changes.table_version(Court) != index.version:
+            index.rebuild()
+        else:
+            index.checked_at = now
+    return index
+
+def courts_within_radius(lat, lng, radius_km):
+    """
+    Return [(court_id, distance_km)] within radius_km, nearest first.
+
+    Uses the in-process grid index, or with GEO_INDEX_ENABLED off (e.g. on
+    short-lived serverless workers) pushes a bounding box into the SQL
+    query and only computes exact distances for the rows inside it.
+    """
+    if current_app.config.get('GEO_INDEX_ENABLED', True):
+        return get_geo_index().query_radius(lat, lng, radius_km)
+
+    rows = db.session.query(Court.court_id, Court.lat, Court.lng).filter(
+        bounding_box_filter(lat, lng, radius_km)
+    ).all()
+    if not rows:
+        return []
+    court_ids, lats, lngs = zip(*rows)
+    distances = haversine(lat, lng, np.array(lats), np.array(lngs))
+    nearby = [(court_id, distance) for court_id, distance in zip(court_ids, distances.tolist()) if distance <= radius_km]
+    nearby.sort(key=lambda item: item[1])
+    return nearby
+
+def k_nearest_courts(lat, lng, k):
+    """
+    Return [(court_id, distance_km)] for the k nearest courts, nearest first.
+
+    Uses the KD-tree of the in-process index, or with GEO_INDEX_ENABLED off
+    computes the distance to every court with coordinates in one pass.
+    """
+    if current_app.config.get('GEO_INDEX_ENABLED', True):
+        return get_geo_index().nearest(lat, lng, k)
+
+    rows = db.session.query(Court.court_id, Court.lat, Court.lng).filter(
+        Court.lat.isnot(None), Court.lng.isnot(None)
+    ).all()
+    if not rows:
+        return []
+    court_ids, lats, lngs = zip(*rows)
+    distances = haversine(lat, lng, np.array(lats), np.array(lngs))
+    return sorted(zip(court_ids, distances.tolist()), key=lambda item: (item[1], item[0]))[:k]
+
+def _apply_court_changes(changes):
+    """Keep the grid index in step with committed Court rows"""
+    index = current_app.extensions.get('geo_index')
+    if index is None:
+        return
+    for op, values in changes:
+        if op == 'delete':
+            index.remove(values['court_id'])
+        else:
+            index.upsert(values['court_id'], values['lat'], values['lng'])
+
+model_changes.subscribe(Court, _apply_court_changes)
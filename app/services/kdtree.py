@@ -0,0 +1,143 @@
+import heapq
+import math
+
+# Mean radius of the earth in kilometers
+EARTH_RADIUS_KM = 6371
+
+def to_unit_vector(lat, lng):
+    """Point on the unit sphere for a lat/lng in decimal degrees"""
+    lat, lng = math.radians(lat), math.radians(lng)
+    cos_lat = math.cos(lat)
+    return (cos_lat * math.cos(lng), cos_lat * math.sin(lng), math.sin(lat))
+
+def chord_to_km(chord):
+    """Great-circle distance in kilometers for a chord length on the unit sphere"""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(chord / 2, 1.0))
+
+class _Node:
+    __slots__ = ('point', 'key', 'axis', 'left', 'right', 'deleted')
+
+    def __init__(self, point, key, axis):
+        self.point = point
+        self.key = key
+        self.axis = axis
+        self.left = None
+        self.right = None
+        self.deleted = False
+
+class KDTree:
+    """
+    3-d tree over points on the unit sphere for k-nearest-neighbour queries.
+
+    Straight-line (chord) distance between unit vectors grows with the
+    great-circle distance, so the nearest points in 3-d are the nearest
+    points on the earth and no longitude wrapping is needed.
+
+    Inserts attach new leaves and removals leave tombstones; the tree is
+    rebuilt balanced once either makes up half of it.
+    """
+
+    def __init__(self, points=None):
+        """points: {key: (lat, lng)}"""
+        self._nodes = {}
+        self._root = None
+        self._tombstones = 0
+        self._inserted = 0
+        self.build(points or {})
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def build(self, points):
+        """Build a balanced tree from {key: (lat, lng)}"""
+        self._build_from([(to_unit_vector(lat, lng), key) for key, (lat, lng) in points.items()])
+
+    def _build_from(self, items):
+        self._nodes = {}
+        self._tombstones = 0
+        self._inserted = 0
+        self._root = self._build(items, 0)
+
+    def _build(self, items, depth):
+        if not items:
+            return None
+        axis = depth % 3
+        items.sort(key=lambda item: item[0][axis])
+        median = len(items) // 2
+        point, key = items[median]
+        node = _Node(point, key, axis)
+        self._nodes[key] = node
+        node.left = self._build(items[:median], depth + 1)
+        node.right = self._build(items[median + 1:], depth + 1)
+        return node
+
+    def _rebuild_if_needed(self):
+        size = len(self._nodes)
+        if self._tombstones + self._inserted > max(size // 2, 16):
+            self._build_from([(node.point, key) for key, node in self._nodes.items()])
+
+    def insert(self, key, lat, lng):
+        """Add or move a point"""
+        if key in self._nodes:
+            self.remove(key)
+
+        point = to_unit_vector(lat, lng)
+        if self._root is None:
+            self._root = _Node(point, key, 0)
+            self._nodes[key] = self._root
+            return
+
+        node = self._root
+        while True:
+            side = 'left' if point[node.axis] < node.point[node.axis] else 'right'
+            child = getattr(node, side)
+            if child is None:
+                child = _Node(point, key, (node.axis + 1) % 3)
+                setattr(node, side, child)
+                break
+            node = child
+
+        self._nodes[key] = child
+        self._inserted += 1
+        self._rebuild_if_needed()
+
+    def remove(self, key):
+        """Remove a point if present"""
+        node = self._nodes.pop(key, None)
+        if node is None:
+            return
+        node.deleted = True
+        self._tombstones += 1
+        self._rebuild_if_needed()
+
+    def nearest(self, lat, lng, k):
+        """Return [(key, distance_km)] for the k nearest points, nearest first"""
+        if k <= 0 or self._root is None:
+            return []
+
+        target = to_unit_vector(lat, lng)
+        # Max-heap of (-squared chord, key) holding the best k so far
+        best = []
+
+        # Depth-first walk with (node, squared distance to its region) pairs,
+        # skipping regions farther away than the current k-th best
+        stack = [(self._root, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if node is None or (len(best) == k and bound >= -best[0][0]):
+                continue
+
+            if not node.deleted:
+                squared = sum((a - b) ** 2 for a, b in zip(node.point, target))
+                if len(best) < k:
+                    heapq.heappush(best, (-squared, node.key))
+                elif squared < -best[0][0]:
+                    heapq.heapreplace(best, (-squared, node.key))
+
+            diff = target[node.axis] - node.point[node.axis]
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            # Push the far side first so the near side is searched first
+            stack.append((far, max(bound, diff * diff)))
+            stack.append((near, bound))
+
+        return [(key, chord_to_km(math.sqrt(-negative))) for negative, key in sorted(best, reverse=True)]
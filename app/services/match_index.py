@@ -0,0 +1,351 @@
+from bisect import bisect_left, insort
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, or_
+from app import db
+from app.models.court import Court
+from app.models.game import Game, GameParticipant
+from app.services import model_changes
+from app.services.geo_index import bounding_box, bounding_box_filter, calculate_distance
+import heapq
+import logging
+import math
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+OpenGame = namedtuple('OpenGame', 'game_id court_id starts_at skill_level open_slots lat lng')
+
+# Added to the score of games open to any level when a level was asked for
+ANY_LEVEL_PENALTY = 0.5
+HOURS_PER_DAY = 24
+# Beyond this many grid cells a location filter scans every populated cell instead
+MAX_CELL_LOOKUPS = 4096
+
+def skill_key(skill_level):
+    """Skill level as indexed: lowercase, or None for games open to any level"""
+    return (skill_level or '').strip().lower() or None
+
+def open_games_query(*filters):
+    """Rows for OpenGame: scheduled games with a free place, with their court's coordinates"""
+    return db.session.query(
+        Game.game_id, Game.court_id, Game.date, Game.time, Game.skill_level,
+        Game.max_players - Game.current_players, Court.lat, Court.lng
+    ).join(Game.court).filter(
+        Game.status == 'scheduled', Game.current_players < Game.max_players, *filters
+    )
+
+def hour_slot(moment):
+    """Hours from 0001-01-01 to the start of moment's hour: the time bucket games are kept in"""
+    return moment.toordinal() * HOURS_PER_DAY + moment.hour
+
+def open_game(row):
+    game_id, court_id, day, start, skill_level, open_slots, lat, lng = row
+    return OpenGame(game_id, court_id, datetime.combine(day, start), skill_key(skill_level), open_slots, lat, lng)
+
+class MatchRequest:
+    """
+    What a player is looking for, and how candidate games are scored.
+
+    A game's score is its distance as a fraction of the radius plus how
+    far into the window it starts, plus ANY_LEVEL_PENALTY for games open
+    to any level when a level was asked for. Lower is better.
+    """
+
+    def __init__(self, start, end, skill_level=None, location=None, players=1, now=None):
+        self.start = start
+        self.end = end
+        self.skill_level = skill_key(skill_level)
+        self.location = location  # (lat, lng, radius_km) or None
+        self.players = players
+        self.now = now or datetime.now()
+        self.window_start = max(self.now, datetime.combine(start, datetime.min.time()))
+        window_end = datetime.combine(end + timedelta(days=1), datetime.min.time())
+        self.window_hours = max((window_end - self.window_start).total_seconds() / 3600, 1)
+
+    def time_score(self, starts_at):
+        return (starts_at - self.window_start).total_seconds() / 3600 / self.window_hours
+
+    def score(self, game):
+        """(score, distance_km) for a game that fits the request, else None"""
+        if game.open_slots < self.players or game.starts_at < self.now:
+            return None
+        if self.skill_level is not None and game.skill_level not in (self.skill_level, None):
+            return None
+        score = self.time_score(game.starts_at)
+        if self.skill_level is not None and game.skill_level is None:
+            score += ANY_LEVEL_PENALTY
+        distance = None
+        if self.location is not None:
+            lat, lng, radius_km = self.location
+            if game.lat is None or game.lng is None:
+                return None
+            distance = calculate_distance(lat, lng, game.lat, game.lng)
+            if distance > radius_km:
+                return None
+            score += distance / radius_km if radius_km else 0
+        return score, distance
+
+class Ranking:
+    """The best limit matches seen so far, in a bounded max-heap"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._heap = []
+
+    def worst(self):
+        return -self._heap[0][0] if len(self._heap) >= self.limit else math.inf
+
+    def add(self, game_id, score, distance):
+        entry = (-score, -game_id, distance)
+        if len(self._heap) < self.limit:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def results(self):
+        """[(game_id, score, distance_km)], best first"""
+        return [(-game_id, -score, distance) for score, game_id, distance in sorted(self._heap, reverse=True)]
+
+class OpenSlotIndex:
+    """
+    Scheduled games with free places, for matchmaking.
+
+    Games are bucketed by (skill level, starting hour) and then by the
+    grid cell of their court: {(skill, hour_slot): {cell: {game_id: OpenGame}}}.
+    The hours that hold any game are kept in a sorted list, so a match
+    bisects to the start of its window and visits only those hours, and
+    within them only the buckets for the requested levels and the cells
+    overlapping the search circle. Hours are visited in order and the
+    search stops as soon as no later game could outrank the current
+    results, so a wide search reads little past the first hours that
+    fill the results.
+
+    Committed changes to games, participants and courts mark the games
+    involved as stale; they are re-read in one query before the next
+    match, since SQL can't be run while a commit is being dispatched.
+    """
+
+    def __init__(self, cell_degrees=0.25):
+        self.cell_degrees = cell_degrees
+        self._games = {}
+        self._buckets = {}
+        self._skills = {}  # skill: number of indexed games, to enumerate levels
+        self._slots = []  # Sorted hour slots holding at least one game
+        self._slot_games = {}  # hour slot: number of indexed games
+        self._stale_games = set()
+        self._stale_courts = set()
+        self._lock = threading.Lock()
+        self.version = None
+        self.checked_at = 0
+        self.first_day = None
+
+    def __len__(self):
+        return len(self._games)
+
+    def _cell(self, lat, lng):
+        if lat is None or lng is None:
+            return None
+        return (int(math.floor((lat + 90) / self.cell_degrees)),
+                int(math.floor((lng + 180) / self.cell_degrees)))
+
+    def _add(self, game):
+        self._remove(game.game_id)
+        key = (game.skill_level, hour_slot(game.starts_at))
+        self._buckets.setdefault(key, {}).setdefault(self._cell(game.lat, game.lng), {})[game.game_id] = game
+        self._skills[game.skill_level] = self._skills.get(game.skill_level, 0) + 1
+        if key[1] not in self._slot_games:
+            insort(self._slots, key[1])
+        self._slot_games[key[1]] = self._slot_games.get(key[1], 0) + 1
+        self._games[game.game_id] = game
+
+    def _remove(self, game_id):
+        game = self._games.pop(game_id, None)
+        if game is None:
+            return
+        key = (game.skill_level, hour_slot(game.starts_at))
+        cell = self._cell(game.lat, game.lng)
+        cells = self._buckets[key]
+        del cells[cell][game_id]
+        if not cells[cell]:
+            del cells[cell]
+            if not cells:
+                del self._buckets[key]
+        self._skills[game.skill_level] -= 1
+        if not self._skills[game.skill_level]:
+            del self._skills[game.skill_level]
+        self._slot_games[key[1]] -= 1
+        if not self._slot_games[key[1]]:
+            del self._slot_games[key[1]]
+            del self._slots[bisect_left(self._slots, key[1])]
+
+    def rebuild(self):
+        """Load every open game from today on from the database"""
+        today = date.today()
+        rows = open_games_query(Game.date >= today).all()
+        version = model_changes.table_version(Game)
+        with self._lock:
+            self._games, self._buckets, self._skills = {}, {}, {}
+            self._slots, self._slot_games = [], {}
+            self._stale_games.clear()
+            self._stale_courts.clear()
+            for row in rows:
+                self._add(open_game(row))
+            self.version = version
+            self.checked_at = time.monotonic()
+            self.first_day = today
+        logger.info(f"Built open slot index with {len(rows)} games")
+
+    def mark_stale(self, game_ids=(), court_ids=()):
+        with self._lock:
+            self._stale_games.update(game_ids)
+            self._stale_courts.update(court_ids)
+
+    def refresh_stale(self):
+        """Re-read the games marked stale, and the games at stale courts, in one query"""
+        with self._lock:
+            game_ids, self._stale_games = self._stale_games, set()
+            court_ids, self._stale_courts = self._stale_courts, set()
+        if not game_ids and not court_ids:
+            return
+        ids = set(game_ids)
+        if court_ids:
+            ids.update(game_id for game_id, game in list(self._games.items()) if game.court_id in court_ids)
+        rows = open_games_query(
+            or_(Game.game_id.in_(ids), Game.court_id.in_(court_ids)), Game.date >= date.today()
+        ).all()
+        with self._lock:
+            for game_id in ids:
+                self._remove(game_id)
+            for row in rows:
+                self._add(open_game(row))
+
+    def prune(self, today):
+        """Drop the buckets of days before today"""
+        with self._lock:
+            if self.first_day is None or self.first_day >= today:
+                return
+            first_slot = today.toordinal() * HOURS_PER_DAY
+            past = set(self._slots[:bisect_left(self._slots, first_slot)])
+            if past:
+                stale = [game_id for game_id, game in self._games.items() if hour_slot(game.starts_at) in past]
+                for game_id in stale:
+                    self._remove(game_id)
+            self.first_day = today
+
+    def _cells(self, location):
+        """Grid cells overlapping the search circle, or None to scan every cell"""
+        if location is None:
+            return None
+        lat, lng, radius_km = location
+        cols_total = int(math.ceil(360 / self.cell_degrees))
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+        min_row, min_col = self._cell(min_lat, min_lng)
+        max_row, max_col = self._cell(max_lat, max_lng)
+        if (max_row - min_row + 1) * min(max_col - min_col + 1, cols_total) > MAX_CELL_LOOKUPS:
+            return None
+        cols = range(cols_total) if max_col - min_col + 1 >= cols_total else range(min_col, max_col + 1)
+        return {(row, col % cols_total) for row in range(min_row, max_row + 1) for col in cols}
+
+    def match(self, request, limit):
+        """[(game_id, score, distance_km)] for the best open games for a MatchRequest"""
+        ranking = Ranking(limit)
+        cells = self._cells(request.location)
+        skills = (request.skill_level, None) if request.skill_level is not None else None
+        with self._lock:
+            skills = skills or list(self._skills)
+            last_slot = (request.end.toordinal() + 1) * HOURS_PER_DAY
+            first = bisect_left(self._slots, hour_slot(request.window_start))
+            last = bisect_left(self._slots, last_slot)
+            for slot in self._slots[first:last]:
+                # Every game in this hour or later scores at least the start of the hour
+                slot_start = datetime.fromordinal(slot // HOURS_PER_DAY) + timedelta(hours=slot % HOURS_PER_DAY)
+                if request.time_score(max(slot_start, request.window_start)) > ranking.worst():
+                    break
+                for skill in skills:
+                    bucket = self._buckets.get((skill, slot))
+                    if not bucket:
+                        continue
+                    if cells is None or len(bucket) <= len(cells):
+                        games = (bucket[cell] for cell in bucket if cells is None or cell in cells)
+                    else:
+                        games = (bucket[cell] for cell in cells if cell in bucket)
+                    for cell_games in games:
+                        for game in cell_games.values():
+                            scored = request.score(game)
+                            if scored is not None:
+                                ranking.add(game.game_id, *scored)
+        return ranking.results()
+
+def init_match_index(app):
+    """Create the open slot index for an app and build it from the database"""
+    index = OpenSlotIndex(cell_degrees=app.config.get('GEO_INDEX_CELL_DEGREES', 0.25))
+    app.extensions['match_index'] = index
+    try:
+        with app.app_context():
+            index.rebuild()
+    except Exception as e:
+        # The index is rebuilt lazily on first use if the database isn't ready yet
+        logger.warning(f"Could not build open slot index at startup: {str(e)}")
+    return index
+
+def get_match_index():
+    """
+    Get the open slot index for the current app, with stale games re-read
+    and past days dropped. Games changed by other processes are picked up
+    by re-checking the table version at most every MATCH_INDEX_REFRESH_SECONDS.
+    """
+    index = current_app.extensions.get('match_index')
+    if index is None:
+        index = init_match_index(current_app._get_current_object())
+
+    refresh_seconds = current_app.config.get('MATCH_INDEX_REFRESH_SECONDS', 60)
+    now = time.monotonic()
+    if index.version is None or now - index.checked_at >= refresh_seconds:
+        if model_changes.table_version(Game) != index.version:
+            index.rebuild()
+            return index
+        index.checked_at = now
+    index.refresh_stale()
+    index.prune(date.today())
+    return index
+
+def match_games(request, limit):
+    """
+    [(game_id, score, distance_km)] for the best open games for a
+    MatchRequest. Uses the in-process index, or with MATCH_INDEX_ENABLED
+    off ranks the rows an indexed SQL query returns.
+    """
+    if current_app.config.get('MATCH_INDEX_ENABLED', True):
+        return get_match_index().match(request, limit)
+
+    filters = [Game.date.between(request.start, request.end),
+               Game.max_players - Game.current_players >= request.players]
+    if request.skill_level is not None:
+        filters.append(or_(func.lower(Game.skill_level) == request.skill_level,
+                           func.coalesce(Game.skill_level, '') == ''))
+    if request.location is not None:
+        filters.append(bounding_box_filter(*request.location))
+    ranking = Ranking(limit)
+    for row in open_games_query(*filters):
+        game = open_game(row)
+        scored = request.score(game)
+        if scored is not None:
+            ranking.add(game.game_id, *scored)
+    return ranking.results()
+
+def _mark_games(changes):
+    index = current_app.extensions.get('match_index')
+    if index is not None:
+        index.mark_stale(game_ids=[values['game_id'] for _, values in changes])
+
+def _mark_courts(changes):
+    index = current_app.extensions.get('match_index')
+    if index is not None:
+        index.mark_stale(court_ids=[values['court_id'] for _, values in changes])
+
+model_changes.subscribe(Game, _mark_games)
+model_changes.subscribe(GameParticipant, _mark_games)
+model_changes.subscribe(Court, _mark_courts)
@@ -0,0 +1,76 @@
+from flask import has_app_context
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session, object_session
+from app import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Handlers registered per model class: {Model: [handler, ...]}
+_handlers = {}
+
+def _snapshot(instance):
+    """Capture the column values of a flushed instance"""
+    mapper = inspect(instance).mapper
+    return {attr.key: getattr(instance, attr.key) for attr in mapper.column_attrs}
+
+def _record(op):
+    """Build a mapper event listener that records a change in the session"""
+    def listener(mapper, connection, target):
+        session = object_session(target)
+        if session is None:
+            return
+        session.info.setdefault('model_changes', []).append((type(target), op, _snapshot(target)))
+    return listener
+
+def table_version(model):
+    """
+    Cheap fingerprint of a table: (row count, max updated_at).
+
+    In-process indexes compare it with the value from their last build to
+    notice writes made by other worker processes or scripts.
+    """
+    primary_key = inspect(model).primary_key[0]
+    count, last_updated = db.session.query(func.count(primary_key), func.max(model.updated_at)).one()
+    return count, last_updated
+
+def subscribe(model, handler):
+    """
+    Call handler(changes) after every commit that touched rows of model.
+
+    changes is a list of (op, values) tuples where op is 'insert', 'update'
+    or 'delete' and values holds the column values captured at flush time.
+    Handlers run inside the app context of the committing session.
+    """
+    if model not in _handlers:
+        _handlers[model] = []
+        event.listen(model, 'after_insert', _record('insert'))
+        event.listen(model, 'after_update', _record('update'))
+        event.listen(model, 'after_delete', _record('delete'))
+    if handler not in _handlers[model]:
+        _handlers[model].append(handler)
+
+@event.listens_for(Session, 'after_commit', propagate=True)
+def _dispatch(session):
+    """Deliver recorded changes to subscribers once they are durable"""
+    changes = session.info.pop('model_changes', None)
+    if not changes or not has_app_context():
+        return
+
+    by_model = {}
+    for model, op, values in changes:
+        by_model.setdefault(model, []).append((op, values))
+
+    for model, model_changes in by_model.items():
+        for handler in _handlers.get(model, []):
+            try:
+                handler(model_changes)
+            except Exception as e:
+                # Never fail a committed request because a derived index is behind
+                logger.error(f"Error applying {model.__name__} changes in {handler.__name__}: {str(e)}")
+
+@event.listens_for(Session, 'after_soft_rollback', propagate=True)
+def _discard(session, previous_transaction):
+    """Drop changes from a rolled back transaction"""
+    if previous_transaction.parent is None:
+        session.info.pop('model_changes', None)
@@ -0,0 +1,176 @@
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from elasticsearch import helpers
+from sqlalchemy import event, insert, inspect, literal, or_, select
+from app import db
+from app.models.court import Court
+from app.models.game import Game, GameParticipant
+from app.models.outbox import SearchOutbox
+from app.services.elasticsearch import (
+    elasticsearch_failed, elasticsearch_succeeded, get_elasticsearch_client, index_alias
+)
+from app.services.es_reindex import index_source
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Longest wait before retrying a document Elasticsearch rejected
+MAX_RETRY_SECONDS = 3600
+
+def _enabled():
+    return has_app_context() and current_app.config.get('SEARCH_OUTBOX_ENABLED', False)
+
+def _enqueue(connection, kind, doc_id, op='index'):
+    """Record an index update on the flushing connection, inside the same transaction"""
+    connection.execute(insert(SearchOutbox).values(kind=kind, doc_id=doc_id, op=op))
+
+def _court_changed(op):
+    def listener(mapper, connection, target):
+        if not _enabled():
+            return
+        _enqueue(connection, 'courts', target.court_id, 'delete' if op == 'delete' else 'index')
+        # Game documents carry the court name
+        if op == 'update' and inspect(target).attrs.name.history.has_changes():
+            connection.execute(insert(SearchOutbox).from_select(
+                ['kind', 'doc_id', 'op'],
+                select(literal('games'), Game.game_id, literal('index')).where(Game.court_id == target.court_id)
+            ))
+    return listener
+
+def _game_changed(op):
+    def listener(mapper, connection, target):
+        if _enabled():
+            _enqueue(connection, 'games', target.game_id, 'delete' if op == 'delete' else 'index')
+    return listener
+
+def _participant_changed(mapper, connection, target):
+    # current_players is part of the game document
+    if _enabled():
+        _enqueue(connection, 'games', target.game_id)
+
+for _op in ('insert', 'update', 'delete'):
+    event.listen(Court, f'after_{_op}', _court_changed(_op))
+    event.listen(Game, f'after_{_op}', _game_changed(_op))
+event.listen(GameParticipant, 'after_insert', _participant_changed)
+event.listen(GameParticipant, 'after_delete', _participant_changed)
+
+def _bulk_actions(latest):
+    """Bulk actions for {(kind, doc_id): op}, loading each kind's rows in one query"""
+    actions = []
+    for kind in ('courts', 'games'):
+        model, query, document = index_source(kind)
+        id_column = model.__mapper__.primary_key[0]
+        doc_ids = [doc_id for (entry_kind, doc_id), op in latest.items() if entry_kind == kind]
+        index_ids = [doc_id for doc_id in doc_ids if latest[(kind, doc_id)] == 'index']
+        rows = {getattr(row, id_column.key): row for row in query.filter(id_column.in_(index_ids))} if index_ids else {}
+
+        alias = index_alias(kind)
+        for doc_id in doc_ids:
+            if doc_id in rows:
+                actions.append({'_index': alias, '_id': doc_id, '_source': document(rows[doc_id])})
+            else:
+                # Deleted, or gone since the entry was written
+                actions.append({'_op_type': 'delete', '_index': alias, '_id': doc_id})
+    return actions
+
+def _failed_keys(actions, results):
+    """
+    (kind, doc_id) of the actions Elasticsearch rejected, given the
+    (ok, item) results streaming_bulk yields in action order. Deleting a
+    document that is already gone is not a failure.
+    """
+    kinds = {index_alias(kind): kind for kind in ('courts', 'games')}
+    failed = set()
+    for action, (ok, item) in zip(actions, results):
+        _, result = next(iter(item.items()))
+        if not ok and result.get('status') != 404:
+            logger.error(f"Failed to sync search document: {result}")
+            failed.add((kinds[action['_index']], action['_id']))
+    return failed
+
+def _settle(entries, failed, now=None):
+    """Delete the synced entries and schedule a retry with backoff for the failed ones"""
+    now = now or datetime.utcnow()
+    base = current_app.config.get('SEARCH_OUTBOX_RETRY_SECONDS', 5)
+    synced = [entry.outbox_id for entry in entries if (entry.kind, entry.doc_id) not in failed]
+    for entry in entries:
+        if (entry.kind, entry.doc_id) in failed:
+            entry.next_attempt_at = now + timedelta(seconds=min(base * 2 ** entry.attempts, MAX_RETRY_SECONDS))
+            entry.attempts += 1
+    if synced:
+        SearchOutbox.query.filter(SearchOutbox.outbox_id.in_(synced)).delete(synchronize_session=False)
+    db.session.commit()
+
+def drain_outbox(batch_size=500):
+    """
+    Send one batch of outbox entries to Elasticsearch with the bulk API.
+
+    Entries for the same document are coalesced so it is written once,
+    from its current database row. Entries are deleted only once their
+    document is synced; rejected documents stay in the outbox and are
+    retried with backoff. Returns the number of entries processed, which
+    is 0 when the outbox is empty or Elasticsearch is unavailable.
+    """
+    es = get_elasticsearch_client()
+    if not es:
+        return 0
+
+    # Concurrent drainers in other workers skip the rows this one holds
+    now = datetime.utcnow()
+    entries = SearchOutbox.query.filter(
+        or_(SearchOutbox.next_attempt_at.is_(None), SearchOutbox.next_attempt_at <= now)
+    ).order_by(SearchOutbox.outbox_id).limit(batch_size).with_for_update(skip_locked=True).all()
+    if not entries:
+        db.session.rollback()
+        return 0
+
+    latest = {}
+    for entry in entries:
+        latest[(entry.kind, entry.doc_id)] = entry.op
+
+    actions = _bulk_actions(latest)
+    try:
+        results = list(helpers.streaming_bulk(es, actions, raise_on_error=False))
+    except Exception as e:
+        elasticsearch_failed(e)
+        db.session.rollback()
+        logger.warning(f"Could not sync search outbox: {str(e)}")
+        return 0
+    elasticsearch_succeeded()
+
+    _settle(entries, _failed_keys(actions, results), now)
+    return len(entries)
+
+def drain_all(batch_size=500):
+    """Drain the outbox until it is empty or Elasticsearch stops answering"""
+    total = 0
+    while True:
+        processed = drain_outbox(batch_size)
+        total += processed
+        if processed < batch_size:
+            return total
+
+def start_outbox_drainer(app):
+    """Drain the outbox every SEARCH_OUTBOX_INTERVAL seconds in a daemon thread"""
+    interval = app.config.get('SEARCH_OUTBOX_INTERVAL', 2)
+    batch_size = app.config.get('SEARCH_OUTBOX_BATCH_SIZE', 500)
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    drain_all(batch_size)
+            except Exception as e:
+                logger.error(f"Error draining search outbox: {str(e)}")
+
+    thread = threading.Thread(target=run, name='search-outbox', daemon=True)
+    thread.start()
+    return thread
+
+def init_search_outbox(app):
+    """Start the background drainer when the outbox is enabled"""
+    if app.config.get('SEARCH_OUTBOX_ENABLED') and not app.testing and 'search_outbox' not in app.extensions:
+        app.extensions['search_outbox'] = start_outbox_drainer(app)
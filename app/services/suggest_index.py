@@ -0,0 +1,149 @@
+from bisect import bisect_left, insort
+from flask import current_app
+from app import db
+from app.models.court import Court
+from app.services import model_changes
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+def normalize(text):
+    """Lowercase words joined by single spaces, so punctuation doesn't break prefixes"""
+    return ' '.join(WORD_PATTERN.findall(str(text or '').lower()))
+
+def city_of(address):
+    """City part of a '123 Main St, City, ST 12345, USA' address"""
+    parts = [part.strip() for part in (address or '').split(',')]
+    return parts[1] if len(parts) >= 3 else None
+
+class CourtSuggestIndex:
+    """
+    Court name typeahead over sorted key arrays searched with bisect.
+
+    Keys are kept in three tiers, tried in order: the start of the name,
+    the start of any later word of the name, and the city. A prefix lookup
+    is a binary search plus a scan over the matching run of keys.
+    """
+
+    TIERS = ('name', 'word', 'city')
+
+    def __init__(self):
+        self._keys = {tier: [] for tier in self.TIERS}
+        self._courts = {}
+        self._lock = threading.Lock()
+        self.version = None
+        self.checked_at = 0
+
+    def __len__(self):
+        return len(self._courts)
+
+    def _court_keys(self, name, address):
+        words = normalize(name).split(' ')
+        city = normalize(city_of(address))
+        keys = [('name', ' '.join(words))]
+        keys.extend(('word', ' '.join(words[i:])) for i in range(1, len(words)))
+        if city:
+            keys.append(('city', city))
+        return keys
+
+    def _add(self, court_id, name, address, lat, lng):
+        self._remove(court_id)
+        keys = [(tier, key) for tier, key in self._court_keys(name, address) if key]
+        for tier, key in keys:
+            insort(self._keys[tier], (key, court_id))
+        self._courts[court_id] = (name, lat, lng, keys)
+
+    def _remove(self, court_id):
+        court = self._courts.pop(court_id, None)
+        if court is None:
+            return
+        for tier, key in court[3]:
+            keys = self._keys[tier]
+            del keys[bisect_left(keys, (key, court_id))]
+
+    def rebuild(self):
+        """Load every court name from the database"""
+        rows = db.session.query(Court.court_id, Court.name, Court.address, Court.lat, Court.lng).all()
+        version = model_changes.table_version(Court)
+        with self._lock:
+            self._keys = {tier: [] for tier in self.TIERS}
+            self._courts = {}
+            for court_id, name, address, lat, lng in rows:
+                self._add(court_id, name, address, lat, lng)
+            self.version = version
+            self.checked_at = time.monotonic()
+        logger.info(f"Built court suggest index with {len(rows)} courts")
+
+    def apply_changes(self, changes):
+        with self._lock:
+            for op, values in changes:
+                if op == 'delete':
+                    self._remove(values['court_id'])
+                else:
+                    self._add(values['court_id'], values['name'], values['address'], values['lat'], values['lng'])
+
+    def suggest(self, prefix, limit=10):
+        """[(court_id, name, lat, lng)] for courts matching prefix, best tier first"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        seen = set()
+        results = []
+        with self._lock:
+            for tier in self.TIERS:
+                keys = self._keys[tier]
+                position = bisect_left(keys, (prefix,))
+                while position < len(keys) and len(results) < limit:
+                    key, court_id = keys[position]
+                    if not key.startswith(prefix):
+                        break
+                    if court_id not in seen:
+                        seen.add(court_id)
+                        name, lat, lng, _ = self._courts[court_id]
+                        results.append((court_id, name, lat, lng))
+                    position += 1
+        return results
+
+def init_suggest_index(app):
+    """Create the court suggest index for an app and build it from the database"""
+    index = CourtSuggestIndex()
+    app.extensions['suggest_index'] = index
+    try:
+        with app.app_context():
+            index.rebuild()
+    except Exception as e:
+        # The index is rebuilt lazily on first use if the database isn't ready yet
+        logger.warning(f"Could not build court suggest index at startup: {str(e)}")
+    return index
+
+def get_suggest_index():
+    """
+    Get the suggest index for the current app, rebuilding it when courts
+    were changed by another process (checked at most every
+    TEXT_INDEX_REFRESH_SECONDS).
+    """
+    index = current_app.extensions.get('suggest_index')
+    if index is None:
+        index = init_suggest_index(current_app._get_current_object())
+
+    refresh_seconds = current_app.config.get('TEXT_INDEX_REFRESH_SECONDS', 60)
+    now = time.monotonic()
+    if index.version is None or now - index.checked_at >= refresh_seconds:
+        if model_changes.table_version(Court) != index.version:
+            index.rebuild()
+        else:
+            index.checked_at = now
+    return index
+
+def _apply_court_changes(changes):
+    index = current_app.extensions.get('suggest_index')
+    if index is not None:
+        index.apply_changes(changes)
+
+model_changes.subscribe(Court, _apply_court_changes)
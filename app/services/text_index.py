@@ -0,0 +1,276 @@
+from bisect import bisect_left, insort
+from collections import Counter
+from flask import current_app
+from app import db
+from app.models.court import Court
+from app.models.game import Game
+from app.services import model_changes
+import json
+import logging
+import math
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+STOPWORDS = {'a', 'an', 'and', 'at', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'with'}
+
+# Field boosts, matching the multi_match fields used against Elasticsearch
+COURT_FIELDS = {'name': 3, 'address': 1, 'court_type': 1, 'surface_type': 1, 'amenities': 1}
+GAME_FIELDS = {'court_name': 2, 'skill_level': 1, 'notes': 1, 'status': 1}
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords"""
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(str(text).lower()) if token not in STOPWORDS]
+
+class BM25Index:
+    """
+    Inverted index with BM25 ranking over documents made of weighted fields.
+
+    A term's frequency in a document is the boost-weighted sum of its
+    counts in each field, so a match in a boosted field counts as several.
+    The last query term also matches as a prefix, so partial words typed
+    into a search box still find results.
+    """
+
+    def __init__(self, fields, k1=1.2, b=0.75):
+        self.fields = fields
+        self.k1 = k1
+        self.b = b
+        self._postings = {}
+        self._doc_terms = {}
+        self._doc_lengths = {}
+        self._total_length = 0
+        self._vocabulary = []
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def add(self, doc_id, values):
+        """Index a document given {field: text}; replaces any previous version"""
+        self.remove(doc_id)
+
+        terms = Counter()
+        for field, weight in self.fields.items():
+            for token in tokenize(values.get(field)):
+                terms[token] += weight
+        if not terms:
+            return
+
+        for term, frequency in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._vocabulary, term)
+            postings[doc_id] = frequency
+
+        length = sum(terms.values())
+        self._doc_terms[doc_id] = terms
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+
+    def remove(self, doc_id):
+        """Drop a document from the index if present"""
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect_left(self._vocabulary, term)]
+
+        self._total_length -= self._doc_lengths.pop(doc_id)
+
+    def _expand(self, prefix):
+        """Vocabulary terms starting with prefix"""
+        start = bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def search(self, query):
+        """Return [(doc_id, score)] for documents matching query, best first"""
+        tokens = tokenize(query)
+        if not tokens or not self._doc_terms:
+            return []
+
+        # Each query term is a group of index terms; only the last one is a prefix
+        groups = [[token] for token in tokens[:-1]]
+        groups.append(self._expand(tokens[-1]) or [tokens[-1]])
+
+        count = len(self._doc_terms)
+        average_length = self._total_length / count
+        scores = {}
+        for group in groups:
+            # Best matching term of the group per document
+            group_scores = {}
+            for term in group:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / average_length)
+                    score = idf * frequency * (self.k1 + 1) / (frequency + norm)
+                    if score > group_scores.get(doc_id, 0):
+                        group_scores[doc_id] = score
+            for doc_id, score in group_scores.items():
+                scores[doc_id] = scores.get(doc_id, 0) + score
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+def _amenities_text(amenities):
+    """Amenities are stored as a JSON list; index their words"""
+    if not amenities:
+        return None
+    try:
+        return ' '.join(str(item) for item in json.loads(amenities))
+    except (TypeError, ValueError):
+        return amenities
+
+class SearchTextIndex:
+    """
+    BM25 indexes over courts and games for text search without
+    Elasticsearch. Game documents include their court's name, so a court
+    rename re-indexes that court's games.
+    """
+
+    search_method = 'text_index'
+
+    def __init__(self):
+        self.courts = BM25Index(COURT_FIELDS)
+        self.games = BM25Index(GAME_FIELDS)
+        self._court_names = {}
+        self._games = {}
+        self._lock = threading.Lock()
+        # (courts version, games version) at build time
+        self.version = None
+        self.checked_at = 0
+
+    def rebuild(self):
+        """Load every court and game from the database"""
+        court_rows = db.session.query(
+            Court.court_id, Court.name, Court.address, Court.court_type, Court.surface_type, Court.amenities
+        ).all()
+        game_rows = db.session.query(
+            Game.game_id, Game.court_id, Game.skill_level, Game.notes, Game.status
+        ).all()
+        version = (model_changes.table_version(Court), model_changes.table_version(Game))
+
+        with self._lock:
+            self.courts = BM25Index(COURT_FIELDS)
+            self.games = BM25Index(GAME_FIELDS)
+            self._court_names = {}
+            self._games = {}
+            for court_id, name, address, court_type, surface_type, amenities in court_rows:
+                self._add_court({
+                    'court_id': court_id, 'name': name, 'address': address, 'court_type': court_type,
+                    'surface_type': surface_type, 'amenities': amenities
+                })
+            for game_id, court_id, skill_level, notes, status in game_rows:
+                self._add_game({
+                    'game_id': game_id, 'court_id': court_id, 'skill_level': skill_level,
+                    'notes': notes, 'status': status
+                })
+            self.version = version
+            self.checked_at = time.monotonic()
+
+        logger.info(f"Built text index with {len(court_rows)} courts and {len(game_rows)} games")
+
+    def _add_court(self, values):
+        court_id = values['court_id']
+        renamed = self._court_names.get(court_id) != values['name']
+        self._court_names[court_id] = values['name']
+        self.courts.add(court_id, dict(values, amenities=_amenities_text(values['amenities'])))
+        if renamed:
+            for game_id, game in self._games.items():
+                if game['court_id'] == court_id:
+                    self._add_game(game)
+
+    def _add_game(self, values):
+        game = {key: values[key] for key in ('game_id', 'court_id', 'skill_level', 'notes', 'status')}
+        self._games[game['game_id']] = game
+        self.games.add(game['game_id'], dict(game, court_name=self._court_names.get(game['court_id'])))
+
+    def apply_court_changes(self, changes):
+        with self._lock:
+            for op, values in changes:
+                if op == 'delete':
+                    self.courts.remove(values['court_id'])
+                    self._court_names.pop(values['court_id'], None)
+                else:
+                    self._add_court(values)
+
+    def apply_game_changes(self, changes):
+        with self._lock:
+            for op, values in changes:
+                if op == 'delete':
+                    self.games.remove(values['game_id'])
+                    self._games.pop(values['game_id'], None)
+                else:
+                    self._add_game(values)
+
+    def search_courts(self, query):
+        """Return [(court_id, score)] best first"""
+        with self._lock:
+            return self.courts.search(query)
+
+    def search_games(self, query):
+        """Return [(game_id, score)] best first"""
+        with self._lock:
+            return self.games.search(query)
+
+def init_text_index(app):
+    """Create the text index for an app and build it from the database"""
+    index = SearchTextIndex()
+    app.extensions['text_index'] = index
+    try:
+        with app.app_context():
+            index.rebuild()
+    except Exception as e:
+        # The index is rebuilt lazily on first use if the database isn't ready yet
+        logger.warning(f"Could not build text index at startup: {str(e)}")
+    return index
+
+def get_text_index():
+    """
+    Get the text index for the current app, rebuilding it when courts or
+    games were changed by another process (checked at most every
+    TEXT_INDEX_REFRESH_SECONDS).
+    """
+    index = current_app.extensions.get('text_index')
+    if index is None:
+        index = init_text_index(current_app._get_current_object())
+
+    refresh_seconds = current_app.config.get('TEXT_INDEX_REFRESH_SECONDS', 60)
+    now = time.monotonic()
+    if index.version is None or now - index.checked_at >= refresh_seconds:
+        version = (model_changes.table_version(Court), model_changes.table_version(Game))
+        if version != index.version:
+            index.rebuild()
+        else:
+            index.checked_at = now
+    return index
+
+def _apply_court_changes(changes):
+    index = current_app.extensions.get('text_index')
+    if index is not None:
+        index.apply_court_changes(changes)
+
+def _apply_game_changes(changes):
+    index = current_app.extensions.get('text_index')
+    if index is not None:
+        index.apply_game_changes(changes)
+
+model_changes.subscribe(Court, _apply_court_changes)
+model_changes.subscribe(Game, _apply_game_changes)
@@ -8,6 +8,92 @@ let chatSocket = null;
 // API base URL
 const API_BASE_URL = "/api";
 
+// Add a pagination cursor to an API URL
+function pageUrl(url, cursor) {
+  if (!cursor) return url;
+  const separator = url.includes("?") ? "&" : "?";
+  return `${url}${separator}cursor=${encodeURIComponent(cursor)}`;
+}
+
+// ETag and body of the last response for each GET URL, sent back as If-None-Match
+const responseValidators = new Map();
+const MAX_VALIDATORS = 200;
+
+// GET with If-None-Match; a 304 is answered from the body stored with the ETag
+async function fetchWithValidators(url) {
+  const cached = responseValidators.get(url);
+  const response = await fetch(url, {
+    headers: cached ? { "If-None-Match": cached.etag } : {},
+  });
+  if (response.status === 304 && cached) {
+    return new Response(cached.body, {
+      status: 200,
+      headers: { "Content-Type": "application/json" },
+    });
+  }
+
+  const etag = response.headers.get("ETag");
+  if (response.ok && etag) {
+    responseValidators.delete(url);
+    if (responseValidators.size >= MAX_VALIDATORS) {
+      // Forget the least recently stored URL
+      responseValidators.delete(responseValidators.keys().next().value);
+    }
+    responseValidators.set(url, { etag, body: await response.clone().text() });
+  }
+  return response;
+}
+
+// Fetch every page of a paginated list endpoint
+async function fetchAllPages(url, key) {
+  let items = [];
+  let cursor = null;
+  do {
+    const response = await fetchWithValidators(pageUrl(url, cursor));
+    if (!response.ok) {
+      throw new Error(`Failed to fetch ${key}`);
+    }
+    const data = await response.json();
+    items = items.concat(data[key] || []);
+    cursor = data.next_cursor;
+  } while (cursor);
+  return items;
+}
+
+// Show a "Load more" button that fetches the next page of a list on demand
+function appendLoadMoreButton(container, url, cursor, key, renderPage) {
+  if (!cursor) return;
+
+  const wrapper = document.createElement("div");
+  wrapper.className = "col-12 text-center mb-4";
+  wrapper.innerHTML = `<button class="btn btn-outline-primary">Load more</button>`;
+  const button = wrapper.querySelector("button");
+
+  button.addEventListener("click", async () => {
+    button.disabled = true;
+    try {
+      const response = await fetchWithValidators(pageUrl(url, cursor));
+      const data = await response.json();
+      if (data.restart) {
+        // The search backend changed since the first page; the list has to start over
+        wrapper.innerHTML = `<p class="text-muted">${data.message}</p>`;
+        return;
+      }
+      if (!response.ok) {
+        throw new Error(data.message || `Failed to fetch ${key}`);
+      }
+      wrapper.remove();
+      renderPage(data[key] || []);
+      appendLoadMoreButton(container, url, data.next_cursor, key, renderPage);
+    } catch (error) {
+      console.error(`Error loading more ${key}:`, error);
+      button.disabled = false;
+    }
+  });
+
+  container.appendChild(wrapper);
+}
+
 // DOM Elements
 const loginBtn = document.getElementById("login-btn");
 const registerBtn = document.getElementById("register-btn");
@@ -244,21 +330,15 @@ async function loadCourtDetailsPage(courtId) {
   `;
 
   try {
-    const response = await fetch(`${API_BASE_URL}/courts/${courtId}`);
+    // The court comes with its upcoming games embedded, in one request
+    const response = await fetchWithValidators(
+      `${API_BASE_URL}/courts/${courtId}?include=games,upcoming_only`
+    );
     if (!response.ok) {
       throw new Error("Failed to load court details");
     }
     const court = await response.json();
-
-    // Now fetch games scheduled at this court
-    const gamesResponse = await fetch(
-      `${API_BASE_URL}/games?court_id=${courtId}`
-    );
-    if (!gamesResponse.ok) {
-      throw new Error("Failed to load games for this court");
-    }
-    const gamesData = await gamesResponse.json();
-    const games = gamesData.games || [];
+    const games = court.games || [];
 
     mainContent.innerHTML = `
       <div class="container">
@@ -326,7 +406,7 @@ async function loadCourtDetailsPage(courtId) {
                         game.skill_level || "Any"
                       }</p>
                       <p><strong>Players:</strong> ${
-                        game.participants.length
+                        game.current_players
                       }/${game.max_players}</p>
                       <button class="btn btn-primary mt-2" onclick="navigateTo('game-details', ${
                         game.game_id
@@ -416,16 +496,15 @@ function loadScheduleGameForm(courtId = null) {
     </div>
   `;
 
-  // Fetch courts for the selection dropdown
-  fetch(`${API_BASE_URL}/courts`)
-    .then((response) => response.json())
-    .then((data) => {
+  // Fetch courts for the selection dropdown; ids and names are enough
+  fetchAllPages(`${API_BASE_URL}/courts?view=summary`, "courts")
+    .then((courts) => {
       const courtsContainer = document.getElementById(
         "court-selection-container"
       );
-      if (data.courts && data.courts.length > 0) {
+      if (courts.length > 0) {
         let selectHtml = `<select class="form-control" id="court-select" required>`;
-        data.courts.forEach((court) => {
+        courts.forEach((court) => {
           const selected =
             court.court_id === parseInt(courtId) ? "selected" : "";
           selectHtml += `<option value="${court.court_id}" ${selected}>${court.name}</option>`;
@@ -795,9 +874,8 @@ async function searchGamesByLocation(lat, lng, radius = 10) {
   `;
 
   try {
-    const response = await fetch(
-      `${API_BASE_URL}/search/games?lat=${lat}&lng=${lng}&radius=${radius}`
-    );
+    const url = `${API_BASE_URL}/search/games?lat=${lat}&lng=${lng}&radius=${radius}`;
+    const response = await fetch(url);
 
     if (!response.ok) {
       throw new Error("Location search failed");
@@ -818,13 +896,16 @@ async function searchGamesByLocation(lat, lng, radius = 10) {
     gamesContainer.innerHTML = `
       <div class="col-12 mb-3">
         <div class="alert alert-info">
-          Showing ${data.games.length} games within ${radius} km of your location
+          Showing games within ${radius} km of your location
         </div>
       </div>
     `;
 
     // Render the games
     renderGames(data.games);
+    appendLoadMoreButton(gamesContainer, url, data.next_cursor, "games", (games) =>
+      renderGames(games, true)
+    );
   } catch (error) {
     console.error("Error searching games by location:", error);
     gamesContainer.innerHTML = `
@@ -837,10 +918,11 @@ async function searchGamesByLocation(lat, lng, radius = 10) {
 }
 
 // Modified function to render games with optional distance information
-function renderGames(games) {
+// Pass append = true to add another page below the games already shown
+function renderGames(games, append = false) {
   const gamesContainer = document.getElementById("games-container");
 
-  if (games.length === 0) {
+  if (games.length === 0 && !append) {
     gamesContainer.innerHTML = `
         <div class="col-12 text-center">
             <p>No games found matching your criteria.</p>
@@ -850,7 +932,7 @@ function renderGames(games) {
   }
 
   // Clear previous content if not already done
-  if (!gamesContainer.querySelector(".alert")) {
+  if (!append && !gamesContainer.querySelector(".alert")) {
     gamesContainer.innerHTML = "";
   }
 
@@ -875,7 +957,7 @@ function renderGames(games) {
 
     // Players info
     const maxPlayers = game.max_players || 4;
-    const currentPlayers = game.players ? game.players.length : 1; // At least creator
+    const currentPlayers = game.current_players;
 
     gameCard.innerHTML = `
       <div class="card h-100">
@@ -952,7 +1034,7 @@ async function fetchGames() {
       url += `?${queryParams.join("&")}`;
     }
 
-    const response = await fetch(url);
+    const response = await fetchWithValidators(url);
     const data = await response.json();
 
     if (!response.ok) {
@@ -961,6 +1043,9 @@ async function fetchGames() {
 
     // Use the new renderGames function
     renderGames(data.games);
+    appendLoadMoreButton(gamesContainer, url, data.next_cursor, "games", (games) =>
+      renderGames(games, true)
+    );
   } catch (error) {
     console.error("Error fetching games:", error);
     gamesContainer.innerHTML = `
@@ -983,9 +1068,8 @@ async function searchGames() {
   }
 
   try {
-    const response = await fetch(
-      `${API_BASE_URL}/search/games?q=${encodeURIComponent(searchTerm)}`
-    );
+    const url = `${API_BASE_URL}/search/games?q=${encodeURIComponent(searchTerm)}`;
+    const response = await fetch(url);
     const data = await response.json();
 
     const gamesContainer = document.getElementById("games-container");
@@ -1014,6 +1098,9 @@ async function searchGames() {
 
     // Use the new renderGames function
     renderGames(data.games);
+    appendLoadMoreButton(gamesContainer, url, data.next_cursor, "games", (games) =>
+      renderGames(games, true)
+    );
   } catch (error) {
     console.error("Error searching games:", error);
     const gamesContainer = document.getElementById("games-container");
@@ -1043,7 +1130,7 @@ async function loadGameDetailsPage(gameId) {
     `;
 
   try {
-    const response = await fetch(`${API_BASE_URL}/games/${gameId}`);
+    const response = await fetchWithValidators(`${API_BASE_URL}/games/${gameId}`);
     const data = await response.json();
 
     if (!response.ok) {
@@ -1062,8 +1149,7 @@ async function loadGameDetailsPage(gameId) {
       game.participants.some((p) => p.user_id === currentUser.user_id);
 
     // Check if game is full
-    const isFull =
-      game.participants && game.participants.length >= game.max_players;
+    const isFull = game.current_players >= game.max_players;
 
     mainContent.innerHTML = `
             <div class="row">
@@ -1080,9 +1166,7 @@ async function loadGameDetailsPage(gameId) {
                                   game.skill_level || "Not specified"
                                 }<br>
                                 <strong>Players:</strong> ${
-                                  game.participants
-                                    ? game.participants.length
-                                    : 0
+                                  game.current_players
                                 }/${game.max_players}<br>
                                 <strong>Status:</strong> ${
                                   game.status.charAt(0).toUpperCase() +
@@ -1557,7 +1641,8 @@ function loadCourtsPage() {
     <div class="row mb-4">
       <div class="col-md-8">
         <div class="input-group">
-          <input type="text" class="form-control" id="court-search" placeholder="Search courts by name">
+          <input type="text" class="form-control" id="court-search" placeholder="Search courts by name" list="court-suggestions" autocomplete="off">
+          <datalist id="court-suggestions"></datalist>
           <button class="btn btn-primary" id="search-courts-btn">Search</button>
         </div>
       </div>
@@ -1598,6 +1683,8 @@ function loadCourtsPage() {
     }
   });
 
+  setUpCourtSuggestions(document.getElementById("court-search"));
+
   // Near me search functionality
   const searchNearMeBtn = document.getElementById("search-near-me-btn");
   const radiusControls = document.getElementById("radius-controls");
@@ -1630,12 +1717,44 @@ function loadCourtsPage() {
   });
 }
 
-// Fetch all courts from the API
+// Build a court card, with the distance when the court came from a location search
+function createCourtCard(court) {
+  const courtCard = document.createElement("div");
+  courtCard.className = "col-md-6 col-lg-4 mb-4";
+  courtCard.innerHTML = `
+    <div class="card court-card">
+      <div class="card-body">
+        <h5 class="card-title">${court.name}</h5>
+        <p class="card-text">${court.address || "No address provided"}</p>
+        ${
+          court.distance !== undefined
+            ? `<p class="card-text text-success"><strong>${court.distance} km away</strong></p>`
+            : ""
+        }
+        <button class="btn btn-primary" onclick="navigateTo('court-details', ${
+          court.court_id
+        })">View Details</button>
+      </div>
+    </div>
+  `;
+  return courtCard;
+}
+
+// Render a page of courts and offer to load the next one
+function renderCourtsPage(courtsContainer, courts, url, nextCursor) {
+  courts.forEach((court) => courtsContainer.appendChild(createCourtCard(court)));
+  appendLoadMoreButton(courtsContainer, url, nextCursor, "courts", (more) =>
+    renderCourtsPage(courtsContainer, more, url, null)
+  );
+}
+
+// Fetch courts from the API, one page at a time
 async function fetchCourts() {
   const courtsContainer = document.getElementById("courts-container");
 
   try {
-    const response = await fetch(`${API_BASE_URL}/courts`);
+    const url = `${API_BASE_URL}/courts`;
+    const response = await fetchWithValidators(url);
 
     if (!response.ok) {
       throw new Error("Failed to fetch courts");
@@ -1653,23 +1772,7 @@ async function fetchCourts() {
     }
 
     courtsContainer.innerHTML = "";
-
-    data.courts.forEach((court) => {
-      const courtCard = document.createElement("div");
-      courtCard.className = "col-md-6 col-lg-4 mb-4";
-      courtCard.innerHTML = `
-        <div class="card court-card">
-          <div class="card-body">
-            <h5 class="card-title">${court.name}</h5>
-            <p class="card-text">${court.address || "No address provided"}</p>
-            <button class="btn btn-primary" onclick="navigateTo('court-details', ${
-              court.court_id
-            })">View Details</button>
-          </div>
-        </div>
-      `;
-      courtsContainer.appendChild(courtCard);
-    });
+    renderCourtsPage(courtsContainer, data.courts, url, data.next_cursor);
   } catch (error) {
     console.error("Error fetching courts:", error);
     courtsContainer.innerHTML = `
@@ -1682,6 +1785,51 @@ async function fetchCourts() {
   }
 }
 
+// Typeahead for the court search box; picking a suggestion opens that court
+function setUpCourtSuggestions(input) {
+  const datalist = document.getElementById("court-suggestions");
+  let suggestions = [];
+  let timer = null;
+  let latestPrefix = "";
+
+  input.addEventListener("input", (e) => {
+    const prefix = input.value.trim();
+
+    // Choosing a datalist option fills the input without a typed inputType
+    if (!e.inputType || e.inputType === "insertReplacementText") {
+      const chosen = suggestions.find((court) => court.name === input.value);
+      if (chosen) {
+        navigateTo("court-details", chosen.court_id);
+        return;
+      }
+    }
+
+    clearTimeout(timer);
+    if (!prefix) {
+      datalist.innerHTML = "";
+      return;
+    }
+    timer = setTimeout(async () => {
+      latestPrefix = prefix;
+      try {
+        const response = await fetch(
+          `${API_BASE_URL}/search/courts/suggest?prefix=${encodeURIComponent(prefix)}&limit=8`
+        );
+        if (!response.ok || prefix !== latestPrefix) return;
+        suggestions = (await response.json()).suggestions;
+        datalist.innerHTML = "";
+        suggestions.forEach((court) => {
+          const option = document.createElement("option");
+          option.value = court.name;
+          datalist.appendChild(option);
+        });
+      } catch (error) {
+        console.error("Error fetching court suggestions:", error);
+      }
+    }, 150);
+  });
+}
+
 // Search courts function
 async function searchCourts(query) {
   if (!query) {
@@ -1699,9 +1847,8 @@ async function searchCourts(query) {
   `;
 
   try {
-    const response = await fetch(
-      `${API_BASE_URL}/search/courts?q=${encodeURIComponent(query)}`
-    );
+    const url = `${API_BASE_URL}/search/courts?q=${encodeURIComponent(query)}`;
+    const response = await fetch(url);
     if (!response.ok) {
       throw new Error("Search failed");
     }
@@ -1720,35 +1867,18 @@ async function searchCourts(query) {
 
     courtsContainer.innerHTML = "";
 
-    data.courts.forEach((court) => {
-      const courtCard = document.createElement("div");
-      courtCard.className = "col-md-6 col-lg-4 mb-4";
-      courtCard.innerHTML = `
-        <div class="card court-card">
-            <div class="card-body">
-                <h5 class="card-title">${court.name}</h5>
-                <p class="card-text">${
-                  court.address || "No address provided"
-                }</p>
-                <button class="btn btn-primary" onclick="navigateTo('court-details', ${
-                  court.court_id
-                })">View Details</button>
-            </div>
-        </div>
-      `;
-      courtsContainer.appendChild(courtCard);
-    });
-
-    // Show search method information
+    // Show search method information above the results
     const searchMethodInfo = document.createElement("div");
-    searchMethodInfo.className = "col-12 mt-3";
+    searchMethodInfo.className = "col-12 mb-3";
     searchMethodInfo.innerHTML = `
       <div class="alert alert-info">
-          Search method: ${data.search_method} | Found ${data.courts.length} results for "${query}"
+          Search method: ${data.search_method} | Results for "${query}"
           <button class="btn btn-sm btn-primary float-end" onclick="loadCourtsPage()">Show All Courts</button>
       </div>
     `;
     courtsContainer.appendChild(searchMethodInfo);
+
+    renderCourtsPage(courtsContainer, data.courts, url, data.next_cursor);
   } catch (error) {
     console.error("Error searching courts:", error);
     courtsContainer.innerHTML = `
@@ -1774,9 +1904,8 @@ async function searchCourtsByLocation(lat, lng, radius = 10) {
   `;
 
   try {
-    const response = await fetch(
-      `${API_BASE_URL}/search/courts?lat=${lat}&lng=${lng}&radius=${radius}`
-    );
+    const url = `${API_BASE_URL}/search/courts?lat=${lat}&lng=${lng}&radius=${radius}`;
+    const response = await fetch(url);
 
     if (!response.ok) {
       throw new Error("Location search failed");
@@ -1797,32 +1926,12 @@ async function searchCourtsByLocation(lat, lng, radius = 10) {
     courtsContainer.innerHTML = `
       <div class="col-12 mb-3">
         <div class="alert alert-info">
-          Showing ${data.courts.length} courts within ${radius} km of your location
+          Showing courts within ${radius} km of your location
         </div>
       </div>
     `;
 
-    data.courts.forEach((court) => {
-      const courtCard = document.createElement("div");
-      courtCard.className = "col-md-6 col-lg-4 mb-4";
-      courtCard.innerHTML = `
-        <div class="card court-card">
-            <div class="card-body">
-                <h5 class="card-title">${court.name}</h5>
-                <p class="card-text">${
-                  court.address || "No address provided"
-                }</p>
-                <p class="card-text text-success">
-                  <strong>${court.distance} km away</strong>
-                </p>
-                <button class="btn btn-primary" onclick="navigateTo('court-details', ${
-                  court.court_id
-                })">View Details</button>
-            </div>
-        </div>
-      `;
-      courtsContainer.appendChild(courtCard);
-    });
+    renderCourtsPage(courtsContainer, data.courts, url, data.next_cursor);
   } catch (error) {
     console.error("Error searching courts by location:", error);
     courtsContainer.innerHTML = `
@@ -35,6 +35,74 @@ class Config:
     
     # JWT configuration
     JWT_ACCESS_TOKEN_EXPIRES = 3600  # 1 hour
+    
+    # Keyset pagination for list endpoints
+    PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 50))
+    MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 200))
+    
+    # In-process court geo index (off: bounding-box SQL queries instead)
+    GEO_INDEX_ENABLED = os.environ.get('GEO_INDEX_ENABLED', 'true').lower() == 'true'
+    GEO_INDEX_CELL_DEGREES = float(os.environ.get('GEO_INDEX_CELL_DEGREES', 0.25))
+    GEO_INDEX_REFRESH_SECONDS = int(os.environ.get('GEO_INDEX_REFRESH_SECONDS', 60))
+    # Location search cache: geohash cells of GEO_CACHE_PRECISION characters
+    # (6 is about 1.2 x 0.6 km) and power-of-two radius buckets
+    GEO_CACHE_ENABLED = os.environ.get('GEO_CACHE_ENABLED', 'true').lower() == 'true'
+    GEO_CACHE_PRECISION = int(os.environ.get('GEO_CACHE_PRECISION', 6))
+    GEO_CACHE_TTL_SECONDS = int(os.environ.get('GEO_CACHE_TTL_SECONDS', 30))
+    GEO_CACHE_MAX_ENTRIES = int(os.environ.get('GEO_CACHE_MAX_ENTRIES', 1024))
+    GEO_CACHE_MAX_RADIUS_KM = float(os.environ.get('GEO_CACHE_MAX_RADIUS_KM', 100))
+    # Encoded court JSON reused across responses until the court's updated_at changes
+    COURT_PAYLOAD_CACHE_ENABLED = os.environ.get('COURT_PAYLOAD_CACHE_ENABLED', 'true').lower() == 'true'
+    # Seconds clients may reuse a court or game response before revalidating it with its ETag
+    HTTP_CACHE_MAX_AGE = int(os.environ.get('HTTP_CACHE_MAX_AGE', 0))
+    # gzip/brotli for API and page responses; static JS and CSS are precompressed by build-static
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_MIMETYPES = ['application/json', 'text/html']
+    ASSETS_BUILD_DIR = os.environ.get('ASSETS_BUILD_DIR')  # Defaults to app/static/dist
+    NEAREST_COURTS_MAX_K = int(os.environ.get('NEAREST_COURTS_MAX_K', 100))
+    GAMES_BATCH_MAX_IDS = int(os.environ.get('GAMES_BATCH_MAX_IDS', 500))
+    COURT_GAMES_LIMIT = int(os.environ.get('COURT_GAMES_LIMIT', 20))  # Games embedded by ?include=games
+    
+    # Matchmaking (/api/games/match): open games in an in-process index, or
+    # ranked straight from SQL with MATCH_INDEX_ENABLED off
+    MATCH_INDEX_ENABLED = os.environ.get('MATCH_INDEX_ENABLED', 'true').lower() == 'true'
+    MATCH_INDEX_REFRESH_SECONDS = int(os.environ.get('MATCH_INDEX_REFRESH_SECONDS', 60))
+    MATCH_DAYS = int(os.environ.get('MATCH_DAYS', 7))
+    MATCH_MAX_DAYS = int(os.environ.get('MATCH_MAX_DAYS', 31))  # Longest from-to window a match can ask for
+    MATCH_LIMIT = int(os.environ.get('MATCH_LIMIT', 20))
+    
+    # Text search without Elasticsearch: 'memory' (in-process BM25) or
+    # 'database' (SQLite FTS5 / Postgres tsvector)
+    TEXT_SEARCH_BACKEND = os.environ.get('TEXT_SEARCH_BACKEND', 'memory')
+    TEXT_INDEX_REFRESH_SECONDS = int(os.environ.get('TEXT_INDEX_REFRESH_SECONDS', 60))
+    SUGGEST_MAX_LIMIT = int(os.environ.get('SUGGEST_MAX_LIMIT', 25))
+    
+    # Elasticsearch (optional): one pooled client per worker, skipped for
+    # ELASTICSEARCH_BREAKER_RESET_SECONDS after repeated failures
+    ELASTICSEARCH_URL = os.environ.get('ELASTICSEARCH_URL')
+    ELASTICSEARCH_USERNAME = os.environ.get('ELASTICSEARCH_USERNAME')
+    ELASTICSEARCH_PASSWORD = os.environ.get('ELASTICSEARCH_PASSWORD')
+    ELASTICSEARCH_INDEX = os.environ.get('ELASTICSEARCH_INDEX', 'pickleball_dev')
+    # Store serialized courts/games in the index and answer searches from _source
+    ELASTICSEARCH_SOURCE_ONLY = os.environ.get('ELASTICSEARCH_SOURCE_ONLY', 'false').lower() == 'true'
+    # Search index updates are written to an outbox table with each change
+    # and sent to Elasticsearch in bulk by a background drainer
+    SEARCH_OUTBOX_ENABLED = os.environ.get(
+        'SEARCH_OUTBOX_ENABLED', 'true' if os.environ.get('ELASTICSEARCH_URL') else 'false'
+    ).lower() == 'true'
+    SEARCH_OUTBOX_INTERVAL = float(os.environ.get('SEARCH_OUTBOX_INTERVAL', 2))
+    SEARCH_OUTBOX_BATCH_SIZE = int(os.environ.get('SEARCH_OUTBOX_BATCH_SIZE', 500))
+    # First retry delay for documents Elasticsearch rejected, doubled per attempt
+    SEARCH_OUTBOX_RETRY_SECONDS = float(os.environ.get('SEARCH_OUTBOX_RETRY_SECONDS', 5))
+    ELASTICSEARCH_TIMEOUT = float(os.environ.get('ELASTICSEARCH_TIMEOUT', 2))
+    # Bulk requests while reindexing carry far more documents than a search
+    ELASTICSEARCH_BULK_TIMEOUT = float(os.environ.get('ELASTICSEARCH_BULK_TIMEOUT', 60))
+    ELASTICSEARCH_MAX_RETRIES = int(os.environ.get('ELASTICSEARCH_MAX_RETRIES', 1))
+    ELASTICSEARCH_POOL_SIZE = int(os.environ.get('ELASTICSEARCH_POOL_SIZE', 10))
+    ELASTICSEARCH_BREAKER_THRESHOLD = int(os.environ.get('ELASTICSEARCH_BREAKER_THRESHOLD', 5))
+    ELASTICSEARCH_BREAKER_RESET_SECONDS = int(os.environ.get('ELASTICSEARCH_BREAKER_RESET_SECONDS', 30))
 
 
 class DevelopmentConfig(Config):
@@ -67,6 +135,8 @@ class TestingConfig(Config):
     TESTING = True
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    ELASTICSEARCH_URL = None
+    SEARCH_OUTBOX_ENABLED = False
 
 
 # Dictionary to easily select the configuration
@@ -84,6 +84,48 @@ def run_tests(args):
     if not result.wasSuccessful():
         sys.exit(1)
 
+def reindex_search(args):
+    """Rebuild the Elasticsearch indices from the database."""
+    if args.env:
+        os.environ['FLASK_ENV'] = args.env
+    else:
+        os.environ.setdefault('FLASK_ENV', 'development')
+    
+    # Import here to avoid circular imports
+    from app import create_app
+    from app.services.es_reindex import reindex
+    app = create_app(os.environ['FLASK_ENV'])
+    with app.app_context():
+        for kind in args.only or ['courts', 'games']:
+            count = reindex(kind, chunk_size=args.chunk_size, workers=args.workers, keep_old=args.keep_old)
+            print(f"Reindexed {count} {kind}")
+
+def sync_search(args):
+    """Send pending search outbox entries to Elasticsearch."""
+    if args.env:
+        os.environ['FLASK_ENV'] = args.env
+    else:
+        os.environ.setdefault('FLASK_ENV', 'development')
+    
+    # Import here to avoid circular imports
+    from app import create_app
+    from app.services.search_outbox import drain_all
+    app = create_app(os.environ['FLASK_ENV'])
+    with app.app_context():
+        count = drain_all(args.batch_size)
+        print(f"Synced {count} outbox entries")
+
+def build_static(args):
+    """Write content-hashed, precompressed copies of the static JS and CSS."""
+    # Import here to avoid circular imports
+    from app.assets import build_assets
+    static_dir = Path('app/static')
+    # Earlier builds are kept so pages still open in browsers can load their assets
+    out_dir = Path(args.out) if args.out else static_dir / 'dist'
+    manifest = build_assets(str(static_dir), str(out_dir))
+    for logical, hashed in manifest.items():
+        print(f"{logical} -> {hashed}")
+
 def create_env_file(args):
     """Create or update .env file with default values."""
     env_path = Path('.env')
@@ -141,6 +183,29 @@ def main():
     test_parser.add_argument('--test-path', help='Path to test files')
     test_parser.set_defaults(func=run_tests)
     
+    # Reindex command
+    reindex_parser = subparsers.add_parser('reindex', help='Rebuild the Elasticsearch indices')
+    reindex_parser.add_argument('--env', choices=['development', 'production', 'testing'], 
+                               help='Environment to run in')
+    reindex_parser.add_argument('--only', action='append', choices=['courts', 'games'],
+                               help='Index to rebuild (default: both)')
+    reindex_parser.add_argument('--chunk-size', type=int, default=500, help='Documents per bulk request')
+    reindex_parser.add_argument('--workers', type=int, default=4, help='Parallel bulk requests')
+    reindex_parser.add_argument('--keep-old', action='store_true', help='Keep the previous index')
+    reindex_parser.set_defaults(func=reindex_search)
+    
+    # Search outbox sync command (for deployments without a long-running worker)
+    sync_parser = subparsers.add_parser('sync-search', help='Send pending search index updates')
+    sync_parser.add_argument('--env', choices=['development', 'production', 'testing'], 
+                            help='Environment to run in')
+    sync_parser.add_argument('--batch-size', type=int, default=500, help='Outbox entries per bulk request')
+    sync_parser.set_defaults(func=sync_search)
+    
+    # Static build command (runs at deploy from bin/post_compile)
+    static_parser = subparsers.add_parser('build-static', help='Build hashed, precompressed static files')
+    static_parser.add_argument('--out', help='Output directory (default: app/static/dist)')
+    static_parser.set_defaults(func=build_static)
+    
     # Env command
     env_parser = subparsers.add_parser('create-env', help='Create .env file')
     env_parser.add_argument('--env', choices=['development', 'production', 'testing'], 
@@ -13,6 +13,132 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app import db, create_app
 
+def drop_invalid_indexes(names):
+    """
+    Drop the indexes among names left invalid by an interrupted CREATE INDEX
+    CONCURRENTLY, so they get rebuilt. Indexes another session is still
+    building are left alone.
+    """
+    from sqlalchemy import text
+    if not names:
+        return
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        invalid = connection.execute(text(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE NOT i.indisvalid AND n.nspname = current_schema() AND c.relname = ANY(:names) "
+            "AND NOT EXISTS (SELECT 1 FROM pg_stat_progress_create_index p WHERE p.index_relid = i.indexrelid)"
+        ), {'names': list(names)}).scalars().all()
+        for name in invalid:
+            print(f"Dropping invalid index {name}...")
+            connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+
+def create_missing_indexes():
+    """
+    Create indexes declared on the models that existing tables don't have yet.
+    
+    On PostgreSQL they are built with CREATE INDEX CONCURRENTLY, outside a
+    transaction, so the release phase doesn't block writes to live tables
+    while an index builds.
+    """
+    from sqlalchemy import inspect
+    online = db.engine.dialect.name == 'postgresql'
+    if online:
+        # Only the indexes declared on the models; other tools' indexes aren't ours to drop
+        drop_invalid_indexes(sorted(index.name for table in db.metadata.sorted_tables for index in table.indexes))
+    inspector = inspect(db.engine)
+    
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            print(f"Creating index {index.name} on {table.name}...")
+            if not online:
+                index.create(bind=db.engine)
+                continue
+            # Only for this build: create_all() runs in a transaction, where CONCURRENTLY isn't allowed
+            index.dialect_options['postgresql']['concurrently'] = True
+            try:
+                with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                    index.create(bind=connection)
+            finally:
+                index.dialect_options['postgresql']['concurrently'] = False
+
+def add_missing_columns():
+    """
+    Add columns declared on the models that existing tables don't have yet.
+    Each needs a server default (or to be nullable) so existing rows get a value.
+    """
+    from sqlalchemy import inspect, text
+    from sqlalchemy.schema import CreateColumn
+    inspector = inspect(db.engine)
+    added = []
+    
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            print(f"Adding column {column.name} to {table.name}...")
+            definition = CreateColumn(column).compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {definition}'))
+            added.append((table.name, column.name))
+    return added
+
+def backfill_current_players():
+    """Set games.current_players from the participant rows it counts"""
+    from sqlalchemy import text
+    print("Backfilling games.current_players...")
+    with db.engine.begin() as connection:
+        connection.execute(text(
+            "UPDATE games SET current_players = "
+            "(SELECT COUNT(*) FROM game_participants WHERE game_participants.game_id = games.game_id)"
+        ))
+
+def backfill_max_players():
+    """
+    Give games saved with no max_players the default of 4, so they can be
+    joined, then make the column NOT NULL where the database can alter it.
+    """
+    from sqlalchemy import inspect, text
+    with db.engine.begin() as connection:
+        filled = connection.execute(text("UPDATE games SET max_players = 4 WHERE max_players IS NULL")).rowcount
+    if filled:
+        print(f"Set max_players to 4 on {filled} games...")
+    if db.engine.dialect.name != 'postgresql':
+        return
+    columns = {column['name']: column for column in inspect(db.engine).get_columns('games')}
+    if columns['max_players']['nullable']:
+        print("Making games.max_players NOT NULL...")
+        with db.engine.begin() as connection:
+            connection.execute(text(
+                "ALTER TABLE games ALTER COLUMN max_players SET DEFAULT 4, "
+                "ALTER COLUMN max_players SET NOT NULL"
+            ))
+
+def migrate_schema():
+    """Bring tables created by an older version up to date with the models."""
+    added = add_missing_columns()
+    if ('games', 'current_players') in added:
+        backfill_current_players()
+    backfill_max_players()
+    # create_all() skips tables that already exist, so add new indexes explicitly
+    create_missing_indexes()
+
+def create_fulltext(app):
+    """Create the database full-text search objects when that backend is configured."""
+    if app.config.get('TEXT_SEARCH_BACKEND') != 'database':
+        return
+    from app.services.fulltext import ensure_fulltext
+    print("Setting up database full-text search...")
+    ensure_fulltext(db.engine)
+
 def create_or_migrate_db():
     """Initialize or migrate the database on Heroku or other cloud platforms."""
     env = os.environ.get('FLASK_ENV', 'production')
@@ -61,6 +187,9 @@ def create_or_migrate_db():
                     return False
             else:
                 print(f"Database contains tables: {', '.join(tables)}")
+            
+            migrate_schema()
+            create_fulltext(app)
                 
             return True
         except Exception as e:
@@ -76,6 +205,8 @@ def create_or_migrate_db():
                 tables = inspector.get_table_names()
                 if tables:
                     print(f"Tables created: {', '.join(tables)}")
+                    migrate_schema()
+                    create_fulltext(app)
                     return True
                 else:
                     print("Warning: No tables were created", file=sys.stderr)
@@ -12,7 +12,10 @@ def run_all_tests():
     # Add test modules
     test_modules = [
         'test_models',
-        'test_api'
+        'test_api',
+        'test_search',
+        'test_compression',
+        'test_matchmaking'
     ]
     
     # Load tests from each module
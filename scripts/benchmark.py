@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+"""
+Micro-benchmarks for hot code paths.
+Each subcommand times a new implementation against the code it replaced.
+"""
+
+import os
+import sys
+import argparse
+import itertools
+import random
+import statistics
+import time
+
+# Add parent directory to path so we can import app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+def timed(fn, repeat):
+    """Run fn repeat times and return the per-call timings in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def report(label, timings):
+    """Print p50/p99 for a list of timings in milliseconds."""
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{label:<28} p50 {statistics.median(timings):9.3f} ms   p99 {p99:9.3f} ms")
+
+def random_points(count, seed=42):
+    """Random (lat, lng) points over the continental United States."""
+    rng = random.Random(seed)
+    return [(rng.uniform(25, 49), rng.uniform(-124, -67)) for _ in range(count)]
+
+def bench_nearest(args):
+    """k-nearest courts: KD-tree vs linear Haversine scan."""
+    from app.services.geo_index import calculate_distance
+    from app.services.kdtree import KDTree
+
+    courts = dict(enumerate(random_points(args.courts)))
+    queries = random_points(args.queries, seed=7)
+    tree = KDTree(courts)
+
+    def linear_scan(lat, lng):
+        distances = [(calculate_distance(lat, lng, c_lat, c_lng), court_id)
+                     for court_id, (c_lat, c_lng) in courts.items()]
+        distances.sort()
+        return distances[:args.k]
+
+    print(f"{args.courts} courts, k={args.k}, {args.queries} queries")
+    points = itertools.cycle(queries)
+    report('linear scan', timed(lambda: linear_scan(*next(points)), args.queries))
+    report('kd-tree', timed(lambda: tree.nearest(*next(points), args.k), args.queries))
+
+def bench_hydration(args):
+    """Turning Elasticsearch hits into results: DB hydration vs payloads in _source."""
+    from app import create_app, db
+    from app.services.es_search import hits_to_dicts
+    from app.models.court import Court
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Court(uuid=f'bench-{i}', name=f'Court {i}', address=f'{i} Main St', lat=lat, lng=lng,
+                  amenities='["Lights", "Restrooms"]')
+            for i, (lat, lng) in enumerate(random_points(args.courts))
+        ])
+        db.session.commit()
+
+        rng = random.Random(3)
+        court_ids = [court_id for court_id, in db.session.query(Court.court_id)]
+        pages = [rng.sample(court_ids, args.hits) for _ in range(args.queries)]
+        payloads = {court.court_id: court.to_dict() for court in Court.query}
+        db.session.expire_all()
+
+        def nested_loop(ids):
+            # The previous code: IN (...) then a nested loop to restore ranking order
+            courts = Court.query.filter(Court.court_id.in_(ids)).all()
+            sorted_courts = []
+            for court_id in ids:
+                for court in courts:
+                    if court.court_id == court_id:
+                        sorted_courts.append(court)
+                        break
+            return [court.to_dict() for court in sorted_courts]
+
+        def id_hits(ids):
+            return [{'_source': {'court_id': court_id}} for court_id in ids]
+
+        def payload_hits(ids):
+            return [{'_source': {'court_id': court_id, 'payload': payloads[court_id]}} for court_id in ids]
+
+        print(f"{args.courts} courts, {args.hits} hits per page, {args.queries} queries")
+        page = itertools.cycle(pages)
+        report('IN + nested loop', timed(lambda: nested_loop(next(page)), args.queries))
+        report('IN + id map', timed(
+            lambda: hits_to_dicts(id_hits(next(page)), 'court_id', Court.query, Court.court_id), args.queries
+        ))
+        report('source only', timed(
+            lambda: hits_to_dicts(payload_hits(next(page)), 'court_id', Court.query, Court.court_id), args.queries
+        ))
+
+def bench_serialize(args):
+    """Court.to_dict over every court in courts.json: json.loads per call vs memoized decoding."""
+    import json
+    from app import create_app, db
+    from app.models import court as court_module
+    from app.models.court import Court
+
+    with open(args.courts_file, 'r', encoding='utf-8') as f:
+        courts_data = json.load(f)['courts']
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Court(uuid=data['id'], name=data['name'], address=data.get('address'),
+                  lat=(data.get('location') or {}).get('lat'), lng=(data.get('location') or {}).get('lng'),
+                  hours=data.get('hours'), photos=data.get('photos'), amenities=data.get('amenities'),
+                  reviews=data.get('reviews'))
+            for data in courts_data
+        ])
+        db.session.commit()
+
+        def listing():
+            # A fresh query per pass, like a request: new row objects, same stored text
+            db.session.expire_all()
+            return [court.to_dict() for court in Court.query]
+
+        memoized = court_module.decode_json
+        print(f"{len(courts_data)} courts, {args.repeat} listings")
+        court_module.decode_json = json.loads
+        try:
+            report('json.loads per call', timed(listing, args.repeat))
+        finally:
+            court_module.decode_json = memoized
+        report('memoized decode', timed(listing, args.repeat))
+
+def bench_match(args):
+    """Matchmaking: open slot index vs scoring every open game."""
+    from datetime import date, datetime, time as clock, timedelta
+    from app.services.match_index import MatchRequest, OpenGame, OpenSlotIndex, Ranking
+
+    rng = random.Random(5)
+    courts = random_points(args.courts)
+    skills = ['beginner', 'intermediate', 'advanced', None]
+    today = date.today()
+    games = []
+    for game_id in range(args.games):
+        lat, lng = rng.choice(courts)
+        starts_at = datetime.combine(today + timedelta(days=rng.randrange(1, args.days + 1)),
+                                     clock(rng.randrange(6, 22), 0))
+        games.append(OpenGame(game_id, 0, starts_at, rng.choice(skills), rng.randrange(1, 4), lat, lng))
+
+    index = OpenSlotIndex()
+    for game in games:
+        index._add(game)
+
+    now = datetime.combine(today, clock(12, 0))
+    requests = [
+        MatchRequest(today, today + timedelta(days=6), rng.choice(skills[:3]), (lat, lng, args.radius), now=now)
+        for lat, lng in random_points(args.queries, seed=7)
+    ]
+    anywhere = [MatchRequest(today, today + timedelta(days=6), rng.choice(skills[:3]), now=now)
+                for _ in range(args.queries)]
+
+    def scan(wanted):
+        ranking = Ranking(args.limit)
+        for game in games:
+            scored = wanted.score(game)
+            if scored is not None:
+                ranking.add(game.game_id, *scored)
+        return ranking.results()
+
+    print(f"{args.games} open games at {args.courts} courts over {args.days} days, "
+          f"radius {args.radius} km, {args.queries} queries")
+    for label, queries in (('near me', requests), ('anywhere', anywhere)):
+        wanted = itertools.cycle(queries)
+        report(f'scan all ({label})', timed(lambda: scan(next(wanted)), args.queries))
+        report(f'open slot index ({label})', timed(lambda: index.match(next(wanted), args.limit), args.queries))
+
+def bench_text(args):
+    """Court text search and suggestions: in-process indexes vs the ILIKE scans they replaced."""
+    import json
+    from app import create_app, db
+    from app.models.court import Court
+    from app.services.suggest_index import get_suggest_index
+    from app.services.text_index import get_text_index
+
+    with open(args.courts_file, 'r', encoding='utf-8') as f:
+        courts_data = json.load(f)['courts']
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Court(uuid=data['id'], name=data['name'], address=data.get('address'),
+                  lat=(data.get('location') or {}).get('lat'), lng=(data.get('location') or {}).get('lng'),
+                  court_type=data.get('courtType'), surface_type=data.get('surfaceType'),
+                  amenities=data.get('amenities'))
+            for data in courts_data
+        ])
+        db.session.commit()
+        text_index = get_text_index()
+        suggest_index = get_suggest_index()
+
+        queries = itertools.cycle(['park', 'community center', 'tennis', 'ymca', 'recreation', 'adorni'])
+        prefixes = itertools.cycle(['a', 'ar', 'park', 'community c', 'eur', 'ymca', 'fortuna', 'zz'])
+
+        print(f"{len(courts_data)} courts, {args.queries} queries")
+        report('ILIKE name scan', timed(
+            lambda: Court.query.filter(Court.name.ilike(f'%{next(queries)}%')).all(), args.queries
+        ))
+        report('BM25 text index', timed(lambda: text_index.search_courts(next(queries)), args.queries))
+        report('ILIKE prefix scan', timed(
+            lambda: Court.query.filter(Court.name.ilike(f'{next(prefixes)}%')).limit(10).all(), args.queries
+        ))
+        report('suggest index', timed(lambda: suggest_index.suggest(next(prefixes)), args.queries))
+
+def main():
+    parser = argparse.ArgumentParser(description='Pickleball micro-benchmarks')
+    subparsers = parser.add_subparsers(dest='command', help='Benchmark to run')
+
+    nearest_parser = subparsers.add_parser('nearest', help='k-nearest courts lookup')
+    nearest_parser.add_argument('--courts', type=int, default=100000, help='Number of synthetic courts')
+    nearest_parser.add_argument('--queries', type=int, default=100, help='Number of queries')
+    nearest_parser.add_argument('-k', type=int, default=10, help='Courts per query')
+    nearest_parser.set_defaults(func=bench_nearest)
+
+    hydration_parser = subparsers.add_parser('hydration', help='Elasticsearch hit hydration')
+    hydration_parser.add_argument('--courts', type=int, default=5000, help='Number of synthetic courts')
+    hydration_parser.add_argument('--hits', type=int, default=200, help='Hits per search page')
+    hydration_parser.add_argument('--queries', type=int, default=100, help='Number of queries')
+    hydration_parser.set_defaults(func=bench_hydration)
+
+    serialize_parser = subparsers.add_parser('serialize', help='Court.to_dict JSON column decoding')
+    serialize_parser.add_argument('--courts-file', default='courts.json', help='Court catalogue to load')
+    serialize_parser.add_argument('--repeat', type=int, default=50, help='Number of full listings')
+    serialize_parser.set_defaults(func=bench_serialize)
+
+    match_parser = subparsers.add_parser('match', help='Matchmaking over open games')
+    match_parser.add_argument('--games', type=int, default=100000, help='Number of synthetic open games')
+    match_parser.add_argument('--courts', type=int, default=5000, help='Number of synthetic courts')
+    match_parser.add_argument('--days', type=int, default=30, help='Days the games are spread over')
+    match_parser.add_argument('--radius', type=float, default=25, help='Search radius in km')
+    match_parser.add_argument('--limit', type=int, default=20, help='Results per query')
+    match_parser.add_argument('--queries', type=int, default=200, help='Number of queries')
+    match_parser.set_defaults(func=bench_match)
+
+    text_parser = subparsers.add_parser('text', help='Court text search and suggestions')
+    text_parser.add_argument('--courts-file', default='courts.json', help='Court catalogue to load')
+    text_parser.add_argument('--queries', type=int, default=500, help='Number of queries')
+    text_parser.set_defaults(func=bench_text)
+
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        return
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
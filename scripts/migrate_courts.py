@@ -30,7 +30,7 @@ dotenv.load_dotenv = lambda *args, **kwargs: None
 
 from app import create_app, db
 from app.models.court import Court
-from app.services.elasticsearch import create_indices, index_court
+from app.services.es_reindex import reindex
 
 # Configure logging
 logging.basicConfig(
@@ -106,13 +106,6 @@ def migrate_courts():
         Court.query.delete()
         db.session.commit()
         
-        # Create Elasticsearch indices
-        try:
-            create_indices()
-            print("Elasticsearch indices created successfully!")
-        except Exception as e:
-            print(f"Error creating Elasticsearch indices: {e}")
-        
         # Create new courts
         for court_data in courts_data:
             # Extract location data
@@ -143,11 +136,10 @@ def migrate_courts():
         
         db.session.commit()
         
-        # Index courts in Elasticsearch
+        # Index courts in Elasticsearch (creates a fresh index behind the alias)
         try:
-            for court in Court.query.all():
-                index_court(court)
-            print("Courts indexed in Elasticsearch successfully!")
+            count = reindex('courts')
+            print(f"Indexed {count} courts in Elasticsearch successfully!")
         except Exception as e:
             print(f"Error indexing courts in Elasticsearch: {e}")
         
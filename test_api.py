@@ -1,11 +1,13 @@
 import os
 import json
 import unittest
+from contextlib import contextmanager
 from datetime import datetime, time, date, timedelta
+from sqlalchemy import event
 from app import create_app, db
 from app.models.user import User
 from app.models.court import Court
-from app.models.game import Game, GameParticipant
+from app.models.game import Game, GameFullError, GameParticipant
 from app.models.chat import ChatMessage
 
 class TestAPI(unittest.TestCase):
@@ -132,6 +134,56 @@ class TestAPI(unittest.TestCase):
         self.assertEqual(data['name'], 'Test Court')
         print("✓ Get court by ID endpoint works")
     
+    def test_court_with_games(self):
+        """?include=games embeds the court's next scheduled games in the court response"""
+        court_id = self.court.court_id
+        past = Game(court_id=court_id, creator_id=self.user.user_id,
+                    date=date.today() - timedelta(days=3), time=time(9, 0))
+        cancelled = Game(court_id=court_id, creator_id=self.user.user_id,
+                         date=date.today() + timedelta(days=2), time=time(9, 0))
+        cancelled.status = 'cancelled'
+        db.session.add_all([past, cancelled])
+        db.session.commit()
+        self.add_games(3)
+        
+        data = json.loads(self.client.get(f'/api/courts/{court_id}').data)
+        self.assertNotIn('games', data)
+        
+        with self.count_queries() as statements:
+            response = self.client.get(f'/api/courts/{court_id}?include=games')
+        data = json.loads(response.data)
+        self.assertEqual(data['name'], 'Test Court')
+        keys = [(g['date'], g['time'], g['game_id']) for g in data['games']]
+        # The next games: past and cancelled ones are left out
+        self.assertEqual(len(keys), 4)
+        self.assertEqual(keys, sorted(keys))
+        self.assertNotIn(past.game_id, [g['game_id'] for g in data['games']])
+        self.assertNotIn(cancelled.game_id, [g['game_id'] for g in data['games']])
+        self.assertNotIn('participants', data['games'][0])
+        self.assertEqual(data['games'][-1]['current_players'], 2)
+        # Court and games versions, then the court and its games: nothing per game
+        self.assertEqual(len(statements), 4)
+        
+        response = self.client.get(f'/api/courts/{court_id}?include=games,upcoming_only&fields=name')
+        data = json.loads(response.data)
+        self.assertEqual(set(data), {'name', 'games'})
+        self.assertEqual([g['game_id'] for g in data['games']], [key[2] for key in keys])
+        
+        upcoming = data['games']
+        self.app.config['COURT_GAMES_LIMIT'] = 2
+        data = json.loads(self.client.get(f'/api/courts/{court_id}?include=games,upcoming_only&fields=name').data)
+        self.assertEqual(data['games'], upcoming[:2])
+        
+        # Joining a game changes the embedded games' version
+        etag = response.headers['ETag']
+        self.client.post(f'/api/games/{self.game.game_id}/join', headers=self.login('testuser2'))
+        response = self.client.get(f'/api/courts/{court_id}?include=games,upcoming_only&fields=name',
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        
+        self.assertEqual(self.client.get(f'/api/courts/{court_id}?include=chat').status_code, 400)
+        self.assertEqual(self.client.get(f'/api/courts/{court_id}?include=upcoming_only').status_code, 400)
+    
     def test_game_endpoints(self):
         """Test game endpoints"""
         print("\nTesting game endpoints...")
@@ -228,6 +280,290 @@ class TestAPI(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         print("✓ Join game endpoint works with different user")
     
+    @contextmanager
+    def count_queries(self):
+        """Count the SQL statements executed inside the block"""
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    
+    def add_games(self, count):
+        """Schedule count more games, each with two participants"""
+        for i in range(count):
+            game = Game(
+                court_id=self.court.court_id,
+                creator_id=self.user.user_id,
+                date=date.today() + timedelta(days=2 + i),
+                time=time(10, 0)
+            )
+            db.session.add(game)
+            db.session.flush()
+            db.session.add(GameParticipant(game_id=game.game_id, user_id=self.user.user_id))
+            db.session.add(GameParticipant(game_id=game.game_id, user_id=self.user2.user_id))
+        db.session.commit()
+        db.session.expire_all()
+    
+    def test_game_list_query_count(self):
+        """Listing games costs the same number of queries for any number of games"""
+        with self.count_queries() as few:
+            response = self.client.get('/api/games')
+        self.assertEqual(len(json.loads(response.data)['games']), 1)
+        
+        self.add_games(10)
+        with self.count_queries() as many:
+            response = self.client.get('/api/games')
+        data = json.loads(response.data)
+        self.assertEqual(len(data['games']), 11)
+        self.assertEqual(len(data['games'][-1]['participants']), 2)
+        self.assertEqual(len(many), len(few))
+        
+        with self.count_queries() as search:
+            response = self.client.get('/api/search/games?lat=40.7128&lng=-74.0060&radius=5')
+        self.assertEqual(len(json.loads(response.data)['games']), 11)
+        self.assertLessEqual(len(search), len(few) + 1)
+    
+    def test_games_batch(self):
+        """Several games load by id in a fixed number of queries, with unknown ids reported"""
+        game_id = self.game.game_id
+        with self.count_queries() as few:
+            response = self.client.get(f'/api/games/batch?ids={game_id},9999')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(list(data['games']), [str(game_id)])
+        self.assertEqual(data['games'][str(game_id)]['court']['name'], 'Test Court')
+        self.assertEqual(data['missing'], [9999])
+        
+        self.add_games(10)
+        ids = [game.game_id for game in Game.query.order_by(Game.game_id.desc())]
+        with self.count_queries() as many:
+            response = self.client.get(f'/api/games/batch?ids={",".join(map(str, ids))},{ids[0]}')
+        data = json.loads(response.data)
+        self.assertEqual(list(data['games']), [str(i) for i in ids])
+        self.assertEqual(len(data['games'][str(ids[0])]['participants']), 2)
+        self.assertEqual(data['missing'], [])
+        self.assertEqual(len(many), len(few))
+        
+        # Sparse fields still key by id, and unchanged results revalidate
+        response = self.client.get(f'/api/games/batch?ids={game_id}&fields=status')
+        data = json.loads(response.data)
+        self.assertEqual(data['games'], {str(game_id): {'status': 'scheduled'}})
+        revalidated = self.client.get(f'/api/games/batch?ids={game_id}&fields=status',
+                                      headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+        
+        self.assertEqual(self.client.get('/api/games/batch').status_code, 400)
+        self.assertEqual(self.client.get('/api/games/batch?ids=1,x').status_code, 400)
+        self.app.config['GAMES_BATCH_MAX_IDS'] = 2
+        self.assertEqual(self.client.get('/api/games/batch?ids=1,2,3').status_code, 400)
+    
+    def collect_pages(self, url, key):
+        """Follow next_cursor links and return every item in order"""
+        items, cursor = [], None
+        while True:
+            separator = '&' if '?' in url else '?'
+            page_url = f'{url}{separator}cursor={cursor}' if cursor else url
+            data = json.loads(self.client.get(page_url).data)
+            self.assertLessEqual(len(data[key]), 2)
+            items.extend(data[key])
+            cursor = data['next_cursor']
+            if not cursor:
+                return items
+    
+    def test_keyset_pagination(self):
+        """Games and courts page through every row exactly once in order"""
+        self.add_games(4)
+        games = self.collect_pages('/api/games?limit=2', 'games')
+        self.assertEqual(len(games), 5)
+        self.assertEqual(len({g['game_id'] for g in games}), 5)
+        keys = [(g['date'], g['time'], g['game_id']) for g in games]
+        self.assertEqual(keys, sorted(keys))
+        
+        for i in range(4):
+            db.session.add(Court(uuid=f'court-{i}', name='Same Name Court'))
+        db.session.commit()
+        courts = self.collect_pages('/api/courts?limit=2', 'courts')
+        self.assertEqual(len(courts), 5)
+        self.assertEqual(len({c['court_id'] for c in courts}), 5)
+        
+        response = self.client.get('/api/courts?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/games?limit=0')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_court_payload_cache(self):
+        """Court JSON is encoded once per version and matches jsonify output"""
+        cache = self.app.extensions['court_payload_cache']
+        cache.clear()
+        expected = self.court.to_dict()
+        
+        data = json.loads(self.client.get('/api/courts').data)
+        self.assertEqual(data['courts'], [expected])
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(json.loads(self.client.get(f'/api/courts/{self.court.court_id}').data), expected)
+        game = json.loads(self.client.get(f'/api/games/{self.game.game_id}').data)['game']
+        self.assertEqual(game['court'], expected)
+        self.assertEqual(game['players'], game['participants'])
+        players = self.game.to_dict(fields=('players', 'participants'))
+        self.assertEqual(players['players'], players['participants'])
+        self.assertIsNot(players['players'][0], players['participants'][0])
+        self.assertEqual((cache.misses, cache.hits), (1, 2))
+        
+        # A write bumps updated_at, so the next response is encoded from the new row
+        self.court.name = 'Renamed Court'
+        db.session.commit()
+        data = json.loads(self.client.get('/api/games').data)
+        self.assertEqual(data['games'][0]['court']['name'], 'Renamed Court')
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(len(cache), 1)
+    
+    def test_sparse_fields(self):
+        """fields and view=summary trim the response and the columns read"""
+        self.court.reviews = json.dumps([{'text': 'x' * 1000}])
+        db.session.commit()
+        db.session.expire_all()
+        
+        full = self.client.get('/api/courts')
+        with self.count_queries() as statements:
+            summary = self.client.get('/api/courts?view=summary')
+        self.assertEqual(json.loads(summary.data)['courts'][0], {
+            'court_id': self.court.court_id, 'name': 'Test Court', 'location': {'lat': 40.7128, 'lng': -74.0060}
+        })
+        self.assertLess(len(summary.data), len(full.data) / 5)
+        self.assertNotIn('reviews', ' '.join(statements))
+        
+        response = self.client.get(f'/api/courts/{self.court.court_id}?fields=name,amenities')
+        self.assertEqual(json.loads(response.data), {'name': 'Test Court', 'amenities': None})
+        response = self.client.get('/api/courts?fields=name,bogus')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('bogus', json.loads(response.data)['message'])
+        self.assertEqual(self.client.get('/api/courts?view=tiny').status_code, 400)
+        
+        self.add_games(2)
+        with self.count_queries() as statements:
+            games = json.loads(self.client.get('/api/games?view=summary&limit=2').data)
+        self.assertEqual(set(games['games'][0]), set(Game.SUMMARY_FIELDS))
+        self.assertEqual(set(games['games'][0]['court']), set(Court.SUMMARY_FIELDS))
+        self.assertNotIn('reviews', ' '.join(statements))
+        self.assertNotIn('game_participants.user_id', ' '.join(statements))
+        # Sparse pages follow the same cursors
+        rest = json.loads(self.client.get(f'/api/games?view=summary&cursor={games["next_cursor"]}').data)
+        self.assertEqual(len(games['games']) + len(rest['games']), 3)
+        
+        response = self.client.get(f'/api/games/{self.game.game_id}?fields=game_id,players')
+        self.assertEqual(set(json.loads(response.data)['game']), {'game_id', 'players'})
+        
+        response = self.client.get('/api/search/courts?lat=40.7128&lng=-74.0060&radius=5&view=summary')
+        self.assertEqual(set(json.loads(response.data)['courts'][0]), {'court_id', 'name', 'location', 'distance'})
+        response = self.client.get('/api/search/games?q=test&fields=game_id,notes')
+        self.assertEqual(set(json.loads(response.data)['games'][0]), {'game_id', 'notes'})
+        response = self.client.get('/api/search/courts/nearest?lat=40.7128&lng=-74.0060&fields=name')
+        self.assertEqual(set(json.loads(response.data)['courts'][0]), {'name', 'distance'})
+    
+    def test_conditional_get(self):
+        """Court and game reads carry ETags and answer If-None-Match with 304 before loading rows"""
+        urls = ['/api/courts', f'/api/courts/{self.court.court_id}', '/api/games', f'/api/games/{self.game.game_id}']
+        etags = {}
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('must-revalidate', response.headers['Cache-Control'])
+            etags[url] = response.headers['ETag']
+            
+            with self.count_queries() as statements:
+                response = self.client.get(url, headers={'If-None-Match': etags[url]})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
+            self.assertEqual(response.headers['ETag'], etags[url])
+            self.assertNotIn('courts.name', ' '.join(statements))
+        
+        # Each page and field selection has its own tag
+        self.assertNotEqual(self.client.get('/api/courts?view=summary').headers['ETag'], etags['/api/courts'])
+        
+        # A court change invalidates the court, the court list and games embedding it
+        self.court.name = 'Renamed Court'
+        db.session.commit()
+        for url in urls:
+            response = self.client.get(url, headers={'If-None-Match': etags[url]})
+            self.assertEqual(response.status_code, 200)
+            etags[url] = response.headers['ETag']
+        
+        # So does a player joining a game
+        db.session.add(GameParticipant(game_id=self.game.game_id, user_id=self.user2.user_id))
+        db.session.commit()
+        for url in urls[2:]:
+            self.assertEqual(self.client.get(url, headers={'If-None-Match': etags[url]}).status_code, 200)
+        for url in urls[:2]:
+            self.assertEqual(self.client.get(url, headers={'If-None-Match': etags[url]}).status_code, 304)
+        
+        self.assertEqual(self.client.get('/api/courts/9999').status_code, 404)
+        self.assertEqual(self.client.get('/api/games/9999').status_code, 404)
+    
+    def login(self, username):
+        """Register a user and return an Authorization header for them"""
+        self.client.post('/api/auth/register', json={
+            'username': username, 'email': f'{username}@example.com', 'password': 'password123'
+        })
+        response = self.client.post('/api/auth/login', json={'username': username, 'password': 'password123'})
+        return {'Authorization': f'Bearer {json.loads(response.data)["access_token"]}'}
+    
+    def test_game_capacity(self):
+        """current_players follows joins and leaves and a full game can't be joined"""
+        game_id = self.game.game_id
+        self.assertEqual(self.game.current_players, 1)
+        players = [self.login(f'player{i}') for i in range(4)]
+        
+        for headers in players[:3]:
+            self.assertEqual(self.client.post(f'/api/games/{game_id}/join', headers=headers).status_code, 200)
+        response = self.client.post(f'/api/games/{game_id}/join', headers=players[3])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.data)['message'], 'Game is already full')
+        
+        game = json.loads(self.client.get(f'/api/games/{game_id}').data)['game']
+        self.assertEqual(game['current_players'], 4)
+        self.assertEqual(len(game['participants']), 4)
+        
+        # The conditional UPDATE refuses a place even when the caller's check was stale
+        user = User.query.filter_by(username='player3').one()
+        db.session.add(GameParticipant(game_id=game_id, user_id=user.user_id))
+        with self.assertRaises(GameFullError):
+            db.session.commit()
+        db.session.rollback()
+        self.assertEqual(db.session.get(Game, game_id).current_players, 4)
+        
+        # The creator leaving hands the game to the next player and frees a place
+        response = self.client.post(f'/api/games/{game_id}/leave', headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response.status_code, 200)
+        game = db.session.get(Game, game_id)
+        db.session.refresh(game)
+        self.assertEqual(game.current_players, 3)
+        self.assertEqual(game.creator_id, User.query.filter_by(username='player0').one().user_id)
+        self.assertEqual(game.status, 'scheduled')
+        self.assertEqual(self.client.post(f'/api/games/{game_id}/join', headers=players[3]).status_code, 200)
+        
+        # Everyone leaving cancels it
+        for headers in players:
+            self.assertEqual(self.client.post(f'/api/games/{game_id}/leave', headers=headers).status_code, 200)
+        db.session.refresh(game)
+        self.assertEqual((game.current_players, game.status), (0, 'cancelled'))
+        self.assertEqual(GameParticipant.query.filter_by(game_id=game_id).count(), 0)
+        
+        # A game needs a place for its creator
+        for max_players in (0, -2, None, '4', True, 2.5):
+            response = self.client.post('/api/games', headers=players[0], json={
+                'court_id': self.court.court_id, 'date': '2030-01-01', 'time': '10:00', 'max_players': max_players
+            })
+            self.assertEqual(response.status_code, 400, max_players)
+        response = self.client.post('/api/games', headers=players[0], json={
+            'court_id': self.court.court_id, 'date': '2030-01-01', 'time': '10:00', 'max_players': 1
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.data)['game']['current_players'], 1)
+    
     def test_user_profile(self):
         """Test user profile endpoint"""
         print("\nTesting user profile endpoint...")
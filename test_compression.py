@@ -0,0 +1,105 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from app import create_app, db
+from app.assets import build_assets
+from app.compression import brotli
+from app.models.court import Court
+
+class TestCompression(unittest.TestCase):
+    """Negotiated response compression and precompressed static builds"""
+
+    def setUp(self):
+        """Set up a court list large enough to compress and a temporary asset build directory"""
+        self.build_dir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        self.app.config['ASSETS_BUILD_DIR'] = self.build_dir
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        for i in range(20):
+            db.session.add(Court(uuid=f'court-{i}', name=f'Court {i}', address=f'{i} Main St, Eureka, CA 95501, USA',
+                                 amenities=['Lights', 'Restrooms']))
+        db.session.commit()
+
+    def tearDown(self):
+        """Tear down test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.build_dir)
+
+    def test_gzip_json(self):
+        """JSON bodies over the threshold are gzipped when accepted, with their own ETag"""
+        plain = self.client.get('/api/courts')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertIn('Accept-Encoding', plain.headers['Vary'])
+
+        response = self.client.get('/api/courts', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertLess(len(response.data), len(plain.data))
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+        self.assertEqual(json.loads(gzip.decompress(response.data)), json.loads(plain.data))
+
+        # The compressed representation has a distinct strong tag that still revalidates
+        self.assertEqual(response.headers['ETag'], plain.headers['ETag'][:-1] + '-gzip"')
+        revalidated = self.client.get('/api/courts', headers={
+            'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']
+        })
+        self.assertEqual(revalidated.status_code, 304)
+
+        # Small bodies and refused codings are left alone
+        court_id = Court.query.first().court_id
+        small = self.client.get(f'/api/courts/{court_id}?fields=name', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', small.headers)
+        refused = self.client.get('/api/courts', headers={'Accept-Encoding': 'gzip;q=0'})
+        self.assertNotIn('Content-Encoding', refused.headers)
+
+    @unittest.skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli_preferred(self):
+        """Brotli wins over gzip when both are accepted"""
+        plain = self.client.get('/api/courts')
+        response = self.client.get('/api/courts', headers={'Accept-Encoding': 'gzip, deflate, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(brotli.decompress(response.data)), json.loads(plain.data))
+
+    def test_static_build(self):
+        """build-static writes hashed, precompressed files served with immutable caching"""
+        manifest = build_assets(self.app.static_folder, self.build_dir)
+        hashed = manifest['js/app.js']
+        self.assertRegex(hashed, r'^js/app\.[0-9a-f]{12}\.js$')
+        self.assertTrue(os.path.isfile(os.path.join(self.build_dir, hashed + '.gz')))
+        # Building again gives the same names for unchanged files
+        self.assertEqual(build_assets(self.app.static_folder, self.build_dir), manifest)
+
+        app = create_app('testing')
+        app.config['ASSETS_BUILD_DIR'] = self.build_dir
+        from app.assets import init_assets
+        init_assets(app)
+        client = app.test_client()
+        self.assertIn(f'/assets/{hashed}', client.get('/').get_data(as_text=True))
+
+        with open(os.path.join(self.app.static_folder, 'js', 'app.js'), 'rb') as f:
+            source = f.read()
+        response = client.get(f'/assets/{hashed}', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('javascript', response.headers['Content-Type'])
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertEqual(gzip.decompress(response.data), source)
+        response.close()
+
+        response = client.get(f'/assets/{hashed}')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.data, source)
+        response.close()
+        self.assertEqual(client.get('/assets/js/missing.js').status_code, 404)
+        self.assertEqual(client.get('/assets/../config.py').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import json
+import random
+import unittest
+from datetime import date, datetime, time, timedelta
+from app import create_app, db
+from app.models.user import User
+from app.models.court import Court
+from app.models.game import Game, GameParticipant
+from app.services.match_index import MatchRequest, get_match_index, match_games
+
+class TestMatchmaking(unittest.TestCase):
+    """Test case for /api/games/match and the open slot index"""
+
+    def setUp(self):
+        """Set up two courts in New York, one in San Francisco and a few users"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.users = [User(username=f'player{i}', email=f'player{i}@example.com', password='password123')
+                      for i in range(4)]
+        self.court = Court(uuid='match-court-1', name='Test Court', address='123 Test Ave', lat=40.7128, lng=-74.0060)
+        self.nearby_court = Court(uuid='match-court-2', name='Nearby Court', address='456 Test Ave',
+                                  lat=40.7306, lng=-73.9352)
+        self.far_court = Court(uuid='match-court-3', name='Far Court', address='789 Test Ave',
+                               lat=37.7749, lng=-122.4194)
+        db.session.add_all(self.users + [self.court, self.nearby_court, self.far_court])
+        db.session.commit()
+        self.tomorrow = date.today() + timedelta(days=1)
+
+    def tearDown(self):
+        """Tear down test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def schedule(self, court, day, hour, skill_level=None, players=1, max_players=4):
+        """Schedule a game with the first players users in it"""
+        game = Game(court_id=court.court_id, creator_id=self.users[0].user_id, date=day,
+                    time=time(hour, 0), max_players=max_players, skill_level=skill_level)
+        db.session.add(game)
+        db.session.flush()
+        for user in self.users[:players]:
+            db.session.add(GameParticipant(game_id=game.game_id, user_id=user.user_id))
+        db.session.commit()
+        return game.game_id
+
+    def login(self, user):
+        response = self.client.post('/api/auth/login', json={'username': user.username, 'password': 'password123'})
+        return {'Authorization': f'Bearer {json.loads(response.data)["access_token"]}'}
+
+    def matched(self, query=''):
+        response = self.client.get(f'/api/games/match?lat=40.7128&lng=-74.0060&radius=20{query}')
+        self.assertEqual(response.status_code, 200)
+        return [game['game_id'] for game in json.loads(response.data)['games']]
+
+    def test_match_ranking(self):
+        """Open games nearby at the right level come first; full, far and other-level games don't match"""
+        here = self.schedule(self.court, self.tomorrow, 10, 'intermediate')
+        later = self.schedule(self.court, self.tomorrow + timedelta(days=3), 10, 'intermediate')
+        nearby = self.schedule(self.nearby_court, self.tomorrow, 10, 'Intermediate')
+        any_level = self.schedule(self.court, self.tomorrow, 11)
+        self.schedule(self.court, self.tomorrow, 11, 'advanced')
+        self.schedule(self.court, self.tomorrow, 12, 'intermediate', players=4)
+        self.schedule(self.court, self.tomorrow + timedelta(days=10), 10, 'intermediate')
+        self.schedule(self.far_court, self.tomorrow, 10, 'intermediate')
+
+        self.assertEqual(self.matched('&skill_level=intermediate'), [here, nearby, later, any_level])
+        response = self.client.get('/api/games/match?lat=40.7128&lng=-74.0060&radius=20&skill_level=intermediate')
+        games = json.loads(response.data)['games']
+        self.assertEqual(games[0]['distance'], 0)
+        self.assertGreater(games[1]['distance'], 5)
+        self.assertEqual(games[1]['court_location'], {'lat': 40.7306, 'lng': -73.9352})
+        self.assertEqual([game['score'] for game in games], sorted(game['score'] for game in games))
+
+        # A pair needs two free places; without a location every court matches
+        self.schedule(self.court, self.tomorrow, 8, 'intermediate', players=3)
+        self.assertEqual(self.matched('&skill_level=intermediate&players=2'), [here, nearby, later, any_level])
+        response = self.client.get('/api/games/match?skill_level=intermediate&limit=2&view=summary')
+        data = json.loads(response.data)
+        self.assertEqual(len(data['games']), 2)
+        self.assertNotIn('distance', data['games'][0])
+        self.assertNotIn('notes', data['games'][0])
+        self.assertEqual(data['params']['to'], (date.today() + timedelta(days=6)).isoformat())
+
+        self.assertIn(later, self.matched(f'&from={self.tomorrow + timedelta(days=3)}'))
+        self.assertNotIn(here, self.matched(f'&from={self.tomorrow + timedelta(days=3)}'))
+
+    def test_match_follows_changes(self):
+        """Creating, joining, leaving and cancelling games update the index incrementally"""
+        self.assertEqual(self.matched(), [])
+        version = get_match_index().version
+        game_id = self.schedule(self.court, self.tomorrow, 10, players=3)
+        self.assertEqual(self.matched(), [game_id])
+
+        self.client.post(f'/api/games/{game_id}/join', headers=self.login(self.users[3]))
+        self.assertEqual(self.matched(), [])
+        self.client.post(f'/api/games/{game_id}/leave', headers=self.login(self.users[3]))
+        self.assertEqual(self.matched(), [game_id])
+        self.assertEqual(self.matched('&players=2'), [])
+
+        # Moving a court moves its games
+        self.court.lat, self.court.lng = self.far_court.lat, self.far_court.lng
+        db.session.commit()
+        self.assertEqual(self.matched(), [])
+        self.court.lat, self.court.lng = 40.7128, -74.0060
+        db.session.commit()
+        self.assertEqual(self.matched(), [game_id])
+
+        for user in self.users[:3]:
+            self.client.post(f'/api/games/{game_id}/leave', headers=self.login(user))
+        self.assertEqual(Game.query.get(game_id).status, 'cancelled')
+        self.assertEqual(self.matched(), [])
+        # All of that was applied in place, without rebuilding
+        self.assertEqual(get_match_index().version, version)
+        self.assertEqual(len(get_match_index()), 0)
+        self.assertEqual(get_match_index()._slots, [])
+
+    def test_index_matches_sql(self):
+        """The index ranks exactly like a scan of the matching SQL rows"""
+        rng = random.Random(3)
+        courts = [Court(uuid=f'random-court-{i}', name=f'Court {i}', address=f'{i} Main St',
+                        lat=rng.uniform(40.5, 41.0), lng=rng.uniform(-74.3, -73.7)) for i in range(30)]
+        db.session.add_all(courts)
+        db.session.commit()
+        for _ in range(300):
+            self.schedule(rng.choice(courts), date.today() + timedelta(days=rng.randrange(0, 12)),
+                          rng.randrange(6, 22), rng.choice(['beginner', 'intermediate', 'advanced', None]),
+                          players=rng.randrange(1, 5))
+
+        now = datetime.combine(date.today(), time(12, 0))
+        requests = [
+            MatchRequest(date.today(), date.today() + timedelta(days=6), now=now),
+            MatchRequest(date.today(), date.today() + timedelta(days=6), 'beginner', (40.75, -74.0, 10), now=now),
+            MatchRequest(self.tomorrow, date.today() + timedelta(days=11), 'advanced', players=2, now=now),
+            MatchRequest(date.today(), date.today() + timedelta(days=3), None, (40.7, -73.9, 300), 3, now=now),
+        ]
+        for wanted in requests:
+            indexed = match_games(wanted, 15)
+            self.app.config['MATCH_INDEX_ENABLED'] = False
+            scanned = match_games(wanted, 15)
+            self.app.config['MATCH_INDEX_ENABLED'] = True
+            self.assertTrue(indexed)
+            self.assertEqual(indexed, scanned)
+
+    def test_invalid_parameters(self):
+        """Malformed parameters are rejected"""
+        for query in ('lat=abc&lng=1', 'from=tomorrow', f'from={self.tomorrow}&to={date.today()}',
+                      'players=0', 'limit=x', 'fields=nope', 'to=2040-01-01', 'to=9999-12-31',
+                      'from=9999-12-31', f'from={self.tomorrow}&to={self.tomorrow + timedelta(days=31)}'):
+            self.assertEqual(self.client.get(f'/api/games/match?{query}').status_code, 400, query)
+        widest = f'from={self.tomorrow}&to={self.tomorrow + timedelta(days=30)}'
+        self.assertEqual(self.client.get(f'/api/games/match?{widest}').status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
+import json
 import os
 from datetime import datetime, time, date
+from sqlalchemy import event, inspect, text
 from app import create_app, db
 from app.models.user import User
 from app.models.court import Court
@@ -114,5 +116,147 @@ def test_models():
         db.session.delete(user)
         db.session.commit()
 
+def test_court_json_columns():
+    """JSON columns decode once per stored value and follow updates"""
+    app = create_app('testing')
+
+    with app.app_context():
+        db.create_all()
+
+        courts = [
+            Court(uuid=f'json-court-{i}', name=f'Court {i}', amenities=['Lights', 'Restrooms'],
+                  hours={'monday': '8-20'})
+            for i in range(2)
+        ]
+        db.session.add_all(courts)
+        db.session.commit()
+
+        first, second = (court.to_dict() for court in courts)
+        assert first['amenities'] == ['Lights', 'Restrooms']
+        assert first['hours'] == {'monday': '8-20'}
+        assert first['photos'] is None and first['reviews'] is None
+        # Identical stored text decodes to equal values that aren't shared
+        assert first['amenities'] == second['amenities']
+        first['amenities'].append('Parking')
+        assert second['amenities'] == ['Lights', 'Restrooms']
+        assert courts[1].to_dict()['amenities'] == ['Lights', 'Restrooms']
+
+        courts[0].amenities = json.dumps(['Lights'])
+        db.session.commit()
+        db.session.expire_all()
+        assert Court.query.filter_by(uuid='json-court-0').one().to_dict()['amenities'] == ['Lights']
+        assert Court.query.filter_by(uuid='json-court-1').one().to_dict()['amenities'] == ['Lights', 'Restrooms']
+
+        db.drop_all()
+
+def query_plan(query):
+    """SQLite's EXPLAIN QUERY PLAN lines for an ORM query, with its parameters bound"""
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        return f'EXPLAIN QUERY PLAN {statement}', parameters
+    event.listen(db.engine, 'before_cursor_execute', explain, retval=True)
+    try:
+        return ' | '.join(row[-1] for row in db.session.connection().execute(query.statement))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', explain)
+
+def test_query_plans_use_indexes():
+    """The hot list queries search their composite indexes instead of scanning"""
+    app = create_app('testing')
+    
+    with app.app_context():
+        db.create_all()
+        
+        # Enough rows for ANALYZE to tell a selective court_id from a common status
+        users = [User(username=f'user{i}', email=f'user{i}@example.com', password='password123') for i in range(5)]
+        courts = [Court(uuid=f'plan-court-{i}', name=f'Court {i}') for i in range(50)]
+        db.session.add_all(users + courts)
+        db.session.flush()
+        for court in courts:
+            for day in range(10):
+                game = Game(court_id=court.court_id, creator_id=users[0].user_id,
+                            date=date(2030, 1, 1 + day), time=time(9, 0))
+                db.session.add(game)
+                db.session.flush()
+                db.session.add(GameParticipant(game_id=game.game_id, user_id=users[day % 5].user_id))
+                db.session.add(ChatMessage(game_id=game.game_id, user_id=users[0].user_id, message_text='hi'))
+        db.session.commit()
+        db.session.execute(text('ANALYZE'))
+        
+        order = (Game.date, Game.time, Game.game_id)
+        plan = query_plan(Game.query_with_details().filter(Game.status == 'scheduled').order_by(*order).limit(51))
+        assert 'USING INDEX ix_games_status_date_time' in plan
+        # Keyset order comes straight from the index
+        assert 'TEMP B-TREE' not in plan
+        
+        plan = query_plan(Game.query_with_details().filter(
+            Game.court_id == courts[0].court_id, Game.status == 'scheduled'
+        ).order_by(*order).limit(51))
+        assert 'USING INDEX ix_games_court_id_date' in plan
+        plan = query_plan(Game.scheduled_at_court(courts[0].court_id, date(2030, 1, 5)).limit(20))
+        assert 'USING INDEX ix_games_court_id_date (court_id=? AND date>?)' in plan
+        plan = query_plan(Game.query.filter(Game.court_id == courts[0].court_id, Game.date == date(2030, 1, 1)))
+        assert 'USING INDEX ix_games_court_id_date (court_id=? AND date=?)' in plan
+        
+        plan = query_plan(ChatMessage.query.filter_by(game_id=1).order_by(ChatMessage.timestamp))
+        assert 'USING INDEX ix_chat_messages_game_id_timestamp' in plan
+        assert 'TEMP B-TREE' not in plan
+        
+        plan = query_plan(GameParticipant.query.filter_by(user_id=users[1].user_id))
+        assert 'USING INDEX ix_game_participants_user_id' in plan
+        
+        db.drop_all()
+
+def test_create_missing_indexes():
+    """The release migration adds declared indexes to tables that predate them"""
+    from migrations.create_or_migrate_db import create_missing_indexes
+    app = create_app('testing')
+    
+    with app.app_context():
+        db.create_all()
+        db.session.execute(text('DROP INDEX ix_games_status_date_time'))
+        db.session.commit()
+        
+        create_missing_indexes()
+        names = {index['name'] for index in inspect(db.engine).get_indexes('games')}
+        assert {'ix_games_status_date_time', 'ix_games_court_id_date'} <= names
+        create_missing_indexes()  # Nothing left to do
+        
+        db.drop_all()
+
+def test_migrate_current_players():
+    """Upgrading an old games table adds and backfills current_players and fills in max_players"""
+    from migrations.create_or_migrate_db import add_missing_columns, migrate_schema
+    app = create_app('testing')
+    
+    with app.app_context():
+        db.create_all()
+        user = User(username='testuser', email='test@example.com', password='password123')
+        court = Court(uuid='test-court', name='Test Court')
+        db.session.add_all([user, court])
+        db.session.flush()
+        game = Game(court_id=court.court_id, creator_id=user.user_id, date=date.today(), time=time(9, 0))
+        db.session.add(game)
+        db.session.flush()
+        db.session.add(GameParticipant(game_id=game.game_id, user_id=user.user_id))
+        db.session.commit()
+        game_id = game.game_id
+        
+        db.session.execute(text('ALTER TABLE games DROP COLUMN current_players'))
+        # Older tables allowed games without max_players
+        db.session.execute(text('ALTER TABLE games DROP COLUMN max_players'))
+        db.session.execute(text('ALTER TABLE games ADD COLUMN max_players INTEGER'))
+        db.session.commit()
+        migrate_schema()
+        db.session.expire_all()
+        assert db.session.get(Game, game_id).current_players == 1
+        assert db.session.get(Game, game_id).max_players == 4
+        assert add_missing_columns() == []  # Nothing left to add
+        
+        db.drop_all()
+
 if __name__ == "__main__":
-    test_models() 
\ No newline at end of file
+    test_models()
+    test_court_json_columns()
+    test_query_plans_use_indexes()
+    test_create_missing_indexes()
+    test_migrate_current_players() 
\ No newline at end of file
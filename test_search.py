@@ -0,0 +1,704 @@
+import json
+import random
+import re
+import time as timer
+import unittest
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import event
+from app import create_app, db
+from app.api.pagination import encode_cursor
+from app.services.es_search import hits_to_dicts, search_body
+from app.models.user import User
+from app.models.court import Court
+from app.models.game import Game, GameParticipant
+from app.models.outbox import SearchOutbox
+from app.services.elasticsearch import CircuitBreaker, get_elasticsearch_client
+from app.services.es_reindex import bulk_actions, deleted_ids, reindex
+from app.services.geo_cache import GeoResponseCache, geohash, get_geo_cache
+from app.services.kdtree import KDTree
+from app.services.search_outbox import _bulk_actions, _failed_keys, _settle, drain_outbox
+from app.services.fulltext import DatabaseFullText, ensure_fulltext
+from app.services.suggest_index import get_suggest_index
+from app.services.text_index import BM25Index, get_text_index
+from app.services.geo_index import (
+    CourtGridIndex, bounding_box_filter, calculate_distance, courts_within_radius, get_geo_index
+)
+
+class TestSearch(unittest.TestCase):
+    """Test case for the search endpoints and in-process search indexes"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(
+            username='testuser',
+            email='test@example.com',
+            password='password123'
+        )
+        db.session.add(self.user)
+
+        # Two courts in New York, one in San Francisco
+        self.court = Court(
+            uuid='test-court-123',
+            name='Test Court',
+            address='123 Test Ave, Testville',
+            lat=40.7128,
+            lng=-74.0060
+        )
+        self.nearby_court = Court(
+            uuid='test-court-456',
+            name='Nearby Court',
+            address='456 Test Ave, Testville',
+            lat=40.7306,
+            lng=-73.9352
+        )
+        self.far_court = Court(
+            uuid='test-court-789',
+            name='Far Court',
+            address='789 Test St, San Francisco',
+            lat=37.7749,
+            lng=-122.4194
+        )
+        db.session.add_all([self.court, self.nearby_court, self.far_court])
+        db.session.commit()
+
+        tomorrow = date.today() + timedelta(days=1)
+        self.game = Game(
+            court_id=self.court.court_id,
+            creator_id=self.user.user_id,
+            date=tomorrow,
+            time=time(14, 0),
+            skill_level='intermediate',
+            notes='Test game'
+        )
+        self.far_game = Game(
+            court_id=self.far_court.court_id,
+            creator_id=self.user.user_id,
+            date=tomorrow,
+            time=time(9, 0),
+            skill_level='beginner',
+            notes='Far away game'
+        )
+        db.session.add_all([self.game, self.far_game])
+        db.session.commit()
+
+    def tearDown(self):
+        """Tear down test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_search_courts_by_radius(self):
+        """Radius search returns only nearby courts, nearest first"""
+        response = self.client.get('/api/search/courts?lat=40.7128&lng=-74.0060&radius=20')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['search_method'], 'location_radius')
+        self.assertEqual([c['name'] for c in data['courts']], ['Test Court', 'Nearby Court'])
+        self.assertEqual(data['courts'][0]['distance'], 0)
+
+    def test_search_pagination(self):
+        """Radius and text search results page with next_cursor"""
+        first = self.client.get('/api/search/courts?lat=40.7128&lng=-74.0060&radius=20&limit=1').get_json()
+        self.assertEqual([c['name'] for c in first['courts']], ['Test Court'])
+        second = self.client.get(
+            f"/api/search/courts?lat=40.7128&lng=-74.0060&radius=20&limit=1&cursor={first['next_cursor']}"
+        ).get_json()
+        self.assertEqual([c['name'] for c in second['courts']], ['Nearby Court'])
+        self.assertIsNone(second['next_cursor'])
+
+        first = self.client.get('/api/search/games?lat=40&lng=-100&radius=5000&limit=1').get_json()
+        second = self.client.get(
+            f"/api/search/games?lat=40&lng=-100&radius=5000&limit=1&cursor={first['next_cursor']}"
+        ).get_json()
+        self.assertEqual(
+            sorted(g['notes'] for g in first['games'] + second['games']), ['Far away game', 'Test game']
+        )
+
+        first = self.client.get('/api/search/courts?q=Court&limit=2').get_json()
+        second = self.client.get(f"/api/search/courts?q=Court&limit=2&cursor={first['next_cursor']}").get_json()
+        self.assertEqual(len(first['courts'] + second['courts']), 3)
+        self.assertIsNone(second['next_cursor'])
+
+    def test_search_cursor_backend(self):
+        """Cursors name the backend that issued them and are never silently reset"""
+        self.app.config.update(ELASTICSEARCH_URL='http://127.0.0.1:9', ELASTICSEARCH_TIMEOUT=0.5,
+                               ELASTICSEARCH_MAX_RETRIES=0)
+        first = self.client.get('/api/search/courts?q=Court&limit=2').get_json()
+        self.assertIn('error', first)
+        self.assertTrue(first['next_cursor'].startswith('local.'))
+
+        # Later pages stay on the backend that served the first, without trying Elasticsearch again
+        second = self.client.get(f"/api/search/courts?q=Court&limit=2&cursor={first['next_cursor']}").get_json()
+        self.assertNotIn('error', second)
+        self.assertEqual(len(first['courts'] + second['courts']), 3)
+
+        # An Elasticsearch cursor can't be continued by the fallback: the client is told to restart
+        es_cursor = 'es.' + encode_cursor([1.5, 2])
+        response = self.client.get(f'/api/search/courts?q=Court&limit=2&cursor={es_cursor}')
+        self.assertEqual(response.status_code, 503)
+        self.assertTrue(response.get_json()['restart'])
+        self.assertIn('error', response.get_json())
+        self.app.config['ELASTICSEARCH_URL'] = None
+        self.app.extensions.pop('elasticsearch')
+        response = self.client.get(f'/api/search/courts?q=Court&limit=2&cursor={es_cursor}')
+        self.assertEqual(response.status_code, 503)
+
+        for cursor in (encode_cursor([1.5, 2]), 'other.' + encode_cursor([1.5, 2]), 'local.'):
+            self.assertEqual(self.client.get(f'/api/search/courts?q=Court&cursor={cursor}').status_code, 400)
+
+    def test_search_text_within_radius(self):
+        """A text query and a location radius combine in one request"""
+        data = self.client.get('/api/search/courts?q=court&lat=40.7128&lng=-74.0060&radius=20').get_json()
+        self.assertEqual(sorted(c['name'] for c in data['courts']), ['Nearby Court', 'Test Court'])
+        self.assertTrue(all('distance' in c for c in data['courts']))
+        self.assertEqual(data['params']['q'], 'court')
+
+        data = self.client.get('/api/search/games?q=game&lat=37.77&lng=-122.42&radius=5').get_json()
+        self.assertEqual([g['notes'] for g in data['games']], ['Far away game'])
+        self.assertEqual(data['games'][0]['court_location']['lat'], 37.7749)
+
+    def test_geo_search_body(self):
+        """Elasticsearch geo searches filter by geo_distance and sort nearest first"""
+        body = search_body('', ['name'], 'court_id', (40.0, -74.0, 5))
+        self.assertEqual(body['query']['bool']['must'], {'match_all': {}})
+        self.assertEqual(body['query']['bool']['filter']['geo_distance'],
+                         {'distance': '5km', 'location': {'lat': 40.0, 'lon': -74.0}})
+        self.assertEqual(list(body['sort'][0]), ['_geo_distance'])
+        self.assertEqual(body['sort'][-1], {'court_id': 'asc'})
+
+        body = search_body('park', ['name'], 'game_id', (40.0, -74.0, 5), [{'date': 'asc'}])
+        self.assertEqual(body['sort'][0], '_score')
+        self.assertEqual(body['sort'][2:], [{'date': 'asc'}, {'game_id': 'asc'}])
+        self.assertIn('location', body['_source'])
+        self.assertEqual(search_body('park', ['name'], 'court_id')['sort'], ['_score', {'court_id': 'asc'}])
+
+    def test_geo_cache(self):
+        """Nearby points share a cache entry and results match the uncached search"""
+        cache = get_geo_cache()
+        self.assertEqual(geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+
+        first = self.client.get('/api/search/courts?lat=40.71280&lng=-74.00600&radius=10').get_json()
+        second = self.client.get('/api/search/courts?lat=40.71281&lng=-74.00602&radius=9').get_json()
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertEqual([c['name'] for c in second['courts']], ['Test Court', 'Nearby Court'])
+        self.assertEqual(self.client.get('/api/search/cache/stats').get_json()['hits'], 1)
+        # Entries keep ids and coordinates; each page is loaded from the database
+        self.assertEqual(cache.nearby_courts(40.7128, -74.0060, 1), [(self.court.court_id, 0.0)])
+
+        self.app.extensions.pop('geo_cache')  # As with GEO_CACHE_ENABLED off
+        uncached = self.client.get('/api/search/courts?lat=40.71280&lng=-74.00600&radius=10').get_json()
+        self.assertEqual(first['courts'], uncached['courts'])
+        self.app.extensions['geo_cache'] = cache
+
+        # A court moving into the cell, and a new game there, invalidate it
+        self.far_court.lat, self.far_court.lng = 40.7130, -74.0062
+        db.session.commit()
+        moved = self.client.get('/api/search/courts?lat=40.71280&lng=-74.00600&radius=10').get_json()
+        self.assertIn('Far Court', [c['name'] for c in moved['courts']])
+
+        games = self.client.get('/api/search/games?lat=40.7128&lng=-74.0060&radius=10').get_json()['games']
+        self.assertEqual(sorted(g['notes'] for g in games), ['Far away game', 'Test game'])
+        db.session.add(Game(court_id=self.nearby_court.court_id, creator_id=self.user.user_id,
+                            date=date.today(), time=time(8, 0), notes='New game'))
+        db.session.commit()
+        games = self.client.get('/api/search/games?lat=40.7128&lng=-74.0060&radius=10').get_json()['games']
+        self.assertIn('New game', [g['notes'] for g in games])
+        self.assertGreaterEqual(cache.stats()['invalidations'], 2)
+
+    def test_geo_cache_eviction(self):
+        """The least recently used entry is evicted first"""
+        cache = GeoResponseCache(max_entries=2)
+        for lng in (-74.0, -73.0, -72.0):
+            cache.nearby_courts(40.7, lng, 5)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        cache.nearby_courts(40.7, -72.0, 5)
+        self.assertEqual(cache.stats()['hits'], 1)
+        cache.nearby_courts(40.7, -74.0, 5)
+        self.assertEqual(cache.stats()['misses'], 4)
+
+    def test_search_games_by_radius(self):
+        """Radius game search only returns games at nearby courts"""
+        response = self.client.get('/api/search/games?lat=40.7128&lng=-74.0060&radius=20')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual([g['notes'] for g in data['games']], ['Test game'])
+        self.assertEqual(data['games'][0]['court_location']['lat'], 40.7128)
+
+    def test_search_by_radius_without_geo_index(self):
+        """The bounding-box SQL path returns the same results as the grid index"""
+        indexed = self.client.get('/api/search/courts?lat=40.7128&lng=-74.0060&radius=20').get_json()
+        self.app.config['GEO_INDEX_ENABLED'] = False
+        unindexed = self.client.get('/api/search/courts?lat=40.7128&lng=-74.0060&radius=20').get_json()
+        self.assertEqual(unindexed['courts'], indexed['courts'])
+
+        games = self.client.get('/api/search/games?lat=37.77&lng=-122.42&radius=5').get_json()
+        self.assertEqual([g['notes'] for g in games['games']], ['Far away game'])
+
+    def test_bounding_box_filter(self):
+        """Bounding box prefilter wraps the antimeridian and uses the lat/lng index"""
+        fiji = Court(uuid='fiji', name='Fiji Court', lat=-17.7, lng=179.9)
+        samoa = Court(uuid='samoa', name='Samoa Court', lat=-17.7, lng=-179.9)
+        db.session.add_all([fiji, samoa])
+        db.session.commit()
+
+        names = {court.name for court in Court.query.filter(bounding_box_filter(-17.7, 179.95, 50))}
+        self.assertEqual(names, {'Fiji Court', 'Samoa Court'})
+
+        self.app.config['GEO_INDEX_ENABLED'] = False
+        nearby = [court_id for court_id, _ in courts_within_radius(-17.7, 179.95, 50)]
+        self.assertEqual(sorted(nearby), sorted([fiji.court_id, samoa.court_id]))
+
+        statement = Court.query.filter(bounding_box_filter(40.7128, -74.0060, 20)).statement
+        sql = str(statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        plan = ' '.join(str(row) for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')))
+        self.assertIn('ix_courts_lat_lng', plan)
+
+    def test_nearest_courts(self):
+        """Nearest endpoint returns k courts ordered by distance"""
+        response = self.client.get('/api/search/courts/nearest?lat=40.7128&lng=-74.0060&k=2')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual([c['name'] for c in data['courts']], ['Test Court', 'Nearby Court'])
+        self.assertIn('distance', data['courts'][1])
+
+        response = self.client.get('/api/search/courts/nearest?lat=40.7128&lng=-74.0060&k=0')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/search/courts/nearest?lat=40.7128')
+        self.assertEqual(response.status_code, 400)
+
+    def test_indexes_built_on_first_use(self):
+        """create_app builds no index; each is built when first needed, and disabled ones never"""
+        for name in ('geo_index', 'text_index', 'suggest_index', 'match_index', 'search_outbox'):
+            self.assertNotIn(name, self.app.extensions)
+
+        # Without the geo index the nearest courts come from one scan
+        self.app.config['GEO_INDEX_ENABLED'] = False
+        data = self.client.get('/api/search/courts/nearest?lat=40.7128&lng=-74.0060&k=2').get_json()
+        self.assertEqual([c['name'] for c in data['courts']], ['Test Court', 'Nearby Court'])
+        self.client.get('/api/search/courts?lat=40.7128&lng=-74.0060&radius=20')
+        self.assertNotIn('geo_index', self.app.extensions)
+
+        self.app.config['GEO_INDEX_ENABLED'] = True
+        data = self.client.get('/api/search/courts/nearest?lat=40.7128&lng=-74.0060&k=2').get_json()
+        self.assertEqual([c['name'] for c in data['courts']], ['Test Court', 'Nearby Court'])
+        self.assertEqual(len(self.app.extensions['geo_index']), 3)
+
+    def test_elasticsearch_circuit_breaker(self):
+        """An unreachable Elasticsearch is skipped after repeated failures"""
+        self.app.config.update(
+            ELASTICSEARCH_URL='http://127.0.0.1:9',
+            ELASTICSEARCH_TIMEOUT=0.5,
+            ELASTICSEARCH_MAX_RETRIES=0,
+            ELASTICSEARCH_BREAKER_THRESHOLD=2
+        )
+        client = get_elasticsearch_client()
+        self.assertIs(get_elasticsearch_client(), client)  # One pooled client, no ping
+
+        for _ in range(2):
+            data = self.client.get('/api/search/courts?q=Court').get_json()
+            self.assertEqual(data['search_method'], 'text_index')
+            self.assertIn('error', data)
+
+        # The breaker is open: no connection attempt, straight to the fallback
+        self.assertIsNone(get_elasticsearch_client())
+        data = self.client.get('/api/search/games?q=Test').get_json()
+        self.assertEqual(data['search_method'], 'text_index')
+        self.assertNotIn('error', data)
+        self.assertEqual([g['notes'] for g in data['games']], ['Test game'])
+
+    def test_hits_to_dicts(self):
+        """Hits keep their ranking order, from stored payloads or one database query"""
+        hits = [
+            {'_source': {'court_id': self.far_court.court_id}},
+            {'_source': {'court_id': self.court.court_id, 'payload': {'name': 'Stored'}}},
+            {'_source': {'court_id': 999}},
+            {'_source': {'court_id': self.nearby_court.court_id}}
+        ]
+        results = hits_to_dicts(hits, 'court_id', Court.query, Court.court_id)
+        self.assertEqual([c['name'] for c in results], ['Far Court', 'Stored', 'Nearby Court'])
+
+        # Source-only hits never touch the database
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            payload_hits = [{'_source': {'court_id': 1, 'payload': {'name': 'A'}}}]
+            self.assertEqual(hits_to_dicts(payload_hits, 'court_id', Court.query, Court.court_id), [{'name': 'A'}])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(statements, [])
+
+    def test_reindex_bulk_actions(self):
+        """Reindexing streams one bulk action per row and needs Elasticsearch"""
+        actions = list(bulk_actions('games', 'games_v1', chunk_size=1))
+        self.assertEqual([a['_id'] for a in actions], sorted([self.game.game_id, self.far_game.game_id]))
+        self.assertEqual(actions[0]['_index'], 'games_v1')
+        self.assertEqual(actions[0]['_source']['court_name'], 'Test Court')
+
+        changed = Court.query.filter(Court.name == 'Far Court')
+        self.assertEqual([a['_id'] for a in bulk_actions('courts', 'courts', changed)], [self.far_court.court_id])
+        with self.assertRaises(RuntimeError):
+            reindex('courts')
+
+        # Rows deleted while loading are found in chunks so they can be removed from the new index
+        loaded = [self.game.game_id, self.far_game.game_id]
+        db.session.delete(self.far_game)
+        db.session.commit()
+        self.assertEqual(deleted_ids('games', loaded, chunk_size=1), [loaded[1]])
+        self.assertEqual(deleted_ids('games', []), [])
+
+    def test_search_outbox(self):
+        """Index updates are written with each change and coalesced per document"""
+        self.app.config['SEARCH_OUTBOX_ENABLED'] = True
+        player = User(username='player', email='player@example.com', password='password123')
+        db.session.add(player)
+        db.session.commit()
+        db.session.add(GameParticipant(game_id=self.game.game_id, user_id=player.user_id))
+        self.court.name = 'Renamed Court'
+        db.session.commit()
+
+        entries = [(e.kind, e.doc_id, e.op) for e in SearchOutbox.query.order_by(SearchOutbox.outbox_id)]
+        self.assertIn(('games', self.game.game_id, 'index'), entries)
+        self.assertIn(('courts', self.court.court_id, 'index'), entries)
+        self.assertEqual(len(entries), 3)  # participant, court and the court's game
+
+        # Nothing is written for a rolled back change
+        self.far_court.name = 'Never saved'
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(SearchOutbox.query.count(), 3)
+
+        db.session.delete(self.far_game)
+        db.session.commit()
+        latest = {(e.kind, e.doc_id): e.op for e in SearchOutbox.query.order_by(SearchOutbox.outbox_id)}
+        actions = {(a['_index'], a['_id']): a for a in _bulk_actions(latest)}
+        self.assertEqual(actions[('pickleball_dev_games', self.far_game.game_id)]['_op_type'], 'delete')
+        game_doc = actions[('pickleball_dev_games', self.game.game_id)]['_source']
+        self.assertEqual(game_doc['court_name'], 'Renamed Court')
+        self.assertEqual(game_doc['current_players'], 1)
+
+        # Without Elasticsearch the entries wait in the outbox
+        self.assertEqual(drain_outbox(), 0)
+        self.assertEqual(SearchOutbox.query.count(), 4)
+
+        # Rejected documents stay in the outbox with backoff; a delete of a missing one counts as done
+        def result(action):
+            if action.get('_op_type') == 'delete':
+                return False, {'delete': {'status': 404}}
+            if action['_index'] == 'pickleball_dev_games' and action['_id'] == self.game.game_id:
+                return False, {'index': {'status': 429}}
+            return True, {'index': {'status': 200}}
+
+        entries = SearchOutbox.query.order_by(SearchOutbox.outbox_id).all()
+        actions = _bulk_actions({(e.kind, e.doc_id): e.op for e in entries})
+        failed = _failed_keys(actions, [result(action) for action in actions])
+        self.assertEqual(failed, {('games', self.game.game_id)})
+        now = datetime(2030, 1, 1)
+        _settle(entries, failed, now)
+        _settle(SearchOutbox.query.all(), failed, now)
+        retries = SearchOutbox.query.all()
+        self.assertEqual({(e.kind, e.doc_id) for e in retries}, failed)
+        self.assertEqual({(e.attempts, e.next_attempt_at) for e in retries}, {(2, now + timedelta(seconds=10))})
+        _settle(retries, set())
+        self.assertEqual(SearchOutbox.query.count(), 0)
+
+    def test_circuit_breaker(self):
+        """The breaker opens after the threshold and lets one trial call through per window"""
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertTrue(breaker.is_open)
+        self.assertFalse(breaker.allow())
+
+        timer.sleep(0.06)
+        self.assertTrue(breaker.allow())  # Trial call
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        timer.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertFalse(breaker.is_open)
+        self.assertTrue(breaker.allow())
+
+    def test_kdtree_matches_linear_scan(self):
+        """KD-tree neighbours stay exact through inserts, moves and removals"""
+        rng = random.Random(7)
+        points = {key: (rng.uniform(-80, 80), rng.uniform(-180, 180)) for key in range(1000)}
+        tree = KDTree(points)
+        for key in range(1000, 1300):
+            points[key] = (rng.uniform(-80, 80), rng.uniform(-180, 180))
+            tree.insert(key, *points[key])
+        for key in range(0, 600, 2):
+            del points[key]
+            tree.remove(key)
+        points[1] = (0.0, 179.99)
+        tree.insert(1, *points[1])
+
+        for lat, lng in [(0.0, -179.99)] + [(rng.uniform(-80, 80), rng.uniform(-180, 180)) for _ in range(50)]:
+            expected = sorted(points, key=lambda key: calculate_distance(lat, lng, *points[key]))[:5]
+            self.assertEqual([key for key, _ in tree.nearest(lat, lng, 5)], expected)
+
+    def test_geo_index_follows_court_changes(self):
+        """Committed court inserts, moves and deletes update the index"""
+        index = get_geo_index()
+        self.assertEqual(len(index), 3)
+
+        # Move the far court to New York
+        self.far_court.lat = 40.7200
+        self.far_court.lng = -74.0000
+        db.session.commit()
+        nearby_ids = [court_id for court_id, _ in index.query_radius(40.7128, -74.0060, 20)]
+        self.assertIn(self.far_court.court_id, nearby_ids)
+
+        # Delete it again
+        db.session.delete(self.far_game)
+        db.session.delete(self.far_court)
+        db.session.commit()
+        self.assertEqual(len(index), 2)
+
+        # Rolled back inserts never reach the index
+        db.session.add(Court(uuid='rolled-back', name='Ghost Court', lat=40.71, lng=-74.0))
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(len(index), 2)
+
+    def test_grid_index_matches_linear_scan(self):
+        """Grid radius queries agree with a brute force Haversine scan"""
+        rng = random.Random(42)
+        index = CourtGridIndex(cell_degrees=0.5)
+        points = {}
+        for court_id in range(2000):
+            lat, lng = rng.uniform(-60, 60), rng.uniform(-180, 180)
+            points[court_id] = (lat, lng)
+            index.upsert(court_id, lat, lng)
+
+        # Include a query straddling the antimeridian
+        queries = [(rng.uniform(-60, 60), rng.uniform(-180, 180), rng.choice([5, 50, 500])) for _ in range(50)]
+        queries.append((0.0, 179.9, 300))
+        for lat, lng, radius in queries:
+            expected = sorted(
+                court_id for court_id, (p_lat, p_lng) in points.items()
+                if calculate_distance(lat, lng, p_lat, p_lng) <= radius
+            )
+            actual = sorted(court_id for court_id, _ in index.query_radius(lat, lng, radius))
+            self.assertEqual(actual, expected)
+
+        # Batch queries give the same answers as one query per point
+        points = [(lat, lng) for lat, lng, _ in queries]
+        batch = index.query_radius_batch(points, 50)
+        for (lat, lng), results in zip(points, batch):
+            single = index.query_radius(lat, lng, 50)
+            self.assertEqual([court_id for court_id, _ in results], [court_id for court_id, _ in single])
+            for (_, batch_distance), (_, single_distance) in zip(results, single):
+                self.assertAlmostEqual(batch_distance, single_distance, places=6)
+
+class TestTextSearch(unittest.TestCase):
+    """Relevance and latency of the BM25 text index against the ILIKE scan it replaced"""
+
+    def setUp(self):
+        """Load the real court catalogue from courts.json"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        with open('courts.json', 'r', encoding='utf-8') as f:
+            self.courts_data = json.load(f)['courts']
+        for court_data in self.courts_data:
+            location = court_data.get('location') or {}
+            db.session.add(Court(
+                uuid=court_data['id'],
+                name=court_data['name'],
+                address=court_data.get('address'),
+                lat=location.get('lat'),
+                lng=location.get('lng'),
+                court_type=court_data.get('courtType'),
+                surface_type=court_data.get('surfaceType'),
+                amenities=court_data.get('amenities')
+            ))
+        db.session.commit()
+
+    def tearDown(self):
+        """Tear down test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def ilike_search(self, query):
+        """The previous fallback: substring match on the court name only"""
+        return Court.query.filter(Court.name.ilike(f'%{query}%')).all()
+
+    def test_relevance(self):
+        """Exact names rank near the top and address or amenity queries find courts"""
+        index = get_text_index()
+        self.assertEqual(len(index.courts), len(self.courts_data))
+
+        names = [court['name'] for court in self.courts_data[:25]]
+        for name in names:
+            top_names = [db.session.get(Court, court_id).name for court_id, _ in index.search_courts(name)[:3]]
+            self.assertIn(name, top_names)
+
+        # Multi-word queries over address and amenities, which ILIKE on name can't answer
+        self.assertEqual(self.ilike_search('eureka indoor'), [])
+        results = index.search_courts('eureka indoor')
+        self.assertTrue(results)
+        top = db.session.get(Court, results[0][0])
+        self.assertIn('Eureka', top.address)
+        self.assertEqual(top.court_type, 'indoor')
+
+        # The last term matches as a prefix while typing
+        self.assertEqual(db.session.get(Court, index.search_courts('adorn')[0][0]).name, 'Adorni Center')
+
+        response = self.client.get('/api/search/courts?q=eureka%20indoor&limit=5')
+        data = json.loads(response.data)
+        self.assertEqual(data['search_method'], 'text_index')
+        self.assertEqual(data['courts'][0]['court_id'], top.court_id)
+
+    def test_finds_ilike_matches(self):
+        """Courts the ILIKE scan finds by name, the index finds too; timings are in scripts/benchmark.py"""
+        index = get_text_index()
+        for query in ['park', 'community center', 'tennis', 'center', 'recreation', 'adorni']:
+            # The index matches words, not text inside them ('iTennis')
+            word = re.compile(rf'\b{re.escape(query)}', re.IGNORECASE)
+            expected = {court.court_id for court in self.ilike_search(query) if word.search(court.name)}
+            self.assertTrue(expected, query)
+            self.assertLessEqual(expected, {court_id for court_id, _ in index.search_courts(query)}, query)
+
+    def test_index_follows_writes(self):
+        """Court and game writes, including court renames, reach the index"""
+        index = get_text_index()
+        user = User(username='testuser', email='test@example.com', password='password123')
+        court = Court(uuid='new-court', name='Zanzibar Paddle Club')
+        db.session.add_all([user, court])
+        db.session.commit()
+        self.assertEqual(index.search_courts('zanzibar')[0][0], court.court_id)
+
+        game = Game(court_id=court.court_id, creator_id=user.user_id, date=date.today(),
+                    time=time(9, 0), notes='Early doubles')
+        db.session.add(game)
+        db.session.commit()
+        self.assertEqual(index.search_games('zanzibar doubles')[0][0], game.game_id)
+
+        court.name = 'Quokka Courts'
+        db.session.commit()
+        self.assertEqual(index.search_games('quokka')[0][0], game.game_id)
+        self.assertEqual(index.search_games('zanzibar'), [])
+
+        db.session.delete(game)
+        db.session.commit()
+        self.assertEqual(index.search_games('quokka'), [])
+
+    def test_database_fulltext(self):
+        """The FTS5 backend ranks like the text index and its triggers follow writes"""
+        self.app.config['TEXT_SEARCH_BACKEND'] = 'database'
+        ensure_fulltext(db.engine)
+        ensure_fulltext(db.engine)  # Safe to run again
+        search = DatabaseFullText()
+
+        name = self.courts_data[0]['name']
+        top_names = [db.session.get(Court, court_id).name for court_id, _ in search.search_courts(name)[:3]]
+        self.assertIn(name, top_names)
+        self.assertEqual(db.session.get(Court, search.search_courts('adorn')[0][0]).name, 'Adorni Center')
+        # FTS5 syntax in user input is treated as plain words
+        self.assertEqual(search.search_courts('"NEAR( park'), search.search_courts('near park'))
+
+        user = User(username='testuser', email='test@example.com', password='password123')
+        court = Court(uuid='new-court', name='Zanzibar Paddle Club')
+        db.session.add_all([user, court])
+        db.session.commit()
+        game = Game(court_id=court.court_id, creator_id=user.user_id, date=date.today(),
+                    time=time(9, 0), notes='Early doubles')
+        db.session.add(game)
+        db.session.commit()
+        self.assertEqual(search.search_courts('zanzibar')[0][0], court.court_id)
+        self.assertEqual(search.search_games('zanzibar doubles')[0][0], game.game_id)
+
+        court.name = 'Quokka Courts'
+        db.session.commit()
+        self.assertEqual(search.search_games('quokka')[0][0], game.game_id)
+        self.assertEqual(search.search_courts('zanzibar'), [])
+
+        response = self.client.get('/api/search/games?q=quokka')
+        data = json.loads(response.data)
+        self.assertEqual(data['search_method'], 'fulltext')
+        self.assertEqual(data['games'][0]['game_id'], game.game_id)
+
+        db.session.delete(game)
+        db.session.delete(court)
+        db.session.commit()
+        self.assertEqual(search.search_games('quokka'), [])
+        self.assertEqual(search.search_courts('quokka'), [])
+
+    def test_suggest(self):
+        """Typeahead matches name starts, then later words, then cities"""
+        index = get_suggest_index()
+        self.assertEqual(len(index), len(self.courts_data))
+
+        self.assertEqual(index.suggest('adorni')[0][1], 'Adorni Center')
+        # Later words of the name and the city match too, after name starts
+        self.assertIn('Carlson Park', [name for _, name, _, _ in index.suggest('park', 25)])
+        names = [name for _, name, _, _ in index.suggest('eureka', 25)]
+        self.assertIn('Adorni Center', names)
+        self.assertEqual(len(index.suggest('c', 5)), 5)
+        self.assertEqual(index.suggest('  '), [])
+
+        response = self.client.get('/api/search/courts/suggest?prefix=Adorn')
+        self.assertEqual(response.status_code, 200)
+        suggestion = json.loads(response.data)['suggestions'][0]
+        self.assertEqual(set(suggestion), {'court_id', 'name', 'location'})
+        self.assertEqual(suggestion['name'], 'Adorni Center')
+        self.assertEqual(set(suggestion['location']), {'lat', 'lng'})
+        self.assertEqual(self.client.get('/api/search/courts/suggest?prefix=a&limit=x').status_code, 400)
+
+    def test_suggest_follows_writes(self):
+        """New, renamed and deleted courts reach the suggest index"""
+        index = get_suggest_index()
+        court = Court(uuid='new-court', name='Zanzibar Paddle Club', address='1 Main St, Zzyzx, CA 92309, USA')
+        db.session.add(court)
+        db.session.commit()
+        self.assertEqual(index.suggest('zanz')[0][0], court.court_id)
+        self.assertEqual(index.suggest('paddle c')[0][0], court.court_id)
+        self.assertEqual(index.suggest('zzyz')[0][0], court.court_id)
+
+        court.name = 'Quokka Courts'
+        db.session.commit()
+        self.assertEqual(index.suggest('zanz'), [])
+        self.assertEqual(index.suggest('quok')[0][1], 'Quokka Courts')
+
+        db.session.delete(court)
+        db.session.commit()
+        self.assertEqual(index.suggest('quok'), [])
+        self.assertEqual(len(index), len(self.courts_data))
+
+    def test_suggest_finds_name_prefixes(self):
+        """Courts whose name starts with the prefix come first; timings are in scripts/benchmark.py"""
+        index = get_suggest_index()
+        for prefix in ['a', 'ar', 'park', 'community c', 'eur', 'ymca', 'fortuna', 'zz']:
+            expected = {court.court_id for court in Court.query.filter(Court.name.ilike(f'{prefix}%'))}
+            suggested = [court_id for court_id, _, _, _ in index.suggest(prefix, limit=len(self.courts_data))]
+            self.assertEqual(set(suggested[:len(expected)]), expected, prefix)
+
+    def test_bm25_ranking(self):
+        """Boosted fields and rarer terms score higher"""
+        index = BM25Index({'name': 3, 'notes': 1})
+        index.add(1, {'name': 'Riverside Park', 'notes': 'outdoor'})
+        index.add(2, {'name': 'Downtown Gym', 'notes': 'near riverside'})
+        index.add(3, {'name': 'Hilltop', 'notes': 'outdoor courts'})
+        self.assertEqual([doc_id for doc_id, _ in index.search('riverside')], [1, 2])
+        index.remove(1)
+        self.assertEqual([doc_id for doc_id, _ in index.search('riverside')], [2])
+        self.assertEqual(index.search('the'), [])
+
+if __name__ == '__main__':
+    unittest.main()